@@ -1,7 +1,7 @@
-import React, { useState } from 'react';
+import React, { useRef, useState } from 'react';
 import { Phone, Mail, MapPin, Send, MessageCircle, Instagram } from 'lucide-react';
 import { mockData } from '../data/mock';
-import { submitContactForm } from '../services/api';
+import { newIdempotencyKey, submitContactForm } from '../services/api';
 import { useToast } from '../hooks/use-toast';
 
 const Contact = () => {
@@ -12,8 +12,11 @@ const Contact = () => {
     message: ''
   });
   const [isSubmitting, setIsSubmitting] = useState(false);
+  // Reused by retries of the same message, replaced once it is edited or sent
+  const idempotencyKey = useRef(null);
 
   const handleChange = (e) => {
+    idempotencyKey.current = null;
     setFormData({
       ...formData,
       [e.target.name]: e.target.value
@@ -35,9 +38,13 @@ const Contact = () => {
     setIsSubmitting(true);
 
     try {
-      const result = await submitContactForm(formData);
+      if (!idempotencyKey.current) {
+        idempotencyKey.current = newIdempotencyKey();
+      }
+      const result = await submitContactForm(formData, idempotencyKey.current);
       
       if (result.success) {
+        idempotencyKey.current = null;
         toast({
           title: "Mensagem enviada!",
           description: result.message,
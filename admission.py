@@ -0,0 +1,119 @@
+import asyncio
+import json
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+SHED_BODY = json.dumps({"detail": {
+    "success": False,
+    "message": "Servidor sobrecarregado. Tente novamente em instantes.",
+}}).encode()
+
+
+class Lane:
+    """
+    A concurrency limit shared by a group of routes. Requests beyond
+    max_concurrent wait in a FIFO queue of at most max_waiting for up to
+    max_wait seconds. A lane with max_loop_lag also refuses new requests
+    while the event loop is lagging more than that, since queueing work on
+    an overloaded loop only slows down everything else running on it.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_waiting: int = 0,
+                 max_wait: float = 0.5, max_loop_lag: float = None, retry_after: int = 2):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+        self.max_loop_lag = max_loop_lag
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.waiters = deque()
+
+    async def acquire(self, loop_lag: float = 0.0) -> str:
+        """
+        Wait for a slot
+        Returns:
+            str: "admitted" or "queued" when the caller holds a slot and must
+                release it, otherwise why it was shed: "loop_lag",
+                "queue_full" or "queue_timeout"
+        """
+        if self.max_loop_lag is not None and loop_lag > self.max_loop_lag:
+            return "loop_lag"
+        if self.in_flight < self.max_concurrent and not self.waiters:
+            self.in_flight += 1
+            return "admitted"
+        if len(self.waiters) >= self.max_waiting:
+            return "queue_full"
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait((waiter,), timeout=self.max_wait)
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        if waiter.done():
+            return "queued"
+        self._abandon(waiter)
+        return "queue_timeout"
+
+    def _abandon(self, waiter):
+        if waiter.done():
+            # The slot was handed over just as we gave up; pass it on
+            self.release()
+        else:
+            waiter.cancel()
+            self.waiters.remove(waiter)
+
+    def release(self):
+        """Free a slot, handing it straight to the longest waiting request"""
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+
+class AdmissionControlMiddleware:
+    """
+    Pure ASGI middleware shedding load before any parsing, validation,
+    database or email work. lanes maps (method, path) to a Lane; requests
+    for other routes, like the health checks, are never held back, so they
+    stay fast while the expensive lanes are saturated. Shed requests get a
+    503 with Retry-After.
+    """
+
+    def __init__(self, app, lanes: dict, loop_lag=lambda: 0.0, on_result=None):
+        self.app = app
+        self.lanes = lanes
+        # Returns the current event loop lag in seconds
+        self.loop_lag = loop_lag
+        # Called with the lane name and the acquire result, for metrics
+        self.on_result = on_result
+
+    async def __call__(self, scope, receive, send):
+        lane = self.lanes.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+        if lane is None:
+            await self.app(scope, receive, send)
+            return
+
+        result = await lane.acquire(self.loop_lag())
+        if self.on_result is not None:
+            self.on_result(lane.name, result)
+        if result not in ("admitted", "queued"):
+            logger.debug("Shed %s %s (%s lane: %s)", scope["method"], scope["path"], lane.name, result)
+            await send({"type": "http.response.start", "status": 503, "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(SHED_BODY)).encode("latin-1")),
+                (b"retry-after", str(lane.retry_after).encode("latin-1")),
+            ]})
+            await send({"type": "http.response.body", "body": SHED_BODY})
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            lane.release()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Admission Control Testing for SNO Website
+Checks that a saturated Lane hands slots to waiting requests in arrival
+order, sheds on a full queue, a queue timeout or event loop lag, and that
+AdmissionControlMiddleware answers shed requests with a 503 and
+Retry-After. Also checks, through create_app, that cached GETs are
+answered while their lane is saturated.
+"""
+
+import asyncio
+import json
+import os
+
+from admission import AdmissionControlMiddleware, Lane
+
+
+class GatedApp:
+    """ASGI app that holds every request until its gate opens"""
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.started = 0
+
+    async def __call__(self, scope, receive, send):
+        self.started += 1
+        await self.gate.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def request(app, method="POST", path="/api/contact"):
+    scope = {"type": "http", "method": method, "path": path, "query_string": b"", "headers": []}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    headers = {name.decode(): value.decode() for name, value in messages[0]["headers"]}
+    return messages[0]["status"], headers, b"".join(message.get("body", b"") for message in messages[1:])
+
+
+class AdmissionTester:
+    def __init__(self):
+        self.passed = 0
+        self.failed = 0
+
+    def record(self, ok, description):
+        if ok:
+            self.passed += 1
+            print(f"✅ {description}")
+        else:
+            self.failed += 1
+            print(f"❌ {description}")
+
+    async def test_fifo(self):
+        print("\n🔍 Waiting requests admitted in order...")
+        lane = Lane("test", max_concurrent=1, max_waiting=10, max_wait=5)
+        self.record(await lane.acquire() == "admitted", "First request admitted")
+        admitted = []
+
+        async def waiter(n):
+            result = await lane.acquire()
+            admitted.append((n, result))
+            await asyncio.sleep(0)
+            lane.release()
+
+        tasks = []
+        for n in range(8):
+            tasks.append(asyncio.create_task(waiter(n)))
+            await asyncio.sleep(0)
+        self.record(len(lane.waiters) == 8 and lane.in_flight == 1, f"{len(lane.waiters)} waiting behind the slot")
+        lane.release()
+        await asyncio.gather(*tasks)
+        self.record(admitted == [(n, "queued") for n in range(8)], f"Admitted in arrival order: {[n for n, _ in admitted]}")
+        self.record(lane.in_flight == 0 and not lane.waiters, "Every slot returned")
+
+        # A newcomer may not jump the queue while the slot is being handed over
+        lane = Lane("test", max_concurrent=1, max_waiting=10, max_wait=5)
+        await lane.acquire()
+        queued = asyncio.create_task(lane.acquire())
+        await asyncio.sleep(0)
+        lane.release()
+        self.record(await queued == "queued" and lane.in_flight == 1,
+                    "Released slot handed to the waiting request, not counted free")
+
+    async def test_shedding(self):
+        print("\n🔍 Shedding...")
+        lane = Lane("test", max_concurrent=1, max_waiting=2, max_wait=0.05)
+        await lane.acquire()
+        waiting = [asyncio.create_task(lane.acquire()) for _ in range(2)]
+        await asyncio.sleep(0)
+        self.record(await lane.acquire() == "queue_full", "Refused once max_waiting are queued")
+        results = await asyncio.gather(*waiting)
+        self.record(results == ["queue_timeout", "queue_timeout"] and not lane.waiters,
+                    f"Given up after max_wait and removed from the queue: {results}")
+        lane.release()
+        self.record(lane.in_flight == 0, "No slot leaked by timed-out waiters")
+
+        await lane.acquire()
+        waiting = asyncio.create_task(lane.acquire())
+        await asyncio.sleep(0)
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        self.record(not lane.waiters and lane.in_flight == 1, "Cancelled waiter leaves the queue")
+
+        lane = Lane("test", max_concurrent=4, max_loop_lag=0.1)
+        self.record(await lane.acquire(loop_lag=0.2) == "loop_lag" and lane.in_flight == 0,
+                    "Refused while the event loop lags beyond max_loop_lag")
+        self.record(await lane.acquire(loop_lag=0.05) == "admitted", "Admitted once the lag is back under it")
+
+    async def test_middleware(self):
+        print("\n🔍 AdmissionControlMiddleware...")
+        app = GatedApp()
+        results = []
+        lane = Lane("contact", max_concurrent=2, max_waiting=1, max_wait=5, retry_after=3)
+        middleware = AdmissionControlMiddleware(app, {("POST", "/api/contact"): lane},
+                                                on_result=lambda name, result: results.append((name, result)))
+        running = [asyncio.create_task(request(middleware)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        status, headers, body = await request(middleware)
+        self.record(status == 503 and headers.get("retry-after") == "3"
+                    and headers.get("content-length") == str(len(body)),
+                    f"Shed request: {status}, Retry-After {headers.get('retry-after')}")
+        self.record(json.loads(body)["detail"]["success"] is False, f"Usual error body: {body.decode()[:60]}")
+        self.record(app.started == 2, f"Shed and queued requests never reach the app: {app.started} started")
+
+        app.gate.set()
+        statuses = [status for status, _, _ in await asyncio.gather(*running)]
+        self.record(statuses == [200, 200, 200] and lane.in_flight == 0,
+                    f"Admitted and queued requests answered: {statuses}")
+        self.record(sorted(results) == [("contact", "admitted")] * 2 + [("contact", "queue_full"), ("contact", "queued")],
+                    f"Outcomes reported: {sorted(results)}")
+
+        app.gate.clear()
+        held = [asyncio.create_task(request(middleware)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        app.gate.set()
+        status, _, _ = await request(middleware, "GET", "/api/health/ready")
+        self.record(status == 200, f"Routes without a lane never held back: {status}")
+        await asyncio.gather(*held)
+
+    async def test_cached_gets(self):
+        print("\n🔍 Cached GETs while the stats lane is saturated...")
+        import httpx
+        import server
+
+        os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+        os.environ.setdefault('DB_NAME', 'admission_test')
+        os.environ['RESPONSE_CACHE_BACKEND'] = 'memory'
+        os.environ['ADMISSION_STATS_CONCURRENCY'] = '1'
+        os.environ['ADMISSION_STATS_QUEUE'] = '0'
+        app = server.create_app()
+        gate = asyncio.Event()
+
+        class Stats:
+            async def get(self):
+                return {"total_submissions": 1, "today_submissions": 1}
+
+        class Rollups:
+            async def timeseries(self, *args, **kwargs):
+                await gate.wait()
+                return []
+
+        app.state.contact_stats = Stats()
+        app.state.contact_rollups = Rollups()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            first = await client.get("/api/contact/stats")
+            holder = asyncio.create_task(client.get("/api/contact/stats/timeseries"))
+            await asyncio.sleep(0.05)
+            hit = await client.get("/api/contact/stats")
+            not_modified = await client.get("/api/contact/stats", headers={"If-None-Match": first.headers["etag"]})
+            miss = await client.get("/api/contact/stats", params={"fresh": "1"})
+            gate.set()
+            held = await holder
+        self.record(hit.status_code == 200 and hit.headers["x-cache"] == "HIT",
+                    f"Cache hit served without a slot: {hit.status_code} {hit.headers.get('x-cache')}")
+        self.record(not_modified.status_code == 304, f"304 served without a slot: {not_modified.status_code}")
+        self.record(miss.status_code == 503 and "retry-after" in miss.headers,
+                    f"Cache miss shed: {miss.status_code}, Retry-After {miss.headers.get('retry-after')}")
+        self.record(held.status_code == 200, f"Request holding the slot answered: {held.status_code}")
+
+    async def run_all_tests(self):
+        await self.test_fifo()
+        await self.test_shedding()
+        await self.test_middleware()
+        await self.test_cached_gets()
+        print(f"\n📊 {self.passed} passed, {self.failed} failed")
+        return self.failed == 0
+
+
+def main():
+    tester = AdmissionTester()
+    return 0 if asyncio.run(tester.run_all_tests()) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
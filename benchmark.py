@@ -0,0 +1,1199 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for the SNO Website backend components.
+Run all benchmarks with `python benchmark.py` or pick some by name,
+e.g. `python benchmark.py rate_limiter`.
+"""
+
+import sys
+import time
+import tracemalloc
+
+
+def bench_rate_limiter(total_keys=1_000_000, sample_every=100_000):
+    """Feed 1M distinct IPs through the limiter and track memory and check latency"""
+    from rate_limiter import RateLimiter
+
+    print("\n📊 Rate limiter: 1M distinct IPs")
+    limiter = RateLimiter()
+    tracemalloc.start()
+    started = time.perf_counter()
+    batch_started = started
+
+    for i in range(1, total_keys + 1):
+        limiter.is_allowed(f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}-{i}")
+        if i % sample_every == 0:
+            now = time.perf_counter()
+            current, _ = tracemalloc.get_traced_memory()
+            per_check = (now - batch_started) / sample_every * 1e6
+            print(f"   {i:>9,} keys | tracked {len(limiter.backend.requests):>7,} | "
+                  f"memory {current / 1024 / 1024:7.1f} MiB | {per_check:5.2f} µs/check")
+            batch_started = now
+
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    elapsed = time.perf_counter() - started
+    print(f"   peak memory {peak / 1024 / 1024:.1f} MiB, "
+          f"{total_keys / elapsed:,.0f} checks/sec overall")
+
+
+def bench_smtp(messages=300, concurrency_levels=(1, 10, 100), port=8026):
+    """Throughput of pooled vs per-message SMTP sessions against a local sink"""
+    from concurrent.futures import ThreadPoolExecutor
+    from aiosmtpd.controller import Controller
+    from email_service import EmailService
+
+    class Sink:
+        async def handle_DATA(self, server, session, envelope):
+            return "250 OK"
+
+    print(f"\n📊 SMTP throughput: {messages} messages to a local aiosmtpd sink")
+    controller = Controller(Sink(), hostname="127.0.0.1", port=port)
+    controller.start()
+    form = {"name": "Benchmark", "email": "bench@example.com",
+            "message": "Mensagem de benchmark para medir a vazão do SMTP."}
+
+    service = EmailService()
+    service.smtp_server, service.smtp_port = "127.0.0.1", port
+    service.smtp_username, service.smtp_use_tls, service.smtp_enabled = None, False, True
+    message = service.build_message(form)
+
+    def per_message_session():
+        with service.connect() as smtp:
+            smtp.send_message(message)
+
+    def pooled():
+        service.deliver(message)
+
+    def batched(size=10):
+        service.pool.send_many([message] * size)
+
+    try:
+        for concurrency in concurrency_levels:
+            for label, send, per_call in (("new session", per_message_session, 1),
+                                          ("pooled", pooled, 1),
+                                          ("pooled+batch", batched, 10)):
+                calls = messages // per_call
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                    for future in [executor.submit(send) for _ in range(calls)]:
+                        future.result()
+                elapsed = time.perf_counter() - started
+                print(f"   concurrency {concurrency:>3} | {label:<12} | "
+                      f"{calls * per_call / elapsed:8,.0f} msg/sec")
+    finally:
+        service.close()
+        controller.stop()
+
+
+def bench_email_templates(iterations=50_000):
+    """Per-notification rendering cost of the precompiled contact email templates"""
+    import html
+    from email_templates import CONTACT_EMAIL_HTML, contact_email_renderer
+
+    print(f"\n📊 Email templates: {iterations:,} renders")
+    form = {"name": "Ana <script>alert(1)</script>", "email": "ana@example.com",
+            "message": "Olá! Gostaria de um orçamento para um site institucional & loja."}
+
+    def format_each_time():
+        # Baseline: re-parse the whole skeleton on every render
+        CONTACT_EMAIL_HTML.format(timestamp=time.strftime("%d/%m/%Y às %H:%M"),
+                                  **{key: html.escape(value) for key, value in form.items()})
+
+    for label, render in (("str.format per call", format_each_time),
+                          ("compiled html", lambda: contact_email_renderer.render_html(form)),
+                          ("multipart message", lambda: contact_email_renderer.build_message(
+                              form, "contato@sno.digital", "contato@sno.digital"))):
+        count = iterations if label != "multipart message" else iterations // 10
+        started = time.perf_counter()
+        for _ in range(count):
+            render()
+        elapsed = time.perf_counter() - started
+        print(f"   {label:<20} | {elapsed / count * 1e6:7.2f} µs/render")
+
+
+def _percentile(samples, percent):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+async def _benchmark_collection(name, simulated_rtt=0.001, simulated_pool=10):
+    """
+    A real MongoDB collection when MONGO_URL is reachable, otherwise mongomock
+    behind simulated round trips over a limited connection pool
+    """
+    import asyncio
+    import os
+
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(os.getenv("MONGO_URL", "mongodb://localhost:27017"),
+                                    serverSelectionTimeoutMS=1000)
+        await client.admin.command("ping")
+        collection = client["sno_benchmark"][name]
+        await collection.drop()
+        print("   using MongoDB at", os.getenv("MONGO_URL", "mongodb://localhost:27017"))
+        return collection
+    except Exception:
+        from mongomock_motor import AsyncMongoMockClient
+        print(f"   MongoDB not reachable, using mongomock with {simulated_rtt * 1000:.0f} ms simulated round trips")
+
+    class LatencyCollection:
+        def __init__(self, collection):
+            self.collection = collection
+            self.connections = asyncio.Semaphore(simulated_pool)
+
+        async def insert_one(self, document):
+            async with self.connections:
+                await asyncio.sleep(simulated_rtt)
+                return await self.collection.insert_one(document)
+
+        async def insert_many(self, documents, ordered=True):
+            async with self.connections:
+                await asyncio.sleep(simulated_rtt)
+                return await self.collection.insert_many(documents, ordered=ordered)
+
+        def __getattr__(self, attribute):
+            return getattr(self.collection, attribute)
+
+    return LatencyCollection(AsyncMongoMockClient()["sno_benchmark"][name])
+
+
+def bench_write_buffer(clients=200, per_client=20):
+    """Submission insert latency and throughput for each SubmissionWriter mode"""
+    import asyncio
+    import uuid
+    from datetime import datetime
+    from submission_buffer import SubmissionWriter, WRITE_MODES
+
+    print(f"\n📊 Submission writes: {clients} concurrent clients x {per_client} inserts")
+
+    async def run(mode):
+        writer = SubmissionWriter(await _benchmark_collection(f"writes_{mode}"), mode=mode)
+        latencies = []
+
+        async def client():
+            for _ in range(per_client):
+                started = time.perf_counter()
+                await writer.insert({"id": str(uuid.uuid4()), "name": "Benchmark",
+                                     "email": "bench@example.com", "message": "x" * 200,
+                                     "timestamp": datetime.utcnow()})
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(clients)))
+        await writer.flush()
+        elapsed = time.perf_counter() - started
+        print(f"   {mode:<9} | p50 {_percentile(latencies, 50) * 1000:7.2f} ms | "
+              f"p99 {_percentile(latencies, 99) * 1000:7.2f} ms | "
+              f"{clients * per_client / elapsed:9,.0f} inserts/sec")
+
+    for mode in WRITE_MODES:
+        asyncio.run(run(mode))
+
+
+def bench_timeseries(submissions=10_000_000, days=90, domains=20, prefixes=50, writes=20_000, concurrency=50):
+    """
+    ContactRollups.record throughput, then time series queries over rollups
+    for synthetic submissions. Needs a real MongoDB: mongomock can't query
+    that many rollups in reasonable time, so there is no fallback.
+    """
+    import asyncio
+    import os
+    import random
+    from collections import Counter
+    from datetime import datetime, timedelta
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from contact_rollups import BUCKETS, GROUPED_BUCKETS, ContactRollups, bucket_start
+    from db_indexes import INDEXES, ensure_indexes
+
+    url = os.getenv("MONGO_URL", "mongodb://localhost:27017")
+    print(f"\n📊 Time series: {writes:,} recorded submissions, then queries over "
+          f"rollups for {submissions:,} over {days} days")
+    end = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    start = end - timedelta(days=days)
+    hours = days * 24
+
+    async def connect():
+        client = AsyncIOMotorClient(url, serverSelectionTimeoutMS=1000)
+        try:
+            await client.admin.command("ping")
+        except Exception as e:
+            raise RuntimeError(f"MongoDB not reachable at {url}; the time series benchmark needs one") from e
+        print("   using MongoDB at", url)
+        db = client["sno_benchmark"]
+        await db.contact_rollups.drop()
+        await ensure_indexes(db, {"contact_rollups": INDEXES["contact_rollups"]})
+        return db
+
+    async def record(rollup_store):
+        # The write path as the contact route runs it, concurrent submissions
+        # from a mix of domains and prefixes over the last week
+        slots = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def one(i):
+            submission = {
+                "timestamp": end - timedelta(minutes=random.randrange(7 * 24 * 60)),
+                "email": f"user{i}@domain{random.randrange(domains)}.com",
+                "ip_address": f"10.0.{random.randrange(prefixes)}.{random.randrange(1, 255)}",
+            }
+            async with slots:
+                started = time.perf_counter()
+                await rollup_store.record(submission)
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(writes)))
+        elapsed = time.perf_counter() - started
+        print(f"   record                     | {writes / elapsed:>8,.0f} submissions/s | "
+              f"p50 {_percentile(latencies, 50) * 1000:.2f} ms | p99 {_percentile(latencies, 99) * 1000:.2f} ms")
+
+    def synthesize():
+        # Counts record() would have reached for the submissions: spread them
+        # over the hours, then split each hour's count across email domains
+        # and IP prefixes independently
+        per_hour = Counter(random.choices(range(hours), k=submissions))
+        rollups = Counter()
+        for hour, count in per_hour.items():
+            timestamp = start + timedelta(hours=hour)
+            by_domain = Counter(random.choices(range(domains), k=count))
+            by_prefix = Counter(random.choices(range(prefixes), k=count))
+            for bucket in BUCKETS:
+                bucket_at = bucket_start(timestamp, bucket)
+                rollups[(bucket, bucket_at, "all", "all")] += count
+                if bucket not in GROUPED_BUCKETS:
+                    continue
+                for domain, domain_count in by_domain.items():
+                    rollups[(bucket, bucket_at, "email_domain", f"domain{domain}.com")] += domain_count
+                for prefix, prefix_count in by_prefix.items():
+                    rollups[(bucket, bucket_at, "ip_prefix", f"10.0.{prefix}.0/24")] += prefix_count
+        return rollups
+
+    async def run():
+        db = await connect()
+        rollup_store = ContactRollups(db)
+        await record(rollup_store)
+
+        # Recording 10M submissions one by one would take hours, so the
+        # query side is seeded with the rollups they would have produced
+        await rollup_store.collection.delete_many({})
+        started = time.perf_counter()
+        rollups = synthesize()
+        documents = [
+            {"_id": f"{bucket}|{bucket_at.isoformat()}|{dimension}|{value}", "bucket": bucket,
+             "start": bucket_at, "dimension": dimension, "value": value, "count": count}
+            for (bucket, bucket_at, dimension, value), count in rollups.items()
+        ]
+        for offset in range(0, len(documents), 10_000):
+            await rollup_store.collection.insert_many(documents[offset:offset + 10_000])
+        print(f"   seeded {len(documents):,} rollup documents in {time.perf_counter() - started:.1f}s")
+
+        queries = (
+            (f"day, {days} days", "day", start, None),
+            ("hour, 7 days", "hour", end - timedelta(days=7), None),
+            (f"week, {days} days by domain", "week", start, "email_domain"),
+            ("day, 30 days by IP prefix", "day", end - timedelta(days=30), "ip_prefix"),
+        )
+        for label, bucket, query_start, group_by in queries:
+            timings = []
+            for _ in range(5):
+                query_started = time.perf_counter()
+                series = await rollup_store.timeseries(query_start, end, bucket=bucket, group_by=group_by)
+                timings.append(time.perf_counter() - query_started)
+            print(f"   {label:<26} | {len(series):>6,} points | median {_percentile(timings, 50) * 1000:8.1f} ms")
+
+    asyncio.run(run())
+
+
+def bench_metrics(requests=200_000):
+    """Per-request cost of MetricsMiddleware and stage timers around a no-op ASGI app"""
+    import asyncio
+    import metrics
+
+    print(f"\n📊 Metrics overhead: {requests:,} requests through a no-op ASGI app")
+
+    class Route:
+        path = "/api/contact"
+
+    async def app(scope, receive, send):
+        scope["route"] = Route
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def instrumented_app(scope, receive, send):
+        with metrics.stage_latency.time("rate_limit"):
+            pass
+        await app(scope, receive, send)
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    async def drive(target):
+        started = time.perf_counter()
+        for _ in range(requests):
+            await target({"type": "http", "method": "POST", "path": "/api/contact"}, receive, send)
+        return (time.perf_counter() - started) / requests
+
+    async def run():
+        baseline = await drive(app)
+        middleware = await drive(metrics.MetricsMiddleware(app))
+        full = await drive(metrics.MetricsMiddleware(instrumented_app))
+        print(f"   bare app              | {baseline * 1e6:6.2f} µs/request")
+        print(f"   + middleware          | {middleware * 1e6:6.2f} µs/request "
+              f"(+{(middleware - baseline) * 1e6:.2f} µs)")
+        print(f"   + middleware + stage  | {full * 1e6:6.2f} µs/request "
+              f"(+{(full - baseline) * 1e6:.2f} µs)")
+        started = time.perf_counter()
+        rendered = metrics.registry.render()
+        print(f"   /metrics render       | {(time.perf_counter() - started) * 1000:6.2f} ms, "
+              f"{len(rendered):,} bytes")
+
+    asyncio.run(run())
+
+
+def bench_logging(requests=2000, logs_per_request=6, slow_write=0.0002):
+    """Request latency with logging off, written inline, or handed to the listener thread"""
+    import asyncio
+    import logging
+    import os
+    import tempfile
+    import httpx
+    from fastapi import FastAPI
+    import logging_config
+
+    print(f"\n📊 Logging overhead: {requests:,} requests logging {logs_per_request} INFO lines each")
+
+    class SlowStream:
+        """A file whose writes stall, like stdout piped to a busy collector"""
+
+        def __init__(self, stream):
+            self.stream = stream
+
+        def write(self, data):
+            time.sleep(slow_write)
+            return self.stream.write(data)
+
+        def flush(self):
+            self.stream.flush()
+
+    app = FastAPI()
+    app.add_middleware(logging_config.LogContextMiddleware)
+    logger = logging.getLogger("benchmark.logging")
+
+    @app.post("/api/contact")
+    async def contact():
+        for i in range(logs_per_request):
+            logger.info("Contact form step %d for %s (%s)", i, "Benchmark", "bench@example.com")
+        return {"success": True}
+
+    async def drive():
+        transport = httpx.ASGITransport(app=app, client=("10.0.0.1", 40000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            latencies = []
+            for _ in range(requests):
+                started = time.perf_counter()
+                await client.post("/api/contact")
+                latencies.append(time.perf_counter() - started)
+            return latencies
+
+    def inline(stream):
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging_config.JsonFormatter())
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+
+    def queued(stream, sampling=None):
+        return logging_config.configure_logging("INFO", "json", sampling or {}, logging.StreamHandler(stream))
+
+    def off(stream):
+        logging.getLogger().setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as directory:
+        log_file = open(os.path.join(directory, "bench.log"), "a")
+        slow_file = SlowStream(log_file)
+        modes = [
+            ("off", off, log_file),
+            ("inline, file", inline, log_file),
+            ("queued, file", queued, log_file),
+            ("inline, slow stream", inline, slow_file),
+            ("queued, slow stream", queued, slow_file),
+            ("queued, sampled 10%", lambda stream: queued(stream, {"/api/contact": 0.1}), slow_file),
+        ]
+        baseline = None
+        for label, setup, stream in modes:
+            handler = setup(stream)
+            latencies = asyncio.run(drive())
+            drain_started = time.perf_counter()
+            logging_config.stop_logging()
+            drain = time.perf_counter() - drain_started
+            p50, p99 = _percentile(latencies, 50), _percentile(latencies, 99)
+            baseline = baseline or p50
+            dropped = f", dropped {handler.dropped}" if handler is not None else ""
+            print(f"   {label:<20} | p50 {p50 * 1000:6.3f} ms (+{(p50 - baseline) * 1000:6.3f}) | "
+                  f"p99 {p99 * 1000:6.3f} ms | drain {drain * 1000:7.1f} ms{dropped}")
+        log_file.close()
+        logging.getLogger().handlers.clear()
+
+
+def bench_validation(iterations=100_000):
+    """Validations/sec of ContactFormRequest and the cost of building the stored document"""
+    import warnings
+    from pydantic import BaseModel, EmailStr, Field, ValidationError, validator
+    from pydantic.networks import validate_email
+    from models import ContactFormRequest, ContactSubmission
+
+    print(f"\n📊 Validation: {iterations:,} payloads per case")
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+
+        class LegacyContactFormRequest(BaseModel):
+            # Baseline: the previous v1-style validators
+            name: str = Field(..., min_length=2, max_length=100)
+            email: EmailStr
+            message: str = Field(..., min_length=10, max_length=1000)
+
+            @validator('name')
+            def validate_name(cls, v):
+                v = v.strip()
+                if len(v) < 2:
+                    raise ValueError('Nome deve ter pelo menos 2 caracteres')
+                return v
+
+            @validator('message')
+            def validate_message(cls, v):
+                v = v.strip()
+                if len(v) < 10:
+                    raise ValueError('Mensagem deve ter pelo menos 10 caracteres')
+                return v
+
+    payloads = {
+        "valid": {"name": "  Ana Silva ", "email": "ana@example.com",
+                  "message": " Gostaria de um orçamento para um site institucional. "},
+        "invalid": {"name": "A", "email": "email-invalido", "message": "curta"},
+    }
+
+    def validations_per_sec(model, payload):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            try:
+                model.model_validate(payload)
+            except ValidationError:
+                pass
+        return iterations / (time.perf_counter() - started)
+
+    for kind, payload in payloads.items():
+        for label, model in (("v1 validators", LegacyContactFormRequest), ("v2 validators", ContactFormRequest)):
+            print(f"   {kind:<7} | {label:<15} | {validations_per_sec(model, payload):>10,.0f} validations/sec")
+
+    # EmailStr delegates to email-validator, whose IDNA checks bound the valid path
+    started = time.perf_counter()
+    for _ in range(iterations):
+        validate_email(payloads["valid"]["email"])
+    print(f"   valid   | EmailStr alone  | {iterations / (time.perf_counter() - started):>10,.0f} validations/sec")
+
+    form = ContactFormRequest.model_validate(payloads["valid"])
+    for label, convert in (
+        ("model + .dict()", lambda: ContactSubmission(
+            name=form.name, email=form.email, message=form.message,
+            ip_address="10.0.0.1", user_agent="benchmark").model_dump()),
+        ("document_from", lambda: ContactSubmission.document_from(form, "10.0.0.1", "benchmark")),
+    ):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            convert()
+        elapsed = time.perf_counter() - started
+        print(f"   document | {label:<15} | {elapsed / iterations * 1e6:8.2f} µs/submission")
+
+
+def bench_spam_filter(entries=100_000, checks=5_000):
+    """Spam filter check latency with 100k cached submissions"""
+    import random
+    import resource
+    from spam_filter import SpamFilter
+
+    print(f"\n📊 Spam filter: {checks:,} checks per case with {entries:,} cached entries")
+    rng = random.Random(42)
+    vocabulary = [f"palavra{i}" for i in range(5_000)]
+
+    def message(words=40):
+        return " ".join(rng.choices(vocabulary, k=words))
+
+    spam_filter = SpamFilter(max_entries=entries)
+    # tracemalloc would slow the fill several times over; peak RSS is close enough
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    sent = []
+    for i in range(entries):
+        text = message(rng.randint(5, 150))
+        spam_filter.check("Benchmark", f"user{i}@example.com", text)
+        if i % 100 == 0:
+            sent.append((f"user{i}@example.com", text))
+    grown = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+    print(f"   filled in {time.perf_counter() - started:.1f} s, ~{grown / 1024:.0f} MiB, "
+          f"{len(spam_filter.buckets):,} LSH buckets")
+
+    def near_copy(text):
+        words = text.split()
+        words[rng.randrange(len(words))] = "trocada"
+        return " ".join(words)
+
+    cases = {
+        "new message": lambda i: ("Nova", f"new{i}@example.com", message(rng.randint(20, 150))),
+        "exact duplicate": lambda i: ("Dup", *sent[i % len(sent)]),
+        "near duplicate": lambda i: ("Near", f"near{i}@example.com", near_copy(sent[i % len(sent)][1])),
+        "link spam": lambda i: ("http://spam.example", f"spam{i}@example.com",
+                                "http://a.example http://b.example " + message(30)),
+        "max length (1000)": lambda i: ("Longa", f"long{i}@example.com", message(110)[:1000]),
+    }
+    for label, make in cases.items():
+        payloads = [make(i) for i in range(checks)]
+        timings, verdicts = [], {}
+        for payload in payloads:
+            check_started = time.perf_counter()
+            verdict, _ = spam_filter.check(*payload)
+            timings.append(time.perf_counter() - check_started)
+            verdicts[verdict] = verdicts.get(verdict, 0) + 1
+        print(f"   {label:<18} | p50 {_percentile(timings, 50) * 1e6:6.1f} µs | "
+              f"p99 {_percentile(timings, 99) * 1e6:6.1f} µs | {verdicts}")
+
+
+def bench_response_cache(requests=5_000):
+    """Cost of a repeat poll of /api/contact/stats uncached, cached, and revalidated with 304"""
+    import asyncio
+    from fastapi import FastAPI
+    from mongomock_motor import AsyncMongoMockClient
+    from contact_stats import ContactStats
+    from response_cache import MemoryCacheBackend, ResponseCacheMiddleware
+
+    print(f"\n📊 Response cache: {requests:,} polls of /api/contact/stats")
+    stats = ContactStats(AsyncMongoMockClient()["sno_benchmark"])
+    app = FastAPI()
+
+    @app.get("/api/contact/stats")
+    async def get_contact_stats():
+        return await stats.get()
+
+    cached = ResponseCacheMiddleware(app, MemoryCacheBackend(), {"/api/contact/stats": 60})
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    async def drive(target, headers=()):
+        scope = {"type": "http", "method": "GET", "path": "/api/contact/stats", "raw_path": b"/api/contact/stats",
+                 "query_string": b"", "headers": list(headers), "scheme": "http", "http_version": "1.1",
+                 "server": ("bench", 80), "client": ("10.0.0.1", 40000), "root_path": ""}
+        await target(dict(scope), receive, send)
+        started = time.perf_counter()
+        for _ in range(requests):
+            await target(dict(scope), receive, send)
+        return (time.perf_counter() - started) / requests
+
+    async def run():
+        await stats.reconcile()
+        etag = None
+
+        async def capture_etag(message):
+            nonlocal etag
+            if message["type"] == "http.response.start":
+                etag = dict(message["headers"])[b"etag"]
+
+        await cached({"type": "http", "method": "GET", "path": "/api/contact/stats", "query_string": b"",
+                      "headers": []}, receive, capture_etag)
+        for label, target, headers in (("uncached", app, ()),
+                                       ("cache hit", cached, ()),
+                                       ("304 revalidation", cached, ((b"if-none-match", etag),))):
+            print(f"   {label:<17} | {await drive(target, headers) * 1e6:7.1f} µs/request")
+
+    asyncio.run(run())
+
+
+def bench_mongo_warmup(concurrency=20, pool_size=20):
+    """Latency of the first burst of queries on a fresh client, with and without warm-up"""
+    import asyncio
+    import os
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from mongo_pool import PoolMonitor, warm_up
+
+    url = os.getenv("MONGO_URL", "mongodb://localhost:27017")
+    print(f"\n📊 MongoDB warm-up: first {concurrency} concurrent queries after startup")
+
+    async def first_burst(warm):
+        monitor = PoolMonitor()
+        client = AsyncIOMotorClient(url, maxPoolSize=pool_size, minPoolSize=concurrency,
+                                    event_listeners=[monitor], serverSelectionTimeoutMS=1000)
+        collection = client["sno_benchmark"]["warmup"]
+        try:
+            if warm:
+                await warm_up(client["sno_benchmark"], concurrency)
+
+            async def query():
+                started = time.perf_counter()
+                await collection.find_one({"_id": "missing"})
+                return time.perf_counter() - started
+
+            latencies = await asyncio.gather(*(query() for _ in range(concurrency)))
+            return latencies, monitor.totals()["open"]
+        finally:
+            client.close()
+
+    async def run():
+        for warm in (False, True):
+            try:
+                latencies, opened = await first_burst(warm)
+            except Exception as e:
+                print(f"   MongoDB not reachable at {url}, skipping ({type(e).__name__})")
+                return
+            print(f"   {'warmed up' if warm else 'cold':<9} | p50 {_percentile(latencies, 50) * 1000:6.2f} ms | "
+                  f"max {max(latencies) * 1000:6.2f} ms | {opened} connections open")
+
+    asyncio.run(run())
+
+
+_STARTUP_CHILD = """
+import asyncio, os, sys, time
+marks = [("interpreter", time.time())]
+sys.path.insert(0, os.getcwd())
+import httpx
+import load_test
+marks.append(("harness", time.time()))
+import server
+marks.append(("import server", time.time()))
+
+async def main():
+    app = load_test.load_app()
+    marks.append(("create_app", time.time()))
+    async with app.router.lifespan_context(app):
+        marks.append(("lifespan startup", time.time()))
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            response = await client.get("/api/")
+        marks.append(("first request", time.time()))
+        print(";".join(f"{name}={at!r}" for name, at in marks), flush=True)
+
+asyncio.run(main())
+"""
+
+
+def _server_imports(stderr):
+    """
+    Cumulative milliseconds of server.py and of each of its direct imports,
+    from `python -X importtime` output. Modules are listed after everything
+    they import, indented one level deeper than their importer.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "cumulative" not in line:
+            _, cumulative, name = line.split("|")
+            rows.append((name.strip(), len(name) - len(name.lstrip()), int(cumulative) / 1000))
+    index = next(i for i, (name, depth, _) in enumerate(rows) if name == "server" and depth == 1)
+    direct = {}
+    for name, depth, cumulative in reversed(rows[:index]):
+        if depth == 1:
+            break
+        if depth == 3:
+            direct[name] = cumulative
+    return rows[index][2], direct
+
+
+def bench_startup(runs=5, top=8):
+    """Import time of server.py and time to first request of a fresh process"""
+    import os
+    import statistics
+    import subprocess
+
+    root = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, MONGO_URL="mongodb://localhost:27017", DB_NAME="sno_benchmark",
+               MONGO_WARMUP="false", LOG_LEVEL="WARNING")
+    print(f"\n📊 Cold start: median of {runs} fresh interpreters")
+
+    totals, heaviest = [], {}
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import server"],
+                                cwd=root, env=env, capture_output=True, text=True, check=True)
+        total, direct = _server_imports(result.stderr)
+        totals.append(total)
+        for name, cumulative in direct.items():
+            heaviest.setdefault(name, []).append(cumulative)
+    print(f"   import server {statistics.median(totals):9.1f} ms, heaviest direct imports:")
+    for name, samples in sorted(heaviest.items(), key=lambda item: -statistics.median(item[1]))[:top]:
+        print(f"      {name:<28} {statistics.median(samples):7.1f} ms")
+
+    phases = {}
+    for _ in range(runs):
+        started = time.time()
+        result = subprocess.run([sys.executable, "-c", _STARTUP_CHILD], cwd=root, env=env,
+                                capture_output=True, text=True, check=True)
+        marks = [mark.split("=") for mark in result.stdout.strip().split(";")]
+        previous = started
+        for name, at in marks:
+            phases.setdefault(name, []).append(float(at) - previous)
+            previous = float(at)
+        phases.setdefault("total", []).append(previous - started)
+    print("   time to first request (in-process client, mongomock):")
+    for name, samples in phases.items():
+        label = {"interpreter": "interpreter startup", "harness": "httpx + mongomock"}.get(name, name)
+        print(f"      {label:<28} {statistics.median(samples) * 1000:7.1f} ms")
+
+
+def _current_rss():
+    """Resident set size of this process in bytes (Linux)"""
+    import os
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def bench_export(total=1_000_000, sample_every=100_000):
+    """RSS while streaming 1M submissions through the CSV and NDJSON exporters"""
+    import asyncio
+    import os
+    from datetime import datetime, timedelta
+    from contact_export import SubmissionExporter
+
+    print(f"\n📊 Export: {total:,} submissions streamed")
+    started_at = datetime(2025, 1, 1)
+
+    def document(i):
+        return {"id": f"{i:012d}", "timestamp": started_at + timedelta(seconds=i),
+                "name": f"Cliente {i}", "email": f"cliente{i}@example.com",
+                "message": "Gostaria de um orçamento para um site institucional. " * 3}
+
+    class GeneratedCursor:
+        """
+        Stand-in for a Motor cursor without a MongoDB: generates documents one
+        at a time, so any growth in RSS comes from the export pipeline
+        """
+
+        def __init__(self, query, projection):
+            self.projection = projection
+
+        def sort(self, keys):
+            return self
+
+        def batch_size(self, size):
+            return self
+
+        async def __aiter__(self):
+            for i in range(total):
+                if i % 1000 == 0:
+                    # A batch boundary, where Motor would wait on a getMore
+                    await asyncio.sleep(0)
+                yield {field: value for field, value in document(i).items() if field in self.projection}
+
+    class GeneratedCollection:
+        def find(self, query, projection):
+            return GeneratedCursor(query, projection)
+
+    async def collection():
+        from motor.motor_asyncio import AsyncIOMotorClient
+        url = os.getenv("MONGO_URL", "mongodb://localhost:27017")
+        try:
+            client = AsyncIOMotorClient(url, serverSelectionTimeoutMS=1000)
+            await client.admin.command("ping")
+        except Exception:
+            print("   MongoDB not reachable, streaming generated documents")
+            return GeneratedCollection()
+        submissions = client["sno_benchmark"]["export"]
+        if await submissions.estimated_document_count() != total:
+            await submissions.drop()
+            for offset in range(0, total, 10_000):
+                await submissions.insert_many([document(i) for i in range(offset, min(total, offset + 10_000))])
+            await submissions.create_index([("timestamp", 1), ("id", 1)])
+        print("   using MongoDB at", url)
+        return submissions
+
+    async def aenumerate(iterable, start):
+        index = start
+        async for item in iterable:
+            yield index, item
+            index += 1
+
+    async def run():
+        exporter = SubmissionExporter(await collection())
+        for export_format in ("csv", "ndjson"):
+            baseline = _current_rss()
+            samples, written = [], 0
+            started = time.perf_counter()
+            # The exporter yields one chunk per batch of rows
+            async for chunk_number, chunk in aenumerate(exporter.stream(export_format), 1):
+                written += len(chunk)
+                if chunk_number * exporter.batch_size % sample_every == 0:
+                    samples.append(_current_rss())
+            elapsed = time.perf_counter() - started
+            growth = [(rss - baseline) / 1024 / 1024 for rss in samples]
+            print(f"   {export_format:<6} | {total / elapsed:9,.0f} rows/sec | {written / 1024 / 1024:6.0f} MiB out | "
+                  f"RSS +{min(growth, default=0):.1f} .. +{max(growth, default=0):.1f} MiB")
+
+    asyncio.run(run())
+
+
+def bench_pagination(page_size=50, deep_page=10_000, repeats=50):
+    """Latency of the first and a deep admin listing page, keyset vs skip/limit"""
+    import asyncio
+    import os
+    from datetime import datetime, timedelta
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from contact_export import encode_cursor
+    from contact_listing import SubmissionListing
+    from db_indexes import INDEXES
+
+    total = page_size * deep_page + page_size
+    url = os.getenv("MONGO_URL", "mongodb://localhost:27017")
+    print(f"\n📊 Admin listing: page 1 vs page {deep_page:,} of {page_size} over {total:,} submissions")
+    newest = datetime(2026, 1, 1)
+
+    def document(i):
+        # i counts back from the newest submission, two per timestamp to exercise the id tie-break
+        return {"id": f"{total - i:012d}", "timestamp": newest - timedelta(seconds=i // 2),
+                "name": f"Cliente {i}", "email": f"cliente{i % 1000}@example.com",
+                "message": "Gostaria de um orçamento para um site institucional.",
+                "ip_address": f"10.0.{(i >> 8) & 255}.{i & 255}"}
+
+    async def run():
+        client = AsyncIOMotorClient(url, serverSelectionTimeoutMS=1000)
+        try:
+            await client.admin.command("ping")
+        except Exception as e:
+            print(f"   MongoDB not reachable at {url}, skipping ({type(e).__name__})")
+            return
+        submissions = client["sno_benchmark"]["listing"]
+        if await submissions.estimated_document_count() != total:
+            await submissions.drop()
+            for offset in range(0, total, 10_000):
+                await submissions.insert_many([document(i) for i in range(offset, min(total, offset + 10_000))])
+            await submissions.create_indexes(INDEXES["contact_submissions"])
+        listing = SubmissionListing(submissions)
+        # The cursor the client would hold after reading deep_page - 1 pages
+        deep_cursor = encode_cursor(document(page_size * (deep_page - 1) - 1))
+
+        async def skip_limit():
+            await (submissions.find({}, {"_id": 0}).sort([("timestamp", -1), ("id", -1)])
+                   .skip(page_size * (deep_page - 1)).limit(page_size).to_list(page_size))
+
+        for label, fetch in (("keyset page 1", lambda: listing.page(page_size)),
+                             (f"keyset page {deep_page:,}", lambda: listing.page(page_size, deep_cursor)),
+                             (f"skip/limit page {deep_page:,}", skip_limit)):
+            latencies = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                await fetch()
+                latencies.append(time.perf_counter() - started)
+            print(f"   {label:<22} | p50 {_percentile(latencies, 50) * 1000:7.2f} ms | "
+                  f"p99 {_percentile(latencies, 99) * 1000:7.2f} ms")
+        client.close()
+
+    asyncio.run(run())
+
+
+def bench_client_identity(requests=200_000, clients=20_000, proxies=50):
+    """Per-request cost of finding the client behind a proxy chain, and the limiter keys it yields"""
+    import logging
+    from starlette.datastructures import Headers
+    from client_identity import ClientIdentity
+    from rate_limiter import RateLimiter
+
+    print(f"\n📊 Client identity: {requests:,} requests from {clients:,} clients, {proxies} trusted networks")
+    trusted = ", ".join(f"10.{n}.0.0/16" for n in range(proxies - 1)) + ", 2001:db8:ffff::/48"
+    balancer = "10.0.0.1"
+
+    def headers(i):
+        client = i % clients
+        if client % 4 == 0:
+            # IPv6 clients use a fresh address from their /64 for every request
+            address = f"2001:db8:{client >> 8:x}:{client & 255:x}::{i & 0xffff:x}"
+        else:
+            address = f"198.{client >> 16}.{(client >> 8) & 255}.{client & 255}"
+        return Headers(raw=[(b"x-forwarded-for", f"{address}, 10.{i % (proxies - 1)}.3.4".encode())])
+
+    samples = [headers(i) for i in range(requests)]
+    # Every request through the balancer's key is refused; don't log each one
+    logging.getLogger("rate_limiter").setLevel(logging.ERROR)
+    for label, identity in (("peer address", None),
+                            ("proxies, IPv6 /128", ClientIdentity(trusted, ipv6_prefix=128)),
+                            ("proxies, IPv6 /64", ClientIdentity(trusted))):
+        started = time.perf_counter()
+        if identity is None:
+            keys = [balancer for _ in samples]
+        else:
+            keys = [identity.rate_limit_key(identity.client_ip(balancer, sample)) for sample in samples]
+        elapsed = time.perf_counter() - started
+        limiter = RateLimiter()
+        allowed = sum(limiter.is_allowed(key) for key in keys)
+        print(f"   {label:<18} | {elapsed / requests * 1e6:5.2f} µs/request | "
+              f"{limiter.backend.tracked_keys():>7,} limiter keys | {allowed:>7,} allowed")
+
+
+def bench_rate_limit_tiers(checks=200_000, clients=10_000, overrides=1_000):
+    """Check latency by number of tiers, in one pass vs one backend call per tier"""
+    import os
+    import tempfile
+    from rate_limit_policy import RateLimitPolicy
+    from rate_limiter import MemoryRateLimitBackend, SharedMemoryRateLimitBackend
+
+    print(f"\n📊 Rate limit tiers: {checks:,} checks over {clients:,} clients, {overrides:,} subnet overrides")
+    ladder = ["2/min", "5/15min", "10/hour", "20/day", "50/2day", "100/7day", "200/14day", "400/30day"]
+    addresses = [f"198.51.{(i >> 8) & 255}.{i & 255}" for i in range(clients)]
+    tmpdir = tempfile.mkdtemp(prefix="sno_bench_tiers_")
+
+    for count in (1, 2, 4, 8):
+        # Plenty of overrides, so the per-request rule lookup isn't trivially small
+        policy = RateLimitPolicy({"routes": {"contact": {
+            "tiers": ladder[:count],
+            "overrides": [{"networks": [f"203.0.{n >> 8}.{n & 255}/32"], "tiers": ["1/min"]}
+                          for n in range(overrides)],
+        }}})
+        backends = [("memory", MemoryRateLimitBackend())]
+        if count <= SharedMemoryRateLimitBackend.MAX_TIERS:
+            backends.append(("shm", SharedMemoryRateLimitBackend(
+                path=os.path.join(tmpdir, f"tiers_{count}"), slots=1 << 15)))
+        for name, backend in backends:
+            started = time.perf_counter()
+            for i in range(checks):
+                rule = policy.rule_for("contact", addresses[i % clients])
+                backend.hit(rule.key(addresses[i % clients]), rule.tiers)
+            one_pass = (time.perf_counter() - started) / checks * 1e6
+
+            # The same limits as independent single-window counters
+            started = time.perf_counter()
+            for i in range(checks):
+                rule = policy.rule_for("contact", addresses[i % clients])
+                for number, tier in enumerate(rule.tiers):
+                    backend.hit(f"{number}:{rule.key(addresses[i % clients])}", (tier,))
+            per_tier = (time.perf_counter() - started) / checks * 1e6
+            print(f"   {count} tier{'s' if count > 1 else ' '} | {name:<6} | one pass {one_pass:5.2f} µs/check | "
+                  f"call per tier {per_tier:6.2f} µs/check")
+
+
+def bench_retention(days=730, archive_after_days=365):
+    """Archive pass throughput and archive size per target, and what stays in the hot collection"""
+    import asyncio
+    import os
+    import random
+    import shutil
+    import tempfile
+    from datetime import datetime, timedelta
+    from bson import json_util
+    import retention
+    from retention import ARCHIVE_INDEXES, SubmissionRetention
+
+    url = os.getenv("MONGO_URL", "mongodb://localhost:27017")
+    words = ("olá gostaria de um orçamento para site institucional loja virtual blog formulário "
+             "prazo valor hospedagem domínio manutenção design responsivo integração pagamento "
+             "empresa projeto reunião contato urgente proposta catálogo produtos serviços equipe").split()
+
+    async def database(name):
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(url, serverSelectionTimeoutMS=1000)
+        try:
+            await client.admin.command("ping")
+            await client.drop_database(name)
+            return client[name], True
+        except Exception:
+            from mongomock_motor import AsyncMongoMockClient
+            return AsyncMongoMockClient()[name], False
+
+    async def collection_size(db, name):
+        stats = await db.command("collStats", name)
+        return stats["storageSize"] + stats["totalIndexSize"]
+
+    async def run(label, target, documents, use_zstd=True):
+        db, real = await database(f"sno_benchmark_retention_{target}")
+        for offset in range(0, len(documents), 10_000):
+            await db.contact_submissions.insert_many([dict(document) for document in documents[offset:offset + 10_000]])
+        archive_dir = tempfile.mkdtemp(prefix="sno_bench_archive_")
+        available = retention._zstandard
+        if not use_zstd:
+            retention._zstandard = lambda: None
+        try:
+            job = SubmissionRetention(db, archive_after_days=archive_after_days, target=target,
+                                      archive_dir=archive_dir)
+            if real:
+                before = await collection_size(db, "contact_submissions")
+                await job.ensure_archive()
+            else:
+                # mongomock can't create collections with storage options
+                await db[retention.ARCHIVE_COLLECTION].create_indexes(ARCHIVE_INDEXES)
+            started = time.perf_counter()
+            report = await job.run_once()
+            elapsed = time.perf_counter() - started
+            hot = await db.contact_submissions.count_documents({})
+            line = f"   {label:<18} | {report['archived'] / elapsed:8,.0f} archived/sec | {hot:,} left hot"
+            if target == "files":
+                size = sum(entry.stat().st_size for entry in os.scandir(archive_dir))
+                line += f" | {size / 1024:8,.0f} KiB on disk, {raw / size:4.1f}x smaller than NDJSON"
+            if real:
+                line += (f" | hot {before / 1024 / 1024:.1f} -> "
+                         f"{await collection_size(db, 'contact_submissions') / 1024 / 1024:.1f} MiB")
+                if target == "collection":
+                    line += f", archive {await collection_size(db, retention.ARCHIVE_COLLECTION) / 1024 / 1024:.1f} MiB"
+            print(line)
+        finally:
+            retention._zstandard = available
+            shutil.rmtree(archive_dir)
+
+    _, real = asyncio.run(database("sno_benchmark_retention_probe"))
+    # mongomock scans the whole collection for every batch, so keep it small there
+    total = 500_000 if real else 10_000
+    print(f"\n📊 Retention: {total:,} submissions over {days} days, archived after {archive_after_days}")
+    if not real:
+        print(f"   MongoDB not reachable at {url}, using mongomock: throughput is not representative")
+    if retention._zstandard() is None:
+        print("   zstandard is not installed, files use gzip")
+
+    generator = random.Random(42)
+    now = datetime.utcnow()
+    documents = [{"id": f"{i:012d}", "timestamp": now - timedelta(days=days * (total - i) / total),
+                  "name": f"Cliente {generator.randrange(100_000)}",
+                  "email": f"cliente{generator.randrange(100_000)}@example{generator.randrange(50)}.com",
+                  "message": " ".join(generator.choices(words, k=generator.randrange(10, 60))),
+                  "ip_address": f"{generator.randrange(1, 224)}.{generator.randrange(256)}."
+                                f"{generator.randrange(256)}.{generator.randrange(256)}",
+                  "user_agent": f"Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/{generator.randrange(90, 130)}.0"}
+                 for i in range(total)]
+    cutoff = now - timedelta(days=archive_after_days)
+    raw = sum(len(json_util.dumps(document, json_options=json_util.RELAXED_JSON_OPTIONS).encode()) + 1
+              for document in documents if document["timestamp"] < cutoff)
+    print(f"   {raw / 1024:,.0f} KiB of uncompressed NDJSON to archive")
+    asyncio.run(run("archive collection", "collection", documents))
+    asyncio.run(run("zstd files", "files", documents))
+    asyncio.run(run("gzip files", "files", documents, use_zstd=False))
+
+
+def bench_search(total=1_000_000, repeats=20):
+    """Ranked search latency over 1M messages: inverted index and text index vs a regex scan"""
+    import asyncio
+    import itertools
+    import os
+    import random
+    import re
+    from datetime import datetime, timedelta
+    from contact_search import InvertedIndex, MongoTextSearch
+
+    print(f"\n📊 Search: {total:,} submissions")
+    common = ("olá gostaria de um orçamento para site institucional loja virtual blog formulário "
+              "prazo valor hospedagem domínio manutenção design responsivo integração pagamento "
+              "empresa projeto reunião contato urgente proposta catálogo produtos serviços equipe").split()
+    # A long tail of rarer words with Zipf frequencies, like product or company names
+    rare = [f"termo{n}" for n in range(50_000)]
+    rare_weights = list(itertools.accumulate(1 / rank for rank in range(1, len(rare) + 1)))
+    generator = random.Random(42)
+    started_at = datetime(2025, 1, 1)
+    documents = [{"id": f"{i:012d}", "timestamp": started_at + timedelta(seconds=i),
+                  "name": f"Cliente {generator.randrange(100_000)}",
+                  "email": f"cliente{generator.randrange(100_000)}@example{generator.randrange(50)}.com",
+                  "message": " ".join(generator.choices(common, k=generator.randrange(5, 40))
+                                      + generator.choices(rare, cum_weights=rare_weights, k=generator.randrange(1, 10)))}
+                 for i in range(total)]
+    queries = [("rare word", "termo40000"), ("mid word", "termo50"), ("common word", "orçamento"),
+               ("two words", "orçamento hospedagem"), ("rare + common", "termo50 orçamento prazo"),
+               ("exclusion", "termo50 -urgente"),
+               ("name", "cliente 4242")]
+
+    def latencies(call):
+        samples = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            call()
+            samples.append(time.perf_counter() - started)
+        # The first query of a term also sorts its postings by weight
+        return (f"first {samples[0] * 1000:7.2f} ms | p50 {_percentile(samples, 50) * 1000:7.2f} ms | "
+                f"p99 {_percentile(samples, 99) * 1000:7.2f} ms")
+
+    baseline = _current_rss()
+    index = InvertedIndex()
+    started = time.perf_counter()
+    for document in documents:
+        index.add(document)
+    elapsed = time.perf_counter() - started
+    postings = sum(len(numbers) for numbers, _ in index.postings.values())
+    print(f"   memory index build | {total / elapsed:9,.0f} docs/sec | {len(index.postings):,} terms, "
+          f"{postings:,} postings | RSS +{(_current_rss() - baseline) / 1024 / 1024:,.0f} MiB")
+    messages = [document["message"] for document in documents]
+    for label, query in queries:
+        timings = latencies(lambda: index.rank(query, 21))
+        print(f"   {label:<13} {query!r:<25} | {len(index.rank(query, total)):>9,} matches | "
+              f"memory top 21 {timings}")
+    # What a collection scan costs at best: the regex alone, without fetching documents
+    pattern = re.compile("termo40000", re.IGNORECASE)
+    print(f"   regex scan of every message for 'termo40000' | "
+          f"{latencies(lambda: [message for message in messages if pattern.search(message)])}")
+
+    async def mongo():
+        from motor.motor_asyncio import AsyncIOMotorClient
+        from db_indexes import configured_indexes
+        url = os.getenv("MONGO_URL", "mongodb://localhost:27017")
+        client = AsyncIOMotorClient(url, serverSelectionTimeoutMS=1000)
+        try:
+            await client.admin.command("ping")
+        except Exception:
+            print(f"   MongoDB not reachable at {url}, skipping the text index")
+            return
+        submissions = client["sno_benchmark"]["search"]
+        if await submissions.estimated_document_count() != total:
+            await submissions.drop()
+            for offset in range(0, total, 10_000):
+                await submissions.insert_many([dict(document) for document in documents[offset:offset + 10_000]])
+        started = time.perf_counter()
+        await submissions.create_indexes(configured_indexes("mongo")["contact_submissions"])
+        print(f"   using MongoDB at {url}, indexes ready in {time.perf_counter() - started:.1f} s")
+        search = MongoTextSearch(submissions)
+        for label, query in queries:
+            samples = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                await search.search(query, limit=20)
+                samples.append(time.perf_counter() - started)
+            print(f"   {label:<13} {query!r:<25} | $text page {_percentile(samples, 50) * 1000:7.2f} ms p50")
+        started = time.perf_counter()
+        await submissions.find({"message": {"$regex": "termo40000", "$options": "i"}}).to_list(None)
+        print(f"   $regex scan for 'termo40000' | {(time.perf_counter() - started) * 1000:7.2f} ms")
+
+    asyncio.run(mongo())
+
+
+BENCHMARKS = {
+    "rate_limiter": bench_rate_limiter,
+    "smtp": bench_smtp,
+    "email_templates": bench_email_templates,
+    "write_buffer": bench_write_buffer,
+    "timeseries": bench_timeseries,
+    "metrics": bench_metrics,
+    "logging": bench_logging,
+    "validation": bench_validation,
+    "spam_filter": bench_spam_filter,
+    "response_cache": bench_response_cache,
+    "mongo_warmup": bench_mongo_warmup,
+    "startup": bench_startup,
+    "export": bench_export,
+    "pagination": bench_pagination,
+    "client_identity": bench_client_identity,
+    "rate_limit_tiers": bench_rate_limit_tiers,
+    "retention": bench_retention,
+    "search": bench_search,
+}
+
+
+def main():
+    selected = sys.argv[1:] or list(BENCHMARKS)
+    unknown = [name for name in selected if name not in BENCHMARKS]
+    if unknown:
+        print(f"❌ Unknown benchmark(s): {', '.join(unknown)}")
+        print(f"   Available: {', '.join(BENCHMARKS)}")
+        return 1
+
+    for name in selected:
+        BENCHMARKS[name]()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
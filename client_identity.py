@@ -0,0 +1,190 @@
+import ipaddress
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+CLIENT_IP_HEADERS = ("x-forwarded-for", "forwarded")
+
+
+class NetworkMap:
+    """
+    Maps IP networks to values with longest-prefix matching. A lookup costs
+    one dict probe per distinct prefix length rather than one comparison
+    per network.
+    """
+
+    def __init__(self, items):
+        self.networks = {}
+        for network, value in items:
+            self.networks[network] = value
+        # version -> [(netmask, {network address: value})], longest prefix first
+        lookups = {4: {}, 6: {}}
+        for network, value in self.networks.items():
+            lookups[network.version].setdefault(int(network.netmask), {})[int(network.network_address)] = value
+        self.lookups = {version: sorted(masks.items(), reverse=True) for version, masks in lookups.items()}
+
+    def get(self, address, default=None):
+        """Value of the most specific network containing address"""
+        packed = int(address)
+        for mask, networks in self.lookups[address.version]:
+            value = networks.get(packed & mask, self)
+            if value is not self:
+                return value
+        return default
+
+    def __len__(self):
+        return len(self.networks)
+
+
+class NetworkSet(NetworkMap):
+    """A set of IP networks with NetworkMap's fast membership test"""
+
+    def __init__(self, networks):
+        super().__init__((network, True) for network in networks)
+
+    def __contains__(self, address) -> bool:
+        return self.get(address, False)
+
+
+def parse_network(value: str):
+    """An address or CIDR, e.g. "10.0.0.0/8" (host bits are ignored)"""
+    return ipaddress.ip_network(value.strip(), strict=False)
+
+
+@lru_cache(maxsize=32)
+def parse_networks(spec: str) -> NetworkSet:
+    """
+    Parse a comma separated list of addresses and CIDRs
+    Args:
+        spec: e.g. "10.0.0.0/8, 172.16.0.0/12, ::1"
+    Returns:
+        NetworkSet: The networks, compiled for fast membership tests
+    Raises:
+        ValueError: On an invalid entry
+    """
+    return NetworkSet(parse_network(item) for item in spec.split(",") if item.strip())
+
+
+def parse_address(value: str):
+    """
+    Parse one hop of a forwarding header, or a socket peer address
+    Accepts "1.2.3.4", "1.2.3.4:5678", "2001:db8::1", "[2001:db8::1]:443",
+    optionally quoted. IPv4-mapped IPv6 addresses are returned as IPv4.
+    Returns:
+        IPv4Address | IPv6Address | None: None for "unknown", obfuscated
+            identifiers and anything else that isn't an address
+    """
+    value = value.strip().strip('"')
+    if value.startswith("["):
+        end = value.find("]")
+        if end < 0:
+            return None
+        value = value[1:end]
+    elif value.count(":") == 1:
+        value = value.partition(":")[0]
+    try:
+        address = ipaddress.ip_address(value)
+    except ValueError:
+        return None
+    if address.version == 6 and address.ipv4_mapped is not None:
+        return address.ipv4_mapped
+    return address
+
+
+def forwarded_for(values) -> list:
+    """Client hops of RFC 7239 Forwarded header values, nearest proxy last"""
+    hops = []
+    for value in values:
+        for element in value.split(","):
+            hop = ""
+            for pair in element.split(";"):
+                name, _, token = pair.partition("=")
+                if name.strip().lower() == "for":
+                    hop = token
+            hops.append(hop)
+    return hops
+
+
+class ClientIdentity:
+    """
+    Works out the real client address of a request behind load balancers.
+    The forwarding header is only believed when the socket peer is a
+    trusted proxy; its hops are then walked from the nearest one back,
+    through any further trusted proxies, to the first address that isn't
+    trusted. Without trusted proxies this is just the peer address.
+
+    Rate limiting keys on rate_limit_key, which folds IPv6 addresses into
+    their /ipv6_prefix network: a single host usually holds a whole /64,
+    so limiting each address would let it rotate through them.
+    The trusted networks are compiled once (see NetworkSet) and each hop's
+    canonical form and trust are cached, so a request mostly pays for
+    splitting its header.
+    """
+
+    def __init__(self, trusted_proxies: str = "", header: str = "x-forwarded-for",
+                 ipv6_prefix: int = 64, cache_size: int = 50_000):
+        if header not in CLIENT_IP_HEADERS:
+            raise ValueError(f"Unknown client IP header: {header}")
+        if not 0 <= ipv6_prefix <= 128:
+            raise ValueError(f"Invalid IPv6 prefix length: {ipv6_prefix}")
+        self.trusted = parse_networks(trusted_proxies)
+        self.header = header
+        self.ipv6_prefix = ipv6_prefix
+        self.ipv6_mask = (1 << 128) - (1 << (128 - ipv6_prefix))
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+        self.rate_limit_key = lru_cache(maxsize=cache_size)(self._rate_limit_key)
+
+    def _resolve(self, value: str):
+        """(canonical address or None, whether it is a trusted proxy) for one hop"""
+        address = parse_address(value)
+        if address is None:
+            return None, False
+        return str(address), address in self.trusted
+
+    def _hops(self, headers) -> list:
+        values = headers.getlist(self.header)
+        if self.header == "forwarded":
+            return forwarded_for(values)
+        return [hop for value in values for hop in value.split(",")]
+
+    def client_ip(self, peer: str, headers) -> str:
+        """
+        Args:
+            peer: Socket peer address (request.client.host)
+            headers: Request headers with a getlist method
+        Returns:
+            str: The client address in canonical form, or peer unchanged when
+                it isn't an IP address (e.g. a test client)
+        """
+        client, trusted = self.resolve(peer) if peer else (None, False)
+        if client is None:
+            return peer
+        if not trusted:
+            return client
+        for hop in reversed(self._hops(headers)):
+            candidate, trusted = self.resolve(hop.strip())
+            if candidate is None:
+                # An unknown or malformed hop: the trusted proxy that added
+                # it is as close to the client as we can tell
+                break
+            client = candidate
+            if not trusted:
+                break
+        return client
+
+    def _rate_limit_key(self, client_ip: str) -> str:
+        """The client address, or its /ipv6_prefix network for IPv6"""
+        address = parse_address(client_ip)
+        if address is None or address.version == 4:
+            return client_ip
+        return f"{ipaddress.IPv6Address(int(address) & self.ipv6_mask)}/{self.ipv6_prefix}"
+
+
+def create_client_identity(trusted_proxies: str = "", header: str = "x-forwarded-for",
+                           ipv6_prefix: int = 64):
+    """Build the ClientIdentity for the configured proxies, logging what is trusted"""
+    identity = ClientIdentity(trusted_proxies, header=header.lower(), ipv6_prefix=ipv6_prefix)
+    if identity.trusted:
+        logger.info("Trusting %s from %d proxy networks", identity.header, len(identity.trusted))
+    return identity
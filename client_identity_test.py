@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Client Identity Testing for SNO Website
+Checks which address a request is attributed to behind proxies: spoofed
+forwarding headers, chains of trusted proxies, malformed or obfuscated
+Forwarded entries, and the IPv6 networks rate limiting keys on.
+"""
+
+from starlette.datastructures import Headers
+
+from client_identity import ClientIdentity
+
+TRUSTED = "10.0.0.0/8, 192.168.1.1, 2001:db8:ffff::/48"
+
+
+def _headers(name, *values):
+    """Request headers with name repeated once per value"""
+    return Headers(raw=[(name.encode("latin-1"), value.encode("latin-1")) for value in values])
+
+
+class ClientIdentityTester:
+    def __init__(self):
+        self.passed = 0
+        self.failed = 0
+
+    def record(self, ok, description):
+        if ok:
+            self.passed += 1
+            print(f"✅ {description}")
+        else:
+            self.failed += 1
+            print(f"❌ {description}")
+
+    def check(self, identity, peer, headers, expected, description):
+        client = identity.client_ip(peer, headers)
+        self.record(client == expected, f"{description}: {client} (expected {expected})")
+
+    def test_untrusted_peer(self):
+        print("\n🔍 Forwarding headers from untrusted peers...")
+        spoofed = _headers("x-forwarded-for", "1.2.3.4")
+        self.check(ClientIdentity(), "203.0.113.7", spoofed, "203.0.113.7",
+                   "No trusted proxies, header ignored")
+        self.check(ClientIdentity(TRUSTED), "203.0.113.7", spoofed, "203.0.113.7",
+                   "Untrusted peer, spoofed header ignored")
+        self.check(ClientIdentity(TRUSTED), "testclient", spoofed, "testclient",
+                   "Non-IP peer passed through unchanged")
+
+    def test_x_forwarded_for(self):
+        print("\n🔍 X-Forwarded-For through trusted proxies...")
+        identity = ClientIdentity(TRUSTED)
+        self.check(identity, "10.0.0.5", _headers("x-forwarded-for", "1.2.3.4, 198.51.100.7"), "198.51.100.7",
+                   "Spoofed leftmost hop ignored")
+        self.check(identity, "192.168.1.1", _headers("x-forwarded-for", "6.6.6.6, 198.51.100.7, 10.1.1.1, 10.2.2.2"),
+                   "198.51.100.7", "Chain of three trusted proxies walked back to the client")
+        self.check(identity, "192.168.1.1", _headers("x-forwarded-for", "6.6.6.6, 198.51.100.7", "10.1.1.1"),
+                   "198.51.100.7", "Repeated header lines read as one list")
+        self.check(identity, "10.0.0.5", _headers("x-forwarded-for", "10.1.1.1, 10.2.2.2"), "10.1.1.1",
+                   "Every hop trusted, farthest one used")
+        self.check(identity, "10.0.0.5", _headers("x-forwarded-for", "198.51.100.7, not-an-ip"), "10.0.0.5",
+                   "Malformed nearest hop, stops at the proxy that added it")
+        self.check(identity, "10.0.0.5", _headers("x-forwarded-for", " 198.51.100.7:5555 "), "198.51.100.7",
+                   "Port and whitespace stripped")
+        self.check(identity, "::ffff:10.0.0.5", _headers("x-forwarded-for", "198.51.100.7"), "198.51.100.7",
+                   "IPv4-mapped peer matched against IPv4 networks")
+        self.check(identity, "10.0.0.5", _headers("x-forwarded-for"), "10.0.0.5",
+                   "Trusted peer without header is the client")
+
+    def test_forwarded(self):
+        print("\n🔍 RFC 7239 Forwarded entries...")
+        identity = ClientIdentity(TRUSTED, header="forwarded")
+        self.check(identity, "10.0.0.5", _headers("forwarded", "for=192.0.2.60;proto=http;by=10.0.0.5"),
+                   "192.0.2.60", "for= among other parameters")
+        self.check(identity, "10.0.0.5", _headers("forwarded", 'For="[2001:db8:cafe::17]:4711"'),
+                   "2001:db8:cafe::17", "Quoted, bracketed IPv6 with port, case-insensitive name")
+        self.check(identity, "10.0.0.5", _headers("forwarded", 'for="192.0.2.43:47011", for=10.2.2.2'),
+                   "192.0.2.43", "Quoted IPv4 with port behind a trusted hop")
+        self.check(identity, "10.0.0.5", _headers("forwarded", "for=198.51.100.7", "for=_hidden"),
+                   "10.0.0.5", "Obfuscated identifier, stops at the proxy that added it")
+        self.check(identity, "10.0.0.5", _headers("forwarded", "for=198.51.100.7, for=unknown"),
+                   "10.0.0.5", "for=unknown, stops at the proxy that added it")
+        self.check(identity, "10.0.0.5", _headers("forwarded", "for=198.51.100.7, proto=https"),
+                   "10.0.0.5", "Element without for= treated as unknown")
+        self.check(identity, "10.0.0.5", _headers("forwarded", 'for="[2001:db8::1'),
+                   "10.0.0.5", "Unterminated bracket rejected")
+        self.check(identity, "10.0.0.5", _headers("x-forwarded-for", "198.51.100.7"),
+                   "10.0.0.5", "X-Forwarded-For ignored when Forwarded is configured")
+
+    def test_ipv6_prefix(self):
+        print("\n🔍 IPv6 rate limit keys...")
+        identity = ClientIdentity()
+        first = identity.rate_limit_key("2001:db8:1:2:aaaa::1")
+        second = identity.rate_limit_key("2001:db8:1:2:ffff:ffff:ffff:ffff")
+        self.record(first == second == "2001:db8:1:2::/64",
+                    f"Addresses in one /64 share a key: {first}, {second}")
+        other = identity.rate_limit_key("2001:db8:1:3::1")
+        self.record(other == "2001:db8:1:3::/64" and other != first, f"Next /64 gets its own key: {other}")
+        key = identity.rate_limit_key("203.0.113.7")
+        self.record(key == "203.0.113.7", f"IPv4 address kept as is: {key}")
+        key = ClientIdentity(ipv6_prefix=48).rate_limit_key("2001:db8:1:2::1")
+        self.record(key == "2001:db8:1::/48", f"Configurable prefix length: {key}")
+        key = ClientIdentity(ipv6_prefix=128).rate_limit_key("2001:db8::1")
+        self.record(key == "2001:db8::1/128", f"/128 keys each address: {key}")
+        key = identity.rate_limit_key("testclient")
+        self.record(key == "testclient", f"Non-IP identifier kept as is: {key}")
+
+    def test_configuration(self):
+        print("\n🔍 Configuration errors...")
+        for kwargs, description in (
+            ({"header": "x-real-ip"}, "Unknown header rejected"),
+            ({"ipv6_prefix": 129}, "IPv6 prefix over 128 rejected"),
+            ({"trusted_proxies": "10.0.0.0/8, not-a-network"}, "Invalid trusted network rejected"),
+        ):
+            try:
+                ClientIdentity(**kwargs)
+                self.record(False, description)
+            except ValueError:
+                self.record(True, description)
+
+    def run_all_tests(self):
+        self.test_untrusted_peer()
+        self.test_x_forwarded_for()
+        self.test_forwarded()
+        self.test_ipv6_prefix()
+        self.test_configuration()
+        print(f"\n📊 {self.passed} passed, {self.failed} failed")
+        return self.failed == 0
+
+
+def main():
+    tester = ClientIdentityTester()
+    return 0 if tester.run_all_tests() else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,129 @@
+import base64
+import csv
+import io
+import json
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Columns handed to sales, in order; everything else stays in MongoDB
+EXPORT_FIELDS = ("id", "timestamp", "name", "email", "message")
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+# Spreadsheet apps run cells starting with these as formulas
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def encode_cursor(document: dict) -> str:
+    """Opaque resume token pointing just after a submission"""
+    raw = f"{document['timestamp'].isoformat()}|{document['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str):
+    """
+    Inverse of encode_cursor
+    Returns:
+        tuple: (timestamp, id) of the last submission already seen
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        timestamp, submission_id = raw.split("|", 1)
+        return datetime.fromisoformat(timestamp), submission_id
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {token!r}") from e
+
+
+def after_cursor(token: str, descending: bool = False) -> dict:
+    """Keyset filter for the submissions after a cursor in (timestamp, id) order"""
+    timestamp, submission_id = decode_cursor(token)
+    beyond = "$lt" if descending else "$gt"
+    return {"$or": [
+        {"timestamp": {beyond: timestamp}},
+        {"timestamp": timestamp, "id": {beyond: submission_id}},
+    ]}
+
+
+def _spreadsheet_safe(value: str) -> str:
+    return "'" + value if value.startswith(FORMULA_PREFIXES) else value
+
+
+class SubmissionExporter:
+    """
+    Streams contact submissions oldest first as CSV or NDJSON. Documents come
+    off a Motor cursor in batches of batch_size, only the exported fields
+    are projected, and output is flushed once per batch, so memory stays flat
+    however many submissions there are. Every row carries a cursor token; a
+    client cut off mid-download passes the last one it got to resume.
+    Ordering by (timestamp, id) follows the timestamp_id index, so MongoDB
+    never sorts in memory.
+    """
+
+    def __init__(self, collection, batch_size: int = 1000):
+        self.collection = collection
+        self.batch_size = batch_size
+
+    def documents(self, since: datetime = None, cursor: str = None):
+        """Motor cursor over the submissions to export"""
+        conditions = []
+        if since is not None:
+            conditions.append({"timestamp": {"$gte": since}})
+        if cursor is not None:
+            conditions.append(after_cursor(cursor))
+        query = {"$and": conditions} if len(conditions) > 1 else (conditions[0] if conditions else {})
+        projection = {"_id": 0, **{field: 1 for field in EXPORT_FIELDS}}
+        return (self.collection.find(query, projection)
+                .sort([("timestamp", 1), ("id", 1)])
+                .batch_size(self.batch_size))
+
+    async def stream(self, export_format: str, since: datetime = None, cursor: str = None):
+        """
+        Yield the export in chunks of up to batch_size rows
+        Args:
+            export_format: "csv" or "ndjson"
+            since: Only submissions from this naive UTC time on
+            cursor: Resume after the row carrying this token; the CSV
+                header is left out so the output can be appended
+        """
+        documents = self.documents(since, cursor)
+        buffer = io.StringIO()
+        if export_format == "csv":
+            writer = csv.writer(buffer)
+            if cursor is None:
+                writer.writerow((*EXPORT_FIELDS, "cursor"))
+
+            def write(document):
+                writer.writerow((
+                    document.get("id", ""),
+                    document["timestamp"].isoformat(),
+                    _spreadsheet_safe(document.get("name", "")),
+                    _spreadsheet_safe(document.get("email", "")),
+                    _spreadsheet_safe(document.get("message", "")),
+                    encode_cursor(document),
+                ))
+        elif export_format == "ndjson":
+            def write(document):
+                row = {field: document.get(field) for field in EXPORT_FIELDS}
+                row["timestamp"] = document["timestamp"].isoformat()
+                row["cursor"] = encode_cursor(document)
+                buffer.write(json.dumps(row, ensure_ascii=False))
+                buffer.write("\n")
+        else:
+            raise ValueError(f"Unknown export format: {export_format}")
+
+        rows = 0
+        async for document in documents:
+            write(document)
+            rows += 1
+            if rows % self.batch_size == 0:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+        logger.info("Exported %d contact submissions as %s", rows, export_format)
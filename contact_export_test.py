@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Contact Export Testing for SNO Website
+Checks that CSV exports neutralize spreadsheet formulas in submitted
+fields while NDJSON keeps values verbatim, and that an export cut off
+midway resumes from a row's cursor without gaps or repeats.
+Uses MongoDB at MONGO_URL when reachable, otherwise mongomock-motor.
+"""
+
+import asyncio
+import csv
+import io
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+from contact_export import EXPORT_FIELDS, SubmissionExporter
+
+load_dotenv('/app/backend/.env')
+
+MONGO_URL = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+
+# (name, email, message): every cell starting with a formula prefix
+DANGEROUS = [
+    ("=HYPERLINK(\"http://evil.example\",\"Clique\")", "ana@example.com", "=1+1"),
+    ("+55 11 96329-0107", "+bia@example.com", "+cmd|' /C calc'!A0"),
+    ("-Carlos", "-carlos@example.com", "-2+3"),
+    ("@SUM(A1:A2)", "@dani@example.com", "@SUM(1,1)"),
+    ("\tEduardo", "\teduardo@example.com", "\t=1+1"),
+    ("\rFernanda", "\rfernanda@example.com", "\r=1+1"),
+]
+# Formula characters that aren't leading are left alone
+HARMLESS = [
+    ("Ana Silva", "ana.silva@example.com", "Orçamento de 1+1 páginas = R$ 2.000, prazo 10-15 dias"),
+    ("'Aspas", "gui@example.com", "Mensagem com \"aspas\", vírgulas e\nquebra de linha"),
+]
+
+
+async def get_collection():
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=1000)
+        await client.admin.command('ping')
+        print("✅ Using MongoDB at", MONGO_URL)
+        return client[f"contact_export_test_{time.time_ns()}"].contact_submissions
+    except Exception:
+        from mongomock_motor import AsyncMongoMockClient
+        print("⚠️ MongoDB not available, using mongomock-motor")
+        return AsyncMongoMockClient()["contact_export_test"].contact_submissions
+
+
+async def export(exporter, export_format, cursor=None):
+    chunks = [chunk async for chunk in exporter.stream(export_format, cursor=cursor)]
+    return b"".join(chunks).decode("utf-8")
+
+
+class ContactExportTester:
+    def __init__(self):
+        self.passed = 0
+        self.failed = 0
+
+    def record(self, ok, description):
+        if ok:
+            self.passed += 1
+            print(f"✅ {description}")
+        else:
+            self.failed += 1
+            print(f"❌ {description}")
+
+    async def test_formula_escaping(self, exporter, documents):
+        print("\n🔍 Formula injection in CSV...")
+        rows = list(csv.reader(io.StringIO(await export(exporter, "csv"), newline="")))
+        self.record(rows[0] == [*EXPORT_FIELDS, "cursor"], f"Header: {rows[0]}")
+        by_id = {row[0]: dict(zip(rows[0], row)) for row in rows[1:]}
+        for document in documents:
+            row = by_id[document["id"]]
+            for field in ("name", "email", "message"):
+                value = document[field]
+                expected = "'" + value if value[:1] in ("=", "+", "-", "@", "\t", "\r") else value
+                self.record(row[field] == expected, f"{field} {value[:12]!r} exported as {row[field][:13]!r}")
+
+    async def test_ndjson_verbatim(self, exporter, documents):
+        print("\n🔍 NDJSON keeps values as submitted...")
+        rows = {row["id"]: row for row in map(json.loads, (await export(exporter, "ndjson")).splitlines())}
+        changed = [document["id"] for document in documents
+                   if any(rows[document["id"]][field] != document[field] for field in ("name", "email", "message"))]
+        self.record(len(rows) == len(documents) and not changed,
+                    f"{len(rows)} rows, {len(changed)} with altered values")
+
+    async def test_resume(self, exporter, documents):
+        print("\n🔍 Resuming a cut-off export...")
+        rows = list(csv.reader(io.StringIO(await export(exporter, "csv"), newline="")))[1:]
+        cut = len(rows) // 2
+        resumed = list(csv.reader(io.StringIO(await export(exporter, "csv", cursor=rows[cut - 1][-1]), newline="")))
+        self.record(rows[:cut] + resumed == rows,
+                    f"Resumed after row {cut} without header, gaps or repeats: {len(resumed)} more rows")
+
+    async def run_all_tests(self):
+        collection = await get_collection()
+        start = datetime(2026, 1, 1)
+        documents = [
+            {"id": f"sub-{i:02d}", "name": name, "email": email, "message": message,
+             "timestamp": start + timedelta(minutes=i), "ip_address": "203.0.113.7"}
+            for i, (name, email, message) in enumerate(DANGEROUS + HARMLESS)
+        ]
+        await collection.insert_many([dict(document) for document in documents])
+        exporter = SubmissionExporter(collection, batch_size=3)
+
+        await self.test_formula_escaping(exporter, documents)
+        await self.test_ndjson_verbatim(exporter, documents)
+        await self.test_resume(exporter, documents)
+        await collection.drop()
+        print(f"\n📊 {self.passed} passed, {self.failed} failed")
+        return self.failed == 0
+
+
+def main():
+    tester = ContactExportTester()
+    return 0 if asyncio.run(tester.run_all_tests()) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,72 @@
+from datetime import datetime
+
+from contact_export import after_cursor, encode_cursor
+
+# Fields an admin may ask for; id and timestamp are always returned since
+# the next page's cursor is built from them
+LISTING_FIELDS = ("id", "timestamp", "name", "email", "message", "ip_address", "user_agent", "spam_reasons")
+MAX_PAGE_SIZE = 200
+
+
+class SubmissionListing:
+    """
+    Newest-first pages of contact submissions with keyset pagination on
+    (timestamp, id). A page resumes after the previous page's last row
+    instead of skipping rows, so each page costs one index seek plus the
+    page itself however deep it is. Every filter combination has an index
+    ending in (timestamp, id): timestamp_id, email_timestamp_id and
+    ip_address_timestamp_id.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def page(self, limit: int = 50, cursor: str = None, start: datetime = None,
+                   end: datetime = None, email: str = None, ip_address: str = None,
+                   fields=None):
+        """
+        Fetch one page
+        Args:
+            limit: Page size, at most MAX_PAGE_SIZE
+            cursor: next_cursor of the previous page
+            start, end: Naive UTC bounds on the timestamp, end exclusive
+            email, ip_address: Exact matches
+            fields: Fields to return, all of LISTING_FIELDS by default
+        Returns:
+            dict: {"items": [...], "next_cursor": token or None on the last page}
+        Raises:
+            ValueError: On a malformed cursor or unknown field
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        conditions = []
+        if email is not None:
+            conditions.append({"email": email})
+        if ip_address is not None:
+            conditions.append({"ip_address": ip_address})
+        if start is not None or end is not None:
+            bounds = {}
+            if start is not None:
+                bounds["$gte"] = start
+            if end is not None:
+                bounds["$lt"] = end
+            conditions.append({"timestamp": bounds})
+        if cursor is not None:
+            conditions.append(after_cursor(cursor, descending=True))
+        query = {"$and": conditions} if len(conditions) > 1 else (conditions[0] if conditions else {})
+
+        fields = fields or LISTING_FIELDS
+        unknown = set(fields) - set(LISTING_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        projection = {"_id": 0, "id": 1, "timestamp": 1, **{field: 1 for field in fields}}
+
+        # One extra row tells whether another page follows
+        items = await (self.collection.find(query, projection)
+                       .sort([("timestamp", -1), ("id", -1)])
+                       .limit(limit + 1)
+                       .to_list(limit + 1))
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = encode_cursor(items[-1])
+        return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Contact Listing Testing for SNO Website
+Checks that keyset pages over submissions sharing a timestamp neither skip
+nor repeat rows, that filters and field selection apply to every page,
+and that /api/contact/submissions is admin only and answers a malformed
+cursor with 400.
+Uses MongoDB at MONGO_URL when reachable, otherwise mongomock-motor.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+from contact_listing import SubmissionListing
+
+load_dotenv('/app/backend/.env')
+
+MONGO_URL = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+ADMIN_KEY = "listing-test-key"
+START = datetime(2026, 3, 4, 9, 30)
+
+
+async def get_database():
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=1000)
+        await client.admin.command('ping')
+        print("✅ Using MongoDB at", MONGO_URL)
+        return client[f"contact_listing_test_{time.time_ns()}"], True
+    except Exception:
+        from mongomock_motor import AsyncMongoMockClient
+        print("⚠️ MongoDB not available, using mongomock-motor")
+        return AsyncMongoMockClient()[f"contact_listing_test_{time.time_ns()}"], False
+
+
+def _submission(timestamp, email="ana@example.com", ip_address="203.0.113.7"):
+    return {
+        "id": str(uuid.uuid4()),
+        "name": "Teste Listagem",
+        "email": email,
+        "message": "Mensagem de teste da listagem.",
+        "ip_address": ip_address,
+        "user_agent": "listing-test",
+        "timestamp": timestamp,
+    }
+
+
+class ContactListingTester:
+    def __init__(self):
+        self.passed = 0
+        self.failed = 0
+
+    def record(self, ok, description):
+        if ok:
+            self.passed += 1
+            print(f"✅ {description}")
+        else:
+            self.failed += 1
+            print(f"❌ {description}")
+
+    async def walk(self, listing, limit, **filters):
+        """Follow next_cursor to the last page, returning the pages' ids"""
+        pages = []
+        cursor = None
+        while True:
+            page = await listing.page(limit=limit, cursor=cursor, **filters)
+            pages.append([item["id"] for item in page["items"]])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return pages
+
+    async def test_identical_timestamps(self, db):
+        print("\n🔍 Keyset pages over identical timestamps...")
+        # Ten submissions share each timestamp, so pages split inside a tie
+        documents = [_submission(START + timedelta(minutes=n // 10)) for n in range(47)]
+        await db.contact_submissions.insert_many(documents)
+        listing = SubmissionListing(db.contact_submissions)
+        expected = [document["id"] for document in
+                    sorted(documents, key=lambda document: (document["timestamp"], document["id"]), reverse=True)]
+        for limit in (1, 3, 7, 10, 50):
+            pages = await self.walk(listing, limit)
+            seen = [submission_id for page in pages for submission_id in page]
+            self.record(seen == expected and all(len(page) == limit for page in pages[:-1]),
+                        f"limit={limit}: {len(pages)} pages, {len(seen)} rows, none skipped or repeated")
+        last = await listing.page(limit=47)
+        self.record(last["next_cursor"] is None, "No cursor when the page ends exactly at the last row")
+
+    async def test_filters_and_fields(self, db):
+        print("\n🔍 Filters and fields...")
+        await db.contact_submissions.insert_many(
+            [_submission(START + timedelta(hours=n // 2), email="bia@example.com") for n in range(9)]
+            + [_submission(START + timedelta(hours=n // 2), ip_address="198.51.100.1") for n in range(5)]
+        )
+        listing = SubmissionListing(db.contact_submissions)
+        pages = await self.walk(listing, 2, email="bia@example.com")
+        self.record(sum(len(page) for page in pages) == 9, f"email filter held across {len(pages)} pages")
+        pages = await self.walk(listing, 2, ip_address="198.51.100.1")
+        self.record(sum(len(page) for page in pages) == 5, f"ip filter held across {len(pages)} pages")
+        pages = await self.walk(listing, 4, email="bia@example.com",
+                                start=START + timedelta(hours=1), end=START + timedelta(hours=3))
+        self.record(sum(len(page) for page in pages) == 4, "start inclusive, end exclusive")
+
+        page = await listing.page(limit=3, fields=["name"])
+        self.record(all(set(item) == {"id", "timestamp", "name"} for item in page["items"]),
+                    f"Only the chosen fields plus id and timestamp: {sorted(page['items'][0])}")
+        try:
+            await listing.page(fields=["name", "password"])
+            self.record(False, "Unknown field accepted")
+        except ValueError:
+            self.record(True, "Unknown field rejected")
+
+    async def test_route(self, db):
+        print("\n🔍 /api/contact/submissions...")
+        import httpx
+        import server
+
+        os.environ.setdefault('MONGO_URL', MONGO_URL)
+        os.environ.setdefault('DB_NAME', 'contact_listing_test')
+        os.environ['RESPONSE_CACHE_BACKEND'] = 'off'
+        os.environ.pop('ADMIN_API_KEY', None)
+        app = server.create_app()
+        app.state.submission_listing = SubmissionListing(db.contact_submissions)
+        headers = {"X-API-Key": ADMIN_KEY}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/api/contact/submissions", headers=headers)
+            self.record(response.status_code == 403, f"Closed while no admin key is configured: {response.status_code}")
+
+            os.environ['ADMIN_API_KEY'] = ADMIN_KEY
+            response = await client.get("/api/contact/submissions")
+            self.record(response.status_code == 401, f"No key: {response.status_code}")
+            response = await client.get("/api/contact/submissions", headers={"X-API-Key": "wrong"})
+            self.record(response.status_code == 401, f"Wrong key: {response.status_code}")
+
+            response = await client.get("/api/contact/submissions", params={"limit": 5}, headers=headers)
+            body = response.json()
+            self.record(response.status_code == 200 and len(body["items"]) == 5 and body["next_cursor"],
+                        f"Admin gets a page: {response.status_code}, {len(body['items'])} items")
+            response = await client.get("/api/contact/submissions",
+                                        params={"limit": 5, "cursor": body["next_cursor"]}, headers=headers)
+            following = response.json()["items"]
+            self.record(response.status_code == 200 and not {item["id"] for item in following} & {item["id"] for item in body["items"]},
+                        "next_cursor resumes after the first page")
+
+            for cursor in ("not-a-cursor", "!!!", "bm8gc2VwYXJhdG9y"):
+                response = await client.get("/api/contact/submissions", params={"cursor": cursor}, headers=headers)
+                self.record(response.status_code == 400, f"Malformed cursor {cursor!r}: {response.status_code}")
+            response = await client.get("/api/contact/submissions", params={"fields": "name,password"}, headers=headers)
+            self.record(response.status_code == 400, f"Unknown field: {response.status_code}")
+            response = await client.get("/api/contact/submissions", params={"limit": 1000}, headers=headers)
+            self.record(response.status_code == 422, f"limit above MAX_PAGE_SIZE: {response.status_code}")
+
+    async def run_all_tests(self):
+        db, real_mongo = await get_database()
+        await self.test_identical_timestamps(db)
+        await db.drop_collection("contact_submissions")
+        await self.test_filters_and_fields(db)
+        await self.test_route(db)
+        if real_mongo:
+            await db.client.drop_database(db.name)
+        print(f"\n📊 {self.passed} passed, {self.failed} failed")
+        return self.failed == 0
+
+
+def main():
+    tester = ContactListingTester()
+    return 0 if asyncio.run(tester.run_all_tests()) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
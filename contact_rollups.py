@@ -0,0 +1,144 @@
+import ipaddress
+import logging
+from datetime import datetime, timedelta, timezone
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = ("hour", "day", "week")
+GROUPS = ("email_domain", "ip_prefix")
+# Per-dimension rollups are kept per day and week only; hourly ones would
+# multiply the rollups an attacker can create by rotating addresses
+GROUPED_BUCKETS = ("day", "week")
+
+# Distinct email domains or IP prefixes counted in one bucket before the
+# rest are lumped together as OTHER
+MAX_GROUP_VALUES = 1000
+OTHER = "other"
+
+# Cap on buckets per query so a single request can't ask for years of hours
+MAX_BUCKETS = 2000
+
+
+def bucket_start(timestamp: datetime, bucket: str) -> datetime:
+    """Start of the hour, day or ISO week (Monday) containing timestamp"""
+    start = timestamp.replace(minute=0, second=0, microsecond=0)
+    if bucket == "hour":
+        return start
+    start = start.replace(hour=0)
+    if bucket == "day":
+        return start
+    return start - timedelta(days=start.weekday())
+
+
+def as_utc(timestamp: datetime) -> datetime:
+    """Naive UTC datetime, the form timestamps are stored in"""
+    if timestamp.tzinfo is None:
+        return timestamp
+    return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+BUCKET_SIZES = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+}
+
+
+def email_domain(email: str) -> str:
+    return email.rsplit("@", 1)[-1].lower() if email else "unknown"
+
+
+def ip_prefix(ip_address: str) -> str:
+    """IPv4 /24 or IPv6 /48 network of an address"""
+    try:
+        address = ipaddress.ip_address(ip_address)
+    except (TypeError, ValueError):
+        return "unknown"
+    prefix = 24 if address.version == 4 else 48
+    return str(ipaddress.ip_network(f"{address}/{prefix}", strict=False))
+
+
+class ContactRollups:
+    """
+    Submission counts pre-aggregated at write time.
+    Each submission increments one document per bucket size (hour, day,
+    week), plus one per email domain and IP prefix for days and weeks, so
+    time series queries read a handful of rollups instead of raw submissions.
+
+    Domains and prefixes come from clients, so each process counts at most
+    max_group_values distinct ones per bucket and files the rest under
+    OTHER. The tally lives in memory: with several workers, or after a
+    restart, a bucket can hold a few times that many.
+    """
+
+    def __init__(self, db, max_group_values: int = MAX_GROUP_VALUES):
+        self.collection = db.contact_rollups
+        self.max_group_values = max_group_values
+        # (bucket, dimension) -> {bucket start: values seen}, latest two starts
+        self._seen = {}
+
+    def _group_value(self, bucket: str, start: datetime, dimension: str, value: str) -> str:
+        """value, or OTHER once the bucket already counts max_group_values others"""
+        starts = self._seen.setdefault((bucket, dimension), {})
+        values = starts.get(start)
+        if values is None:
+            values = starts[start] = set()
+            if len(starts) > 2:
+                del starts[min(starts)]
+        if value not in values:
+            if len(values) >= self.max_group_values:
+                return OTHER
+            values.add(value)
+        return value
+
+    def updates_for(self, submission: dict):
+        """Rollup upserts for one stored submission"""
+        groups = {
+            "email_domain": email_domain(submission.get("email")),
+            "ip_prefix": ip_prefix(submission.get("ip_address")),
+        }
+        updates = []
+        for bucket in BUCKETS:
+            start = bucket_start(submission["timestamp"], bucket)
+            dimensions = {"all": "all"}
+            if bucket in GROUPED_BUCKETS:
+                for dimension, value in groups.items():
+                    dimensions[dimension] = self._group_value(bucket, start, dimension, value)
+            for dimension, value in dimensions.items():
+                updates.append(UpdateOne(
+                    {"_id": f"{bucket}|{start.isoformat()}|{dimension}|{value}"},
+                    {"$inc": {"count": 1},
+                     "$setOnInsert": {"bucket": bucket, "start": start,
+                                      "dimension": dimension, "value": value}},
+                    upsert=True,
+                ))
+        return updates
+
+    async def record(self, submission: dict):
+        """Add a submission to its rollups in a single bulk write"""
+        await self.collection.bulk_write(self.updates_for(submission), ordered=False)
+
+    async def timeseries(self, start: datetime, end: datetime, bucket: str = "day",
+                         group_by: str = None):
+        """
+        Submission counts per bucket between start (inclusive) and end (exclusive)
+        Returns:
+            list: {"timestamp", "count"} per bucket with submissions, plus
+                "key" when grouped; empty buckets are omitted
+        """
+        pipeline = [
+            {"$match": {
+                "bucket": bucket,
+                "dimension": group_by or "all",
+                "start": {"$gte": bucket_start(start, bucket), "$lt": end},
+            }},
+            {"$sort": {"start": 1, "value": 1}},
+            {"$project": {"_id": 0, "timestamp": "$start", "key": "$value", "count": 1}},
+        ]
+        series = []
+        async for point in self.collection.aggregate(pipeline):
+            if not group_by:
+                point.pop("key", None)
+            series.append(point)
+        return series
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Contact Rollups Testing for SNO Website
+Checks hourly, daily and weekly rollups against counts taken from the
+submissions themselves, the cap on distinct email domains and IP prefixes
+per bucket, and /api/contact/stats/timeseries: its range checks, the
+admin-only grouping, and that only stored submissions are counted.
+Uses MongoDB at MONGO_URL when reachable, otherwise mongomock-motor.
+"""
+
+import asyncio
+import os
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+from contact_rollups import GROUPED_BUCKETS, OTHER, ContactRollups, bucket_start, email_domain
+
+load_dotenv('/app/backend/.env')
+
+MONGO_URL = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+ADMIN_KEY = "chave-de-teste-rollups"
+
+# A Wednesday, so the weekly buckets start on a Monday in the middle of the data
+START = datetime(2026, 3, 4, 9, 30)
+DOMAINS = ("example.com", "exemplo.com.br", "empresa.com", "gmail.com")
+
+SAMPLE_FORM = {
+    "name": "Teste Rollups",
+    "email": "test.rollups@example.com",
+    "message": "Mensagem de teste das estatísticas por período.",
+}
+
+
+async def get_database():
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=1000)
+        await client.admin.command('ping')
+        print("✅ Using MongoDB at", MONGO_URL)
+        return client[f"contact_rollups_test_{time.time_ns()}"], True
+    except Exception:
+        from mongomock_motor import AsyncMongoMockClient
+        print("⚠️ MongoDB not available, using mongomock-motor")
+        return AsyncMongoMockClient()[f"contact_rollups_test_{time.time_ns()}"], False
+
+
+def _submissions(count=400):
+    """Submissions spread over three weeks from START"""
+    rng = random.Random(9)
+    return [{
+        "id": f"sub-{i:04d}",
+        "email": f"cliente{i}@{rng.choice(DOMAINS)}",
+        "ip_address": f"203.0.{rng.randrange(3)}.{rng.randrange(1, 250)}",
+        "timestamp": START + timedelta(minutes=rng.uniform(0, 21 * 24 * 60)),
+    } for i in range(count)]
+
+
+class ContactRollupsTester:
+    def __init__(self):
+        self.passed = 0
+        self.failed = 0
+
+    def record(self, ok, description):
+        if ok:
+            self.passed += 1
+            print(f"✅ {description}")
+        else:
+            self.failed += 1
+            print(f"❌ {description}")
+
+    async def test_buckets(self, db):
+        print("\n🔍 Hourly, daily and weekly rollups...")
+        await db.drop_collection("contact_rollups")
+        rollups = ContactRollups(db)
+        submissions = _submissions()
+        for submission in submissions:
+            await rollups.record(submission)
+        end = max(submission["timestamp"] for submission in submissions) + timedelta(seconds=1)
+
+        for bucket in ("hour", "day", "week"):
+            expected = Counter(bucket_start(submission["timestamp"], bucket) for submission in submissions)
+            series = await rollups.timeseries(START, end, bucket=bucket)
+            self.record(series == [{"timestamp": start, "count": count} for start, count in sorted(expected.items())],
+                        f"{bucket}: {len(series)} buckets, {sum(point['count'] for point in series)} submissions")
+
+        for bucket in GROUPED_BUCKETS:
+            expected = Counter((bucket_start(submission["timestamp"], bucket), email_domain(submission["email"]))
+                               for submission in submissions)
+            series = await rollups.timeseries(START, end, bucket=bucket, group_by="email_domain")
+            self.record(series == [{"timestamp": start, "key": key, "count": count}
+                                   for (start, key), count in sorted(expected.items())],
+                        f"{bucket} per email domain: {len(series)} points")
+        series = await rollups.timeseries(START, end, bucket="week", group_by="ip_prefix")
+        self.record({point["key"] for point in series} == {"203.0.0.0/24", "203.0.1.0/24", "203.0.2.0/24"},
+                    f"Weeks per IP prefix: {sorted({point['key'] for point in series})}")
+
+        hourly_grouped = await db.contact_rollups.count_documents({"bucket": "hour", "dimension": {"$ne": "all"}})
+        self.record(hourly_grouped == 0, f"No hourly rollups per domain or prefix: {hourly_grouped}")
+
+        monday = bucket_start(START, "week")
+        series = await rollups.timeseries(START + timedelta(days=7), START + timedelta(days=8), bucket="week")
+        self.record([point["timestamp"] for point in series] == [monday + timedelta(days=7)],
+                    f"A range inside a week returns that week: {series}")
+
+    async def test_group_cap(self, db):
+        print("\n🔍 Distinct values per bucket...")
+        await db.drop_collection("contact_rollups")
+        rollups = ContactRollups(db, max_group_values=3)
+        day = datetime(2026, 3, 9, 12)
+        for i in range(6):
+            await rollups.record({"email": f"a@dominio{i}.com", "ip_address": "203.0.113.7", "timestamp": day})
+        # A domain counted before the cap keeps being counted under its name
+        await rollups.record({"email": "b@dominio0.com", "ip_address": "203.0.113.7", "timestamp": day})
+        series = await rollups.timeseries(day, day + timedelta(days=1), group_by="email_domain")
+        counts = {point["key"]: point["count"] for point in series}
+        self.record(counts == {"dominio0.com": 2, "dominio1.com": 1, "dominio2.com": 1, OTHER: 3},
+                    f"Domains beyond max_group_values lumped as {OTHER}: {counts}")
+        series = await rollups.timeseries(day, day + timedelta(days=1), group_by="ip_prefix")
+        self.record([(point["key"], point["count"]) for point in series] == [("203.0.113.0/24", 7)],
+                    "Other dimensions count on their own")
+
+        next_day = day + timedelta(days=1)
+        await rollups.record({"email": "a@dominio5.com", "ip_address": "203.0.113.7", "timestamp": next_day})
+        series = await rollups.timeseries(next_day, next_day + timedelta(days=1), group_by="email_domain")
+        self.record([point["key"] for point in series] == ["dominio5.com"], "Each day gets its own allowance")
+        self.record(all(len(starts) <= 2 for starts in rollups._seen.values()),
+                    f"Only the latest two buckets tracked: {[len(starts) for starts in rollups._seen.values()]}")
+
+    async def test_route(self, db):
+        print("\n🔍 /api/contact/stats/timeseries...")
+        import httpx
+        import server
+        from contact_stats import ContactStats
+        from email_queue import EmailDeliveryQueue
+        from email_service import EmailService
+        from submission_buffer import SubmissionWriter
+
+        os.environ.setdefault('MONGO_URL', MONGO_URL)
+        os.environ.setdefault('DB_NAME', 'contact_rollups_test')
+        os.environ['ADMIN_API_KEY'] = ADMIN_KEY
+        os.environ['RESPONSE_CACHE_BACKEND'] = 'off'
+        os.environ['SPAM_FILTER_ENABLED'] = 'false'
+        os.environ['SEARCH_BACKEND'] = 'off'
+        app = server.create_app()
+        for name in ("contact_rollups", "contact_submissions", "email_outbox"):
+            await db.drop_collection(name)
+        state = app.state
+        state.contact_rollups = ContactRollups(db)
+        state.submission_writer = SubmissionWriter(db.contact_submissions)
+        state.email_queue = EmailDeliveryQueue(db, EmailService())
+        state.contact_stats = ContactStats(db)
+
+        now = datetime.utcnow()
+        for submission in _submissions(50):
+            await state.contact_rollups.record({**submission, "timestamp": now - (submission["timestamp"] - START) / 4})
+        admin = {"X-API-Key": ADMIN_KEY}
+
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            async def timeseries(headers=None, **params):
+                return await client.get("/api/contact/stats/timeseries", params=params, headers=headers)
+
+            for bucket in ("hour", "day", "week"):
+                response = await timeseries(bucket=bucket)
+                body = response.json()
+                self.record(response.status_code == 200 and body["bucket"] == bucket
+                            and all("key" not in point for point in body["series"]),
+                            f"bucket={bucket} open to everyone: {response.status_code}, {len(body.get('series', []))} points")
+
+            for label, headers in (("No key", None), ("Wrong key", {"X-API-Key": "errada"})):
+                response = await timeseries(headers, group_by="email_domain")
+                self.record(response.status_code == 401, f"{label} asking for group_by: {response.status_code}")
+            response = await timeseries(admin, group_by="email_domain", bucket="week")
+            body = response.json()
+            self.record(response.status_code == 200 and body["group_by"] == "email_domain"
+                        and {point["key"] for point in body["series"]} <= set(DOMAINS),
+                        f"Admin grouped by email domain: {response.status_code}, {len(body['series'])} points")
+            response = await timeseries(admin, group_by="ip_prefix", bucket="hour")
+            self.record(response.status_code == 400, f"Hourly grouping refused: {response.status_code}")
+
+            os.environ.pop('ADMIN_API_KEY')
+            response = await timeseries(admin, group_by="email_domain")
+            self.record(response.status_code == 403, f"Grouping closed without ADMIN_API_KEY: {response.status_code}")
+            os.environ['ADMIN_API_KEY'] = ADMIN_KEY
+
+            response = await timeseries(bucket="day", start=now.isoformat(), end=(now - timedelta(days=1)).isoformat())
+            self.record(response.status_code == 400, f"Start after end: {response.status_code}")
+            response = await timeseries(bucket="hour", start=(now - timedelta(days=365)).isoformat(), end=now.isoformat())
+            self.record(response.status_code == 400, f"A year of hours: {response.status_code}")
+            response = await timeseries(bucket="hourly")
+            self.record(response.status_code == 422, f"Unknown bucket: {response.status_code}")
+
+            await self.check_stored_only(client, db, state)
+
+    async def check_stored_only(self, client, db, state):
+        print("\n🔍 Rollups count stored submissions only...")
+        await db.drop_collection("contact_rollups")
+
+        async def total():
+            return sum(point["count"] for point in await state.contact_rollups.timeseries(
+                datetime.utcnow() - timedelta(days=1), datetime.utcnow() + timedelta(days=1)))
+
+        writer, rollups = state.submission_writer, state.contact_rollups
+
+        async def failing(*args):
+            raise RuntimeError("write failed")
+
+        writer.insert = failing
+        response = await client.post("/api/contact", json=SAMPLE_FORM)
+        self.record(response.status_code == 500 and await total() == 0,
+                    f"Failed insert not counted: {response.status_code}, {await total()} counted")
+        del writer.insert
+
+        rollups.record = failing
+        response = await client.post("/api/contact", json=SAMPLE_FORM)
+        stored = await db.contact_submissions.count_documents({})
+        self.record(response.status_code == 200 and stored == 1,
+                    f"Failed rollup update doesn't fail a stored submission: {response.status_code}, {stored} stored")
+        del rollups.record
+
+        response = await client.post("/api/contact", json=SAMPLE_FORM)
+        self.record(response.status_code == 200 and await total() == 1,
+                    f"Stored submission counted: {await total()}")
+
+    async def run_all_tests(self):
+        db, real_mongo = await get_database()
+        await self.test_buckets(db)
+        await self.test_group_cap(db)
+        await self.test_route(db)
+        if real_mongo:
+            await db.client.drop_database(db.name)
+        print(f"\n📊 {self.passed} passed, {self.failed} failed")
+        return self.failed == 0
+
+
+def main():
+    tester = ContactRollupsTester()
+    return 0 if asyncio.run(tester.run_all_tests()) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,386 @@
+import asyncio
+import base64
+import heapq
+import logging
+import math
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+
+from spam_filter import WORD_PATTERN
+
+logger = logging.getLogger(__name__)
+
+SEARCH_FIELDS = ("id", "timestamp", "name", "email", "message")
+# Relative weight of a match in each field, the same for both backends
+FIELD_WEIGHTS = {"name": 5, "email": 5, "message": 1}
+MAX_SEARCH_PAGE_SIZE = 100
+# Ranked results can't resume from a keyset, so pages skip the ones already
+# seen; past this many results the query should be refined instead
+MAX_SEARCH_RESULTS = 1000
+MAX_QUERY_LENGTH = 200
+
+# Dropped by the Mongo text index too (default_language "portuguese")
+STOP_WORDS = frozenset((
+    "a", "ao", "aos", "as", "com", "da", "das", "de", "do", "dos", "e", "em", "na", "nas",
+    "no", "nos", "o", "os", "ou", "para", "pela", "pelo", "por", "que", "se", "um", "uma",
+))
+
+
+def encode_offset(offset: int) -> str:
+    """Opaque token for the next page of a ranked search"""
+    return base64.urlsafe_b64encode(f"offset|{offset}".encode()).decode().rstrip("=")
+
+
+def decode_offset(token: str) -> int:
+    """
+    Inverse of encode_offset
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        kind, offset = raw.split("|", 1)
+        if kind != "offset" or int(offset) < 0:
+            raise ValueError(raw)
+        return int(offset)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {token!r}") from e
+
+
+def fold(text: str) -> str:
+    """Casefolded with accents removed, so "Orçamento" matches "orcamento" like in the text index"""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    if decomposed.isascii():
+        return decomposed
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> list:
+    """Search terms of a text: folded words without stop words"""
+    return [word for word in WORD_PATTERN.findall(fold(text)) if word not in STOP_WORDS]
+
+
+def parse_query(query: str):
+    """
+    Split a query into terms to rank on and terms to exclude ("-spam")
+    Returns:
+        tuple: (set of terms, set of excluded terms)
+    """
+    terms, excluded = set(), set()
+    for word in query.replace('"', " ").split():
+        target = excluded if word.startswith("-") else terms
+        target.update(tokenize(word.lstrip("-")))
+    return terms - excluded, excluded
+
+
+def _page(items, next_offset):
+    """
+    Args:
+        next_offset: Ranked position the next page starts at, None on the last page
+    """
+    next_cursor = None
+    if next_offset is not None and next_offset < MAX_SEARCH_RESULTS:
+        next_cursor = encode_offset(next_offset)
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def _bounds(limit: int, cursor: str):
+    limit = max(1, min(limit, MAX_SEARCH_PAGE_SIZE))
+    offset = decode_offset(cursor) if cursor else 0
+    if offset >= MAX_SEARCH_RESULTS:
+        raise ValueError(f"Only the first {MAX_SEARCH_RESULTS} results can be paged through")
+    return limit, offset
+
+
+class MongoTextSearch:
+    """
+    Ranked search with the contact_submissions text index
+    (message_name_email_text in db_indexes). MongoDB scores every match by
+    textScore, weighted by FIELD_WEIGHTS, and keeps only the top
+    offset + limit + 1 while sorting.
+    """
+
+    name = "mongo"
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def add(self, document: dict):
+        """Nothing to do, the text index is maintained by MongoDB"""
+
+    def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def search(self, query: str, limit: int = 20, cursor: str = None):
+        """
+        Fetch one page of matches, best first
+        Args:
+            query: Words to look for; "-word" excludes and "quoted phrases"
+                must match as a whole
+            limit: Page size, at most MAX_SEARCH_PAGE_SIZE
+            cursor: next_cursor of the previous page
+        Returns:
+            dict: {"items": [...], "next_cursor": token or None on the last page}
+        Raises:
+            ValueError: On a malformed cursor or a page past MAX_SEARCH_RESULTS
+        """
+        limit, offset = _bounds(limit, cursor)
+        score = {"$meta": "textScore"}
+        projection = {"_id": 0, "score": score, **{field: 1 for field in SEARCH_FIELDS}}
+        items = await (self.collection.find({"$text": {"$search": query}}, projection)
+                       .sort([("score", score), ("timestamp", -1)])
+                       .skip(offset)
+                       .limit(limit + 1)
+                       .to_list(limit + 1))
+        # The extra row tells whether another page follows
+        return _page(items[:limit], offset + limit if len(items) > limit else None)
+
+
+class InvertedIndex:
+    """
+    In-process ranked search for setups without a text index, e.g.
+    mongomock. Each term maps to a postings list of (document number,
+    weight) in two compact arrays; a document is indexed once on insert
+    and the lists are only ever appended to, so document numbers stay
+    ascending. Ranking is BM25 with the length normalization done at
+    insert time against the running average length, so a document's score
+    is the sum of its weights times each term's idf.
+
+    Only ids are kept: the page's documents are fetched from collection by
+    id, so submissions archived since are simply left out. Each process has
+    its own index, built from the collection on start and then fed by add.
+    Quoted phrases are matched as their separate words.
+
+    add runs on the event loop while rank runs in a worker thread. A
+    document is published by appending its id only once all its postings
+    are written, and rank works on copies of the postings cut at the
+    published count, so it never sees a half-added document.
+    """
+
+    name = "memory"
+    K1 = 1.2
+    B = 0.75
+    # Queries over fewer postings than this score all of them
+    THRESHOLD_MIN_POSTINGS = 10_000
+    # A weight order is sorted again once this share of its list is newer
+    RESORT_GROWTH = 0.02
+
+    def __init__(self, collection=None, batch_size: int = 1000):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.ids = []
+        self.numbers = {}
+        # term -> (array of document numbers, array of weights)
+        self.postings = {}
+        # term -> positions in its postings, best weight first; only for
+        # queried terms, see _by_weight
+        self.weight_orders = {}
+        self.total_length = 0
+        self.ready = False
+        self._task = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, document: dict):
+        """Index a submission; one already indexed is ignored"""
+        submission_id = document["id"]
+        if submission_id in self.numbers:
+            return
+        number = self.numbers[submission_id] = len(self.ids)
+
+        frequencies = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in tokenize(document.get(field) or ""):
+                frequencies[term] = frequencies.get(term, 0) + weight
+        length = sum(frequencies.values())
+        self.total_length += length
+        norm = self.K1 * (1 - self.B + self.B * length / (self.total_length / (number + 1) or 1))
+        for term, frequency in frequencies.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = (array("I"), array("f"))
+            postings[0].append(number)
+            postings[1].append(frequency * (self.K1 + 1) / (frequency + norm))
+        # Published last, see the class docstring
+        self.ids.append(submission_id)
+
+    @staticmethod
+    def _lookup(numbers, weights, number):
+        """Weight of a document in a postings list, or 0; document numbers are ascending"""
+        position = bisect_left(numbers, number)
+        if position < len(numbers) and numbers[position] == number:
+            return weights[position]
+        return 0.0
+
+    def _snapshot(self, term, published: int):
+        """Copies of the term's postings of the first published documents"""
+        numbers, weights = self.postings[term]
+        size = bisect_left(numbers, published)
+        return numbers[:size], weights[:size]
+
+    def _by_weight(self, term, weights):
+        """
+        Positions in a snapshot of the term's postings, best weight first and
+        newest first among equal weights. Postings added after the sort are
+        left out until they are RESORT_GROWTH of the list.
+        """
+        order = self.weight_orders.get(term)
+        if order is None or len(weights) - len(order) > len(order) * self.RESORT_GROWTH:
+            # A stable sort of the positions newest first keeps ties in that order
+            order = self.weight_orders[term] = array(
+                "I", sorted(range(len(weights) - 1, -1, -1), key=weights.__getitem__, reverse=True))
+        elif len(order) > len(weights):
+            # Sorted by a concurrent rank over more documents than this one sees
+            order = array("I", sorted(range(len(weights) - 1, -1, -1), key=weights.__getitem__, reverse=True))
+        return order
+
+    def rank(self, query: str, count: int) -> list:
+        """
+        Returns:
+            list: (score, document number) of the best count matches, best first
+        """
+        terms, excluded = parse_query(query)
+        total = len(self.ids)
+        # (term, idf, numbers, weights)
+        matched = []
+        for term in terms:
+            if term in self.postings:
+                numbers, weights = self._snapshot(term, total)
+                idf = math.log(1 + (total - len(numbers) + 0.5) / (len(numbers) + 0.5))
+                matched.append((term, idf, numbers, weights))
+        excluded = [self._snapshot(term, total) for term in excluded if term in self.postings]
+        if sum(len(numbers) for _, _, numbers, _ in matched) < self.THRESHOLD_MIN_POSTINGS:
+            return self._rank_all(matched, excluded, count)
+        return self._rank_threshold(matched, excluded, count)
+
+    def _rank_all(self, matched, excluded, count: int) -> list:
+        """Score every posting of the terms"""
+        scores = {}
+        for _, idf, numbers, weights in matched:
+            get = scores.get
+            for number, weight in zip(numbers, weights):
+                scores[number] = get(number, 0.0) + weight * idf
+        for numbers, weights in excluded:
+            if len(scores) * 16 < len(numbers):
+                for number in [number for number in scores if self._lookup(numbers, weights, number)]:
+                    del scores[number]
+            else:
+                for number in numbers:
+                    scores.pop(number, None)
+        return heapq.nlargest(count, zip(scores.values(), scores.keys()))
+
+    def _rank_threshold(self, matched, excluded, count: int) -> list:
+        """
+        Fagin's threshold algorithm: walk every term's postings best weight
+        first in step, scoring each new document in full by looking up its
+        weights in the other lists. A document not seen yet can score at
+        most the sum of the weights at the current depth, so the walk stops
+        once the count-th best score reaches that, usually after a few
+        thousand of the hundreds of thousands of postings of common terms.
+        """
+        lists = [(idf, numbers, weights, self._by_weight(term, weights)) for term, idf, numbers, weights in matched]
+        best = []
+        seen = set()
+
+        def consider(number):
+            seen.add(number)
+            if any(self._lookup(numbers, weights, number) for numbers, weights in excluded):
+                return
+            score = sum(idf * self._lookup(numbers, weights, number) for idf, numbers, weights, _ in lists)
+            if len(best) < count:
+                heapq.heappush(best, (score, number))
+            elif (score, number) > best[0]:
+                heapq.heapreplace(best, (score, number))
+
+        # Postings newer than a weight order are scored up front, so a
+        # document not seen yet is below the current depth in every list
+        for _, numbers, _, order in lists:
+            for number in numbers[len(order):]:
+                if number not in seen:
+                    consider(number)
+        for depth in range(max(len(order) for *_, order in lists)):
+            threshold = 0.0
+            for idf, numbers, weights, order in lists:
+                if depth < len(order):
+                    position = order[depth]
+                    if numbers[position] not in seen:
+                        consider(numbers[position])
+                    threshold += idf * weights[position]
+            if len(best) == count and best[0][0] >= threshold:
+                break
+        return sorted(best, reverse=True)
+
+    async def search(self, query: str, limit: int = 20, cursor: str = None):
+        """
+        Same as MongoTextSearch.search, ranked by this index. Matches whose
+        submission is gone from the collection are skipped and the page is
+        filled from the ones ranked after them.
+        """
+        limit, position = _bounds(limit, cursor)
+        items = []
+        while True:
+            # Scoring common terms takes a while over a large collection; keep the loop free meanwhile
+            wanted = limit - len(items)
+            ranked = (await asyncio.to_thread(self.rank, query, position + wanted + 1))[position:]
+            batch = ranked[:wanted]
+            ids = [self.ids[number] for _, number in batch]
+            documents = {}
+            if ids:
+                async for document in self.collection.find({"id": {"$in": ids}},
+                                                           {"_id": 0, **{field: 1 for field in SEARCH_FIELDS}}):
+                    documents[document["id"]] = document
+            items += [{**documents[submission_id], "score": round(score, 4)}
+                      for (score, _), submission_id in zip(batch, ids) if submission_id in documents]
+            position += len(batch)
+            more = len(ranked) > len(batch)
+            if not more or len(items) == limit or position >= MAX_SEARCH_RESULTS:
+                return _page(items, position if more else None)
+
+    async def build(self):
+        """Index the submissions already stored, oldest first"""
+        started = time.perf_counter()
+        projection = {"_id": 0, **{field: 1 for field in SEARCH_FIELDS if field != "timestamp"}}
+        cursor = self.collection.find({}, projection).sort("timestamp", 1).batch_size(self.batch_size)
+        async for document in cursor:
+            self.add(document)
+            if len(self.ids) % self.batch_size == 0:
+                # Let requests run between batches of a large collection
+                await asyncio.sleep(0)
+        self.ready = True
+        logger.info("Search index built: %d submissions, %d terms in %.1f s",
+                    len(self.ids), len(self.postings), time.perf_counter() - started)
+
+    async def _build_logged(self):
+        try:
+            await self.build()
+        except Exception as e:
+            logger.error("Search index build failed: %s", e)
+
+    def start(self):
+        # In the background: searches see what is indexed so far meanwhile
+        self._task = asyncio.create_task(self._build_logged())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+def create_search_backend(name: str = "mongo", db=None):
+    """Build the search backend selected by name (mongo, memory or off)"""
+    if name == "off":
+        return None
+    if db is None:
+        raise ValueError(f"The {name} search backend needs a database")
+    if name == "memory":
+        return InvertedIndex(db.contact_submissions)
+    if name == "mongo":
+        return MongoTextSearch(db.contact_submissions)
+    raise ValueError(f"Unknown search backend: {name}")
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Contact Search Testing for SNO Website
+Checks the in-memory search backend (SEARCH_BACKEND=memory): accent and
+case folding, "-term" exclusion, name and email matches outranking message
+matches, next_cursor pages without duplicates or gaps up to
+MAX_SEARCH_RESULTS, full pages after submissions are deleted, and that the
+threshold ranking of common terms agrees with scoring every posting.
+/api/contact/search is checked for admin access and malformed cursors.
+Uses MongoDB at MONGO_URL when reachable, otherwise mongomock-motor.
+"""
+
+import asyncio
+import math
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+from contact_search import (MAX_SEARCH_RESULTS, InvertedIndex, create_search_backend, encode_offset,
+                            parse_query)
+
+load_dotenv('/app/backend/.env')
+
+MONGO_URL = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+ADMIN_KEY = "search-test-key"
+START = datetime(2026, 3, 4, 9, 30)
+VOCABULARY = ["site", "loja", "virtual", "orcamento", "prazo", "design", "logo", "marca", "campanha",
+              "redes", "sociais", "video", "aplicativo", "manutencao", "hospedagem", "urgente"]
+
+
+async def get_database():
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=1000)
+        await client.admin.command('ping')
+        print("✅ Using MongoDB at", MONGO_URL)
+        return client[f"contact_search_test_{time.time_ns()}"], True
+    except Exception:
+        from mongomock_motor import AsyncMongoMockClient
+        print("⚠️ MongoDB not available, using mongomock-motor")
+        return AsyncMongoMockClient()[f"contact_search_test_{time.time_ns()}"], False
+
+
+def _submission(n, name="Cliente Teste", message="Mensagem de teste.", email=None):
+    return {
+        "id": str(uuid.uuid4()),
+        "name": name,
+        "email": email or f"cliente{n}@example.com",
+        "message": message,
+        "timestamp": START + timedelta(minutes=n),
+    }
+
+
+class ContactSearchTester:
+    def __init__(self):
+        self.passed = 0
+        self.failed = 0
+
+    def record(self, ok, description):
+        if ok:
+            self.passed += 1
+            print(f"✅ {description}")
+        else:
+            self.failed += 1
+            print(f"❌ {description}")
+
+    async def _index(self, db, documents):
+        await db.drop_collection("contact_submissions")
+        if documents:
+            await db.contact_submissions.insert_many([dict(document) for document in documents])
+        index = create_search_backend("memory", db)
+        await index.build()
+        return index
+
+    async def walk(self, index, query, limit):
+        """Follow next_cursor to the last page, returning the pages"""
+        pages = []
+        cursor = None
+        while True:
+            page = await index.search(query, limit=limit, cursor=cursor)
+            pages.append(page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return pages
+
+    async def test_matching(self, db):
+        print("\n🔍 Folding, exclusion and field weights...")
+        documents = [
+            _submission(0, name="João Conceição", message="Preciso de um ORÇAMENTO para o site da loja."),
+            _submission(1, name="Ana Souza", message="Orcamento urgente de uma campanha."),
+            _submission(2, name="Bruno Lima", message="Quero falar sobre hospedagem."),
+        ]
+        index = await self._index(db, documents)
+        for query in ("orcamento", "ORÇAMENTO", "Orçamento"):
+            found = {item["id"] for item in (await index.search(query))["items"]}
+            self.record(found == {documents[0]["id"], documents[1]["id"]},
+                        f"{query!r} matches both spellings: {len(found)} results")
+        found = [item["id"] for item in (await index.search("joao conceicao"))["items"]]
+        self.record(found == [documents[0]["id"]], "Accented name found without accents")
+
+        found = [item["id"] for item in (await index.search("orcamento -urgente"))["items"]]
+        self.record(found == [documents[0]["id"]], "-urgente leaves out the urgent request")
+        found = (await index.search("orcamento -URGENTE -loja"))["items"]
+        self.record(found == [], "Excluded terms folded too")
+        self.record(parse_query('"orcamento site" -orcamento') == ({"site"}, {"orcamento"}),
+                    "A term both wanted and excluded is excluded")
+
+        # Same length messages, so only the field weight tells them apart
+        documents = [
+            _submission(0, name="Cliente Teste", message="Indicação da Paula Ribeiro, quero um logo."),
+            _submission(1, name="Paula Ribeiro", message="Indicação da Cliente Teste, quero um logo."),
+            _submission(2, name="Cliente Teste", message="Indicação de amigos, quero um logo.",
+                        email="ribeiro@example.com"),
+        ]
+        index = await self._index(db, documents)
+        found = [item["id"] for item in (await index.search("ribeiro"))["items"]]
+        self.record(found[-1] == documents[0]["id"] and set(found[:2]) == {documents[1]["id"], documents[2]["id"]},
+                    "Name and email matches rank above a message match")
+
+    async def test_paging(self, db):
+        print("\n🔍 next_cursor paging...")
+        rng = random.Random(7)
+        documents = [_submission(n, message=" ".join(rng.choices(VOCABULARY, k=rng.randint(3, 20))) + " projeto")
+                     for n in range(250)]
+        index = await self._index(db, documents)
+        single = (await index.search("projeto site", limit=100))["items"]
+        for limit in (1, 7, 20, 100):
+            pages = await self.walk(index, "projeto site", limit)
+            items = [item for page in pages for item in page]
+            ids = [item["id"] for item in items]
+            scores = [item["score"] for item in items]
+            self.record(len(ids) == len(set(ids)) == 250 and all(len(page) == limit for page in pages[:-1]),
+                        f"limit={limit}: {len(pages)} pages, {len(ids)} results, no duplicates or gaps")
+            self.record(scores == sorted(scores, reverse=True) and ids[:100] == [item["id"] for item in single],
+                        f"limit={limit}: best first, same order as one large page")
+
+        documents = [_submission(n, message="projeto " * (n % 5 + 1)) for n in range(MAX_SEARCH_RESULTS + 50)]
+        index = await self._index(db, documents)
+        pages = await self.walk(index, "projeto", 100)
+        self.record(len(pages) == MAX_SEARCH_RESULTS // 100 and sum(map(len, pages)) == MAX_SEARCH_RESULTS,
+                    f"Paging stops at MAX_SEARCH_RESULTS: {sum(map(len, pages))} of {len(documents)} matches")
+        try:
+            await index.search("projeto", cursor=encode_offset(MAX_SEARCH_RESULTS))
+            self.record(False, "Cursor past MAX_SEARCH_RESULTS accepted")
+        except ValueError:
+            self.record(True, "Cursor past MAX_SEARCH_RESULTS rejected")
+
+    async def test_deleted(self, db):
+        print("\n🔍 Submissions deleted after indexing...")
+        documents = [_submission(n, message="projeto " * (n % 7 + 1)) for n in range(60)]
+        index = await self._index(db, documents)
+        ranked = [item["id"] for page in await self.walk(index, "projeto", 60) for item in page]
+        deleted = set(ranked[3:20:2]) | set(ranked[25:35])
+        await db.contact_submissions.delete_many({"id": {"$in": list(deleted)}})
+        pages = await self.walk(index, "projeto", 10)
+        ids = [item["id"] for page in pages for item in page]
+        self.record(ids == [submission_id for submission_id in ranked if submission_id not in deleted],
+                    f"{len(deleted)} deleted submissions skipped, the rest in order without gaps")
+        self.record(all(len(page) == 10 for page in pages[:-1]) and len(pages) == 5,
+                    f"Pages filled from later matches: {[len(page) for page in pages]}")
+
+    def _both(self, index, query, count):
+        """Results of scoring every posting and of the threshold walk for one query"""
+        terms, excluded = parse_query(query)
+        total = len(index.ids)
+        matched = []
+        for term in terms:
+            if term in index.postings:
+                numbers, weights = index._snapshot(term, total)
+                idf = math.log(1 + (total - len(numbers) + 0.5) / (len(numbers) + 0.5))
+                matched.append((term, idf, numbers, weights))
+        excluded = [index._snapshot(term, total) for term in excluded if term in index.postings]
+        return index._rank_all(matched, excluded, count), index._rank_threshold(matched, excluded, count)
+
+    def test_threshold(self):
+        print("\n🔍 Threshold ranking against scoring every posting...")
+        rng = random.Random(11)
+        index = InvertedIndex()
+        for n in range(3000):
+            index.add({"id": f"sub-{n}", "name": " ".join(rng.choices(VOCABULARY, k=2)),
+                       "message": " ".join(rng.choices(VOCABULARY, weights=range(len(VOCABULARY), 0, -1),
+                                                       k=rng.randint(2, 40)))})
+        queries = ["site", "site loja", "orcamento prazo design", "logo -marca", "site virtual -urgente -video",
+                   "hospedagem manutencao", "inexistente site"]
+        agree = True
+        for query in queries:
+            for count in (1, 10, 200):
+                full, threshold = self._both(index, query, count)
+                agree = agree and full == threshold
+        self.record(agree, f"{len(queries)} queries at 3 page depths ranked the same")
+
+        # Newer postings than the sorted weight orders, then past RESORT_GROWTH
+        for extra in (20, 200):
+            for n in range(len(index.ids), len(index.ids) + extra):
+                index.add({"id": f"sub-{n}", "name": "Novo Cliente",
+                           "message": " ".join(rng.choices(VOCABULARY, k=rng.randint(2, 40)))})
+            agree = all(full == threshold for full, threshold in
+                        (self._both(index, query, 50) for query in queries))
+            self.record(agree, f"Still the same after {extra} more submissions")
+
+        index.THRESHOLD_MIN_POSTINGS = 0
+        by_threshold = index.rank("site loja -urgente", 30)
+        index.THRESHOLD_MIN_POSTINGS = float("inf")
+        self.record(by_threshold == index.rank("site loja -urgente", 30), "rank picks either with the same result")
+
+    async def test_route(self, db):
+        print("\n🔍 /api/contact/search...")
+        import httpx
+        import server
+
+        os.environ.setdefault('MONGO_URL', MONGO_URL)
+        os.environ.setdefault('DB_NAME', 'contact_search_test')
+        os.environ['RESPONSE_CACHE_BACKEND'] = 'off'
+        os.environ['SEARCH_BACKEND'] = 'memory'
+        os.environ['ADMIN_API_KEY'] = ADMIN_KEY
+        documents = [_submission(n, message="Orçamento de site " * (n % 3 + 1)) for n in range(30)]
+        app = server.create_app()
+        self.record(isinstance(app.state.contact_search, InvertedIndex), "SEARCH_BACKEND=memory selects the index")
+        app.state.contact_search = await self._index(db, documents)
+        headers = {"X-API-Key": ADMIN_KEY}
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/api/contact/search", params={"q": "orcamento"})
+            self.record(response.status_code == 401, f"No key: {response.status_code}")
+            response = await client.get("/api/contact/search", params={"q": "ORCAMENTO", "limit": 20}, headers=headers)
+            body = response.json()
+            self.record(response.status_code == 200 and len(body["items"]) == 20 and body["next_cursor"],
+                        f"Admin gets a page: {response.status_code}, {len(body['items'])} results")
+            response = await client.get("/api/contact/search", headers=headers,
+                                        params={"q": "ORCAMENTO", "limit": 20, "cursor": body["next_cursor"]})
+            rest = response.json()
+            self.record(len(rest["items"]) == 10 and rest["next_cursor"] is None
+                        and not {item["id"] for item in rest["items"]} & {item["id"] for item in body["items"]},
+                        "Second page holds the other 10")
+            for cursor in ("not-a-cursor", "!!!", encode_offset(MAX_SEARCH_RESULTS), "b2Zmc2V0fC0x"):
+                response = await client.get("/api/contact/search", params={"q": "site", "cursor": cursor},
+                                            headers=headers)
+                self.record(response.status_code == 400, f"Cursor {cursor!r}: {response.status_code}")
+            response = await client.get("/api/contact/search", params={"q": "x" * 201}, headers=headers)
+            self.record(response.status_code == 422, f"Query above MAX_QUERY_LENGTH: {response.status_code}")
+            app.state.contact_search = None
+            response = await client.get("/api/contact/search", params={"q": "site"}, headers=headers)
+            self.record(response.status_code == 404, f"SEARCH_BACKEND=off: {response.status_code}")
+
+    async def run_all_tests(self):
+        db, real_mongo = await get_database()
+        await self.test_matching(db)
+        await self.test_paging(db)
+        await self.test_deleted(db)
+        self.test_threshold()
+        await self.test_route(db)
+        if real_mongo:
+            await db.client.drop_database(db.name)
+        print(f"\n📊 {self.passed} passed, {self.failed} failed")
+        return self.failed == 0
+
+
+def main():
+    tester = ContactSearchTester()
+    return 0 if asyncio.run(tester.run_all_tests()) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
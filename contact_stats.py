@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class ContactStats:
+    """
+    Contact submission counters served from memory.
+    Inserts bump the counters directly; a background task reconciles them
+    against MongoDB so inserts from other workers show up. If the counters
+    get older than ttl without a reconciliation, the next request refreshes
+    them, and concurrent requests share that single query.
+    With a buffering SubmissionWriter, its buffer is written out before each
+    reconciliation so submissions it still holds aren't counted out.
+    """
+
+    def __init__(self, db, ttl: float = 60.0, reconcile_interval: float = 30.0, writer=None):
+        self.collection = db.contact_submissions
+        self.retention_state = db.retention_state
+        self.ttl = ttl
+        self.reconcile_interval = reconcile_interval
+        self.writer = writer
+        self.total = 0
+        self.today = 0
+        self.day = None
+        self.reconciled_at = None
+        # Timestamps of submissions recorded while a reconciliation reads
+        self._recorded_during_read = None
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    def _roll_day(self, now: datetime):
+        day = now.date()
+        if day != self.day:
+            self.day = day
+            self.today = 0
+
+    def record_submission(self, timestamp: datetime):
+        """Count a submission that was just stored"""
+        self._roll_day(datetime.utcnow())
+        self.total += 1
+        if timestamp.date() == self.day:
+            self.today += 1
+        if self._recorded_during_read is not None:
+            self._recorded_during_read.append(timestamp)
+
+    def is_fresh(self) -> bool:
+        return self.reconciled_at is not None and time.monotonic() - self.reconciled_at < self.ttl
+
+    def snapshot(self) -> dict:
+        self._roll_day(datetime.utcnow())
+        return {
+            "total_submissions": self.total,
+            "today_submissions": self.today,
+        }
+
+    async def get(self) -> dict:
+        """Current stats, querying MongoDB only when the counters are stale"""
+        if not self.is_fresh():
+            async with self._lock:
+                # Another request may have refreshed while we waited
+                if not self.is_fresh():
+                    await self.reconcile()
+        return self.snapshot()
+
+    async def reconcile(self):
+        """
+        Reset the counters from MongoDB. Submissions recorded while the
+        counts are read are added on top rather than lost to the reset.
+        """
+        if self.writer is not None:
+            await self.writer.flush()
+        now = datetime.utcnow()
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        recorded = self._recorded_during_read = []
+        try:
+            # The collection metadata count avoids scanning every document;
+            # submissions moved out by retention are counted in retention_state
+            total, today, retention = await asyncio.gather(
+                self.collection.estimated_document_count(),
+                self.collection.count_documents({"timestamp": {"$gte": midnight}}),
+                self.retention_state.find_one({"_id": "contact_submissions"}, {"archived": 1}),
+            )
+        finally:
+            self._recorded_during_read = None
+        self.day = now.date()
+        self.total = total + (retention or {}).get("archived", 0) + len(recorded)
+        self.today = today + sum(timestamp >= midnight for timestamp in recorded)
+        self.reconciled_at = time.monotonic()
+
+    async def _reconcile_periodically(self):
+        while True:
+            try:
+                async with self._lock:
+                    await self.reconcile()
+            except Exception as e:
+                logger.error("Error reconciling contact stats: %s", e)
+            await asyncio.sleep(self.reconcile_interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._reconcile_periodically())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Contact Stats Testing for SNO Website
+Checks the in-memory submission counters: one shared query when they go
+stale, the periodic reconciliation picking up other workers' inserts,
+archived submissions still counted, submissions recorded while a
+reconciliation reads not being lost, and buffered submissions written
+out before counting.
+Uses MongoDB at MONGO_URL when reachable, otherwise mongomock-motor.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+
+from contact_stats import ContactStats
+from submission_buffer import SubmissionWriter
+
+load_dotenv('/app/backend/.env')
+
+MONGO_URL = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+
+
+async def get_database():
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=1000)
+        await client.admin.command('ping')
+        print("✅ Using MongoDB at", MONGO_URL)
+        return client[f"contact_stats_test_{time.time_ns()}"], True
+    except Exception:
+        from mongomock_motor import AsyncMongoMockClient
+        print("⚠️ MongoDB not available, using mongomock-motor")
+        return AsyncMongoMockClient()[f"contact_stats_test_{time.time_ns()}"], False
+
+
+def _submission(timestamp=None):
+    return {"id": str(uuid.uuid4()), "name": "Teste Stats", "timestamp": timestamp or datetime.utcnow()}
+
+
+class CountingCollection:
+    """
+    Wraps contact_submissions to count reads. With a gate, each count is
+    taken and then held until the gate opens, so inserts made meanwhile
+    are missing from it.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.reads = 0
+        self.gate = None
+
+    async def _held(self, count):
+        value = await count
+        if self.gate is not None:
+            await self.gate.wait()
+        return value
+
+    async def estimated_document_count(self):
+        self.reads += 1
+        return await self._held(self.collection.estimated_document_count())
+
+    async def count_documents(self, query):
+        return await self._held(self.collection.count_documents(query))
+
+
+class ContactStatsTester:
+    def __init__(self):
+        self.passed = 0
+        self.failed = 0
+
+    def record(self, ok, description):
+        if ok:
+            self.passed += 1
+            print(f"✅ {description}")
+        else:
+            self.failed += 1
+            print(f"❌ {description}")
+
+    async def _fresh(self, db, **options):
+        for name in ("contact_submissions", "retention_state"):
+            await db.drop_collection(name)
+        stats = ContactStats(db, **options)
+        stats.collection = CountingCollection(db.contact_submissions)
+        return stats
+
+    async def _submit(self, db, stats, timestamp=None):
+        """What the contact route does: store, then count"""
+        document = _submission(timestamp)
+        await db.contact_submissions.insert_one(document)
+        stats.record_submission(document["timestamp"])
+
+    async def test_single_flight(self, db):
+        print("\n🔍 Stale counters refreshed once...")
+        stats = await self._fresh(db, ttl=0.2)
+        await db.contact_submissions.insert_many([_submission() for _ in range(3)])
+        results = await asyncio.gather(*(stats.get() for _ in range(20)))
+        self.record(stats.collection.reads == 1 and all(result["total_submissions"] == 3 for result in results),
+                    f"20 concurrent requests on cold counters: {stats.collection.reads} read")
+        await stats.get()
+        self.record(stats.collection.reads == 1, "Fresh counters served from memory")
+        await asyncio.sleep(0.25)
+        await asyncio.gather(*(stats.get() for _ in range(5)))
+        self.record(stats.collection.reads == 2, f"Read again once older than ttl: {stats.collection.reads} reads")
+
+    async def test_periodic(self, db):
+        print("\n🔍 Periodic reconciliation...")
+        stats = await self._fresh(db, reconcile_interval=0.05)
+        stats.start()
+        await asyncio.sleep(0.02)
+        # Inserted by another worker, so never recorded here
+        await db.contact_submissions.insert_many([_submission() for _ in range(4)])
+        await asyncio.sleep(0.15)
+        self.record(stats.snapshot()["total_submissions"] == 4 and stats.collection.reads >= 2,
+                    f"Other workers' inserts picked up: {stats.snapshot()} after {stats.collection.reads} reads")
+        await stats.stop()
+        reads = stats.collection.reads
+        await asyncio.sleep(0.1)
+        self.record(stats._task is None and stats.collection.reads == reads, "Stopped reconciling on stop()")
+
+    async def test_today_and_archived(self, db):
+        print("\n🔍 Today and archived submissions...")
+        stats = await self._fresh(db)
+        yesterday = datetime.utcnow() - timedelta(days=1)
+        await db.contact_submissions.insert_many([_submission(yesterday) for _ in range(2)]
+                                                 + [_submission() for _ in range(3)])
+        await db.retention_state.insert_one({"_id": "contact_submissions", "archived": 7})
+        await stats.reconcile()
+        self.record(stats.snapshot() == {"total_submissions": 12, "today_submissions": 3},
+                    f"Archived submissions stay in the total, not in today: {stats.snapshot()}")
+        stats.record_submission(yesterday)
+        self.record(stats.snapshot() == {"total_submissions": 13, "today_submissions": 3},
+                    f"A submission from another day only bumps the total: {stats.snapshot()}")
+
+    async def test_record_during_reconcile(self, db):
+        print("\n🔍 Submissions recorded during a reconciliation...")
+        stats = await self._fresh(db)
+        for _ in range(3):
+            await self._submit(db, stats)
+        stats.collection.gate = asyncio.Event()
+        reconcile = asyncio.create_task(stats.reconcile())
+        await asyncio.sleep(0.01)
+        # The counts have been taken; these land after them
+        await asyncio.gather(*(self._submit(db, stats) for _ in range(5)))
+        stats.collection.gate.set()
+        await reconcile
+        stored = await db.contact_submissions.count_documents({})
+        self.record(stats.snapshot() == {"total_submissions": stored, "today_submissions": stored},
+                    f"Counts read before 5 inserts, none lost: {stats.snapshot()}, {stored} stored")
+
+        stats.collection.gate = None
+        submissions = [asyncio.create_task(self._submit(db, stats)) for _ in range(50)]
+        for _ in range(5):
+            await stats.reconcile()
+            await asyncio.sleep(0)
+        await asyncio.gather(*submissions)
+        stored = await db.contact_submissions.count_documents({})
+        self.record(stats.snapshot()["total_submissions"] >= stored,
+                    f"50 submissions interleaved with 5 reconciliations, none lost: "
+                    f"{stats.snapshot()['total_submissions']} counted, {stored} stored")
+        await stats.reconcile()
+        self.record(stats.snapshot()["total_submissions"] == stored,
+                    f"Settled by the next reconciliation: {stats.snapshot()['total_submissions']}")
+
+    async def test_buffered_writer(self, db):
+        print("\n🔍 Buffered submission writes...")
+        writer = SubmissionWriter(db.contact_submissions, mode="buffered", max_delay=60)
+        stats = await self._fresh(db, writer=writer)
+        for _ in range(4):
+            document = _submission()
+            await writer.insert(document)
+            stats.record_submission(document["timestamp"])
+        buffered = await db.contact_submissions.count_documents({})
+        self.record(buffered == 0 and stats.snapshot()["total_submissions"] == 4,
+                    f"Buffered submissions counted before they are written: {stats.snapshot()}")
+        await stats.reconcile()
+        stored = await db.contact_submissions.count_documents({})
+        self.record(stored == 4 and stats.snapshot() == {"total_submissions": 4, "today_submissions": 4},
+                    f"Buffer written before the counts are read: {stored} stored, {stats.snapshot()}")
+
+    async def run_all_tests(self):
+        db, real_mongo = await get_database()
+        await self.test_single_flight(db)
+        await self.test_periodic(db)
+        await self.test_today_and_archived(db)
+        await self.test_record_during_reconcile(db)
+        await self.test_buffered_writer(db)
+        if real_mongo:
+            await db.client.drop_database(db.name)
+        print(f"\n📊 {self.passed} passed, {self.failed} failed")
+        return self.failed == 0
+
+
+def main():
+    tester = ContactStatsTester()
+    return 0 if asyncio.run(tester.run_all_tests()) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+
+logger = logging.getLogger(__name__)
+
+# Indexes every collection should have, keyed by collection name
+INDEXES = {
+    "contact_submissions": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        # Keyset order of exports and the admin listing, so they never sort in
+        # memory; also serves timestamp ranges and sorts in either direction
+        IndexModel([("timestamp", ASCENDING), ("id", ASCENDING)], name="timestamp_id"),
+        # Keyset pagination of the filtered admin listing, newest first; they
+        # also serve any other lookup by email or by ip_address
+        IndexModel([("email", ASCENDING), ("timestamp", DESCENDING), ("id", DESCENDING)],
+                   name="email_timestamp_id"),
+        IndexModel([("ip_address", ASCENDING), ("timestamp", DESCENDING), ("id", DESCENDING)],
+                   name="ip_address_timestamp_id"),
+    ],
+    "email_outbox": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_next_attempt"),
+    ],
+    # Only used with RESPONSE_CACHE_BACKEND=mongo; expired entries are
+    # removed by the TTL monitor
+    "response_cache": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    # Only used with IDEMPOTENCY_BACKEND=mongo
+    "idempotency_keys": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "contact_rollups": [
+        IndexModel([("bucket", ASCENDING), ("dimension", ASCENDING), ("start", ASCENDING)],
+                   name="bucket_dimension_start"),
+    ],
+    # Only used with RATE_LIMIT_BACKEND=mongo
+    "rate_limits": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+}
+
+# Full-text search of contact_submissions, only built for SEARCH_BACKEND=mongo
+# (see configured_indexes): a text index is costly to keep up on every insert.
+# The weights match contact_search.FIELD_WEIGHTS
+TEXT_SEARCH_INDEX = IndexModel(
+    [("message", TEXT), ("name", TEXT), ("email", TEXT)], name="message_name_email_text",
+    weights={"name": 5, "email": 5, "message": 1}, default_language="portuguese",
+)
+
+
+def configured_indexes(search_backend: str = "mongo") -> dict:
+    """INDEXES, plus TEXT_SEARCH_INDEX when the Mongo search backend is configured"""
+    if search_backend != "mongo":
+        return INDEXES
+    indexes = {collection_name: list(models) for collection_name, models in INDEXES.items()}
+    indexes["contact_submissions"].append(TEXT_SEARCH_INDEX)
+    return indexes
+
+
+async def ensure_indexes(db, indexes=INDEXES):
+    """
+    Create any missing indexes, one at a time so each build can be timed
+    Returns:
+        dict: Build time in seconds per collection and index name
+    """
+    report = {}
+    started = time.perf_counter()
+    for collection_name, models in indexes.items():
+        collection = db[collection_name]
+        report[collection_name] = {}
+        for model in models:
+            index_started = time.perf_counter()
+            # Creating an index that already exists with the same spec is a no-op
+            await collection.create_indexes([model])
+            elapsed = time.perf_counter() - index_started
+            report[collection_name][model.document["name"]] = elapsed
+            logger.info("Index %s.%s ready in %.1f ms", collection_name, model.document["name"], elapsed * 1000)
+    logger.info("All indexes ready in %.1f ms", (time.perf_counter() - started) * 1000)
+    return report
+
+
+async def _ensure_indexes_logged(db, indexes):
+    try:
+        return await ensure_indexes(db, indexes)
+    except Exception as e:
+        logger.error("Index build failed: %s", e)
+
+
+async def bootstrap_indexes(db, mode: str = "background", indexes=INDEXES):
+    """
+    Ensure indexes at startup
+    Args:
+        db: Motor database
+        mode: "blocking" waits for the builds, "background" starts them in a
+            task so startup continues, "off" skips them
+    Returns:
+        The report for blocking mode, the running task for background mode
+    """
+    if mode == "off":
+        return None
+    if mode == "blocking":
+        return await ensure_indexes(db, indexes)
+    if mode == "background":
+        return asyncio.create_task(_ensure_indexes_logged(db, indexes))
+    raise ValueError(f"Unknown index build mode: {mode}")
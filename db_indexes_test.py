@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Database Index Testing for SNO Website
+Checks that ensure_indexes creates every index and reports a build time
+for each, that the unique id indexes reject duplicates, that a background
+build lets startup finish before it does, and that the text index is only
+built for the Mongo search backend.
+Uses MongoDB at MONGO_URL when reachable, otherwise mongomock-motor.
+"""
+
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+from pymongo.errors import DuplicateKeyError
+
+from db_indexes import INDEXES, TEXT_SEARCH_INDEX, bootstrap_indexes, configured_indexes, ensure_indexes
+
+load_dotenv('/app/backend/.env')
+
+MONGO_URL = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+TEXT_INDEX_NAME = TEXT_SEARCH_INDEX.document["name"]
+
+
+async def get_database():
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=1000)
+        await client.admin.command('ping')
+        print("✅ Using MongoDB at", MONGO_URL)
+        return client[f"db_indexes_test_{time.time_ns()}"], True
+    except Exception:
+        from mongomock_motor import AsyncMongoMockClient
+        print("⚠️ MongoDB not available, using mongomock-motor")
+        return AsyncMongoMockClient()[f"db_indexes_test_{time.time_ns()}"], False
+
+
+class GatedDatabase:
+    """Records index builds, each held until the gate opens"""
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.requested = []
+
+    def __getitem__(self, collection_name):
+        return GatedCollection(self, collection_name)
+
+
+class GatedCollection:
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+
+    async def create_indexes(self, models):
+        await self.db.gate.wait()
+        self.db.requested.extend((self.name, model.document["name"]) for model in models)
+
+
+def _names(indexes):
+    return {(collection_name, model.document["name"])
+            for collection_name, models in indexes.items() for model in models}
+
+
+class DbIndexesTester:
+    def __init__(self):
+        self.passed = 0
+        self.failed = 0
+
+    def record(self, ok, description):
+        if ok:
+            self.passed += 1
+            print(f"✅ {description}")
+        else:
+            self.failed += 1
+            print(f"❌ {description}")
+
+    async def test_ensure_indexes(self, db):
+        print("\n🔍 ensure_indexes...")
+        report = await ensure_indexes(db)
+        reported = {(collection_name, name) for collection_name, times in report.items() for name in times}
+        self.record(reported == _names(INDEXES), f"One report entry per index: {len(reported)} indexes")
+        self.record(all(isinstance(elapsed, float) and elapsed >= 0
+                        for times in report.values() for elapsed in times.values()),
+                    "Build time in seconds for each index")
+        created = set()
+        for collection_name in INDEXES:
+            created |= {(collection_name, name) for name in await db[collection_name].index_information()}
+        self.record(_names(INDEXES) <= created, "Every index exists in MongoDB")
+        again = await ensure_indexes(db)
+        self.record(again.keys() == report.keys(), "Running again over existing indexes succeeds")
+
+        for collection_name in ("contact_submissions", "email_outbox"):
+            await db[collection_name].insert_one({"id": "dup-1"})
+            try:
+                await db[collection_name].insert_one({"id": "dup-1"})
+                self.record(False, f"{collection_name}: duplicate id accepted")
+            except DuplicateKeyError:
+                self.record(True, f"{collection_name}: duplicate id rejected by id_unique")
+
+    async def test_bootstrap_modes(self):
+        print("\n🔍 bootstrap_indexes modes...")
+        db = GatedDatabase()
+        task = await bootstrap_indexes(db, "background")
+        await asyncio.sleep(0.01)
+        self.record(isinstance(task, asyncio.Task) and not task.done() and not db.requested,
+                    "background: returns while the first build is still running")
+        db.gate.set()
+        report = await task
+        self.record(set(db.requested) == _names(INDEXES) and report.keys() == INDEXES.keys(),
+                    f"background: task finishes every build and returns the report ({len(db.requested)} indexes)")
+
+        db = GatedDatabase()
+        blocking = asyncio.create_task(bootstrap_indexes(db, "blocking"))
+        await asyncio.sleep(0.01)
+        self.record(not blocking.done(), "blocking: waits for the builds")
+        db.gate.set()
+        self.record(isinstance(await blocking, dict), "blocking: returns the report")
+
+        db = GatedDatabase()
+        self.record(await bootstrap_indexes(db, "off") is None and not db.requested, "off: nothing built")
+        try:
+            await bootstrap_indexes(db, "lazy")
+            self.record(False, "Unknown mode accepted")
+        except ValueError:
+            self.record(True, "Unknown mode rejected")
+
+        class FailingCollection:
+            async def create_indexes(self, models):
+                raise RuntimeError("not primary")
+
+        failing = {collection_name: FailingCollection() for collection_name in INDEXES}
+        result = await (await bootstrap_indexes(failing, "background"))
+        self.record(result is None, "background: a failed build is logged, not raised into the event loop")
+
+    def test_configured_indexes(self):
+        print("\n🔍 Text index selection...")
+        for backend in ("memory", "off"):
+            self.record((("contact_submissions", TEXT_INDEX_NAME) not in _names(configured_indexes(backend))),
+                        f"SEARCH_BACKEND={backend}: no text index")
+        indexes = configured_indexes("mongo")
+        self.record(_names(indexes) == _names(INDEXES) | {("contact_submissions", TEXT_INDEX_NAME)},
+                    "SEARCH_BACKEND=mongo: INDEXES plus the text index")
+        self.record(TEXT_SEARCH_INDEX not in INDEXES["contact_submissions"], "INDEXES left unchanged")
+
+    async def test_startup(self):
+        print("\n🔍 Startup with a background index build...")
+        import httpx
+        import server
+
+        os.environ.setdefault('MONGO_URL', MONGO_URL)
+        os.environ.setdefault('DB_NAME', 'db_indexes_test')
+        os.environ['MONGO_WARMUP'] = 'false'
+        os.environ['DB_INDEX_BUILD'] = 'background'
+
+        class SearchBackend:
+            def __init__(self, name):
+                self.name = name
+
+            def start(self):
+                pass
+
+            async def stop(self):
+                pass
+
+        async def noop():
+            return None
+
+        for backend in ("memory", "mongo"):
+            app = server.create_app()
+            state = app.state
+            db = state.db = GatedDatabase()
+            # Only the index build is under test; keep the other services idle
+            state.email_queue.start = state.email_queue.stop = noop
+            state.contact_stats.start = lambda: None
+            state.retention = None
+            state.contact_search = SearchBackend(backend)
+            async with app.router.lifespan_context(app):
+                async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                    response = await client.get("/api/")
+                self.record(response.status_code == 200 and not state.index_build.done() and not db.requested,
+                            f"{backend}: app serving while the index build is pending")
+                db.gate.set()
+                await state.index_build
+            has_text = ("contact_submissions", TEXT_INDEX_NAME) in db.requested
+            self.record(has_text == (backend == "mongo"),
+                        f"{backend}: text index {'built' if has_text else 'skipped'}")
+
+    async def run_all_tests(self):
+        db, real_mongo = await get_database()
+        await self.test_ensure_indexes(db)
+        await self.test_bootstrap_modes()
+        self.test_configured_indexes()
+        await self.test_startup()
+        if real_mongo:
+            await db.client.drop_database(db.name)
+        print(f"\n📊 {self.passed} passed, {self.failed} failed")
+        return self.failed == 0
+
+
+def main():
+    tester = DbIndexesTester()
+    return 0 if asyncio.run(tester.run_all_tests()) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
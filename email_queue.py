@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import random
+import uuid
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+
+class EmailDeliveryQueue:
+    """
+    Background delivery of contact form notifications.
+    Every email is first written to a persistent outbox collection, then handed
+    to a pool of asyncio workers. Failed deliveries are retried with exponential
+    backoff and moved to a dead-letter collection after max_attempts.
+    Emails that arrive within batch_window of each other are sent together
+    over one SMTP session.
+    """
+
+    def __init__(self, db, email_service, workers: int = 2, max_attempts: int = 5,
+                 base_delay: float = 2.0, max_delay: float = 600.0,
+                 poll_interval: float = 30.0, claim_timeout: float = 600.0,
+                 batch_size: int = 20, batch_window: float = 0.05):
+        self.outbox = db.email_outbox
+        self.dead_letter = db.email_dead_letter
+        self.email_service = email_service
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.claim_timeout = claim_timeout
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.queue = None
+        self._queued = set()
+        self._tasks = []
+
+    async def start(self):
+        """Start the worker pool and the outbox poller"""
+        self.queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._poll_outbox()))
+        logger.info("Email delivery queue started with %d workers", self.workers)
+
+    async def stop(self, timeout: float = 10.0):
+        """Give in-flight deliveries a chance to finish, then stop the workers"""
+        if self.queue is not None:
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning("%d emails left in the outbox for the next start", self.queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+        # Before Python 3.12 wait_for can swallow a cancellation that races
+        # with queue.get() completing, so cancel until every worker has stopped
+        pending = set(self._tasks)
+        while pending:
+            _, pending = await asyncio.wait(pending, timeout=0.1)
+            for task in pending:
+                task.cancel()
+        self._tasks = []
+        await asyncio.get_running_loop().run_in_executor(None, self.email_service.close)
+
+    async def enqueue(self, form_data: dict):
+        """Persist a notification in the outbox and schedule its delivery"""
+        now = datetime.utcnow()
+        email_id = str(uuid.uuid4())
+        await self.outbox.insert_one({
+            "id": email_id,
+            "form_data": form_data,
+            "status": "pending",
+            "attempts": 0,
+            "last_error": None,
+            "created_at": now,
+            "next_attempt_at": now,
+        })
+        self._schedule(email_id)
+        return email_id
+
+    def _schedule(self, email_id: str, delay: float = 0.0):
+        if self.queue is None or email_id in self._queued:
+            # Not running (or already queued); the poller picks it up later
+            return
+        self._queued.add(email_id)
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, self.queue.put_nowait, email_id)
+        else:
+            self.queue.put_nowait(email_id)
+
+    def backoff(self, attempts: int) -> float:
+        """Delay before the next attempt, with jitter to spread out retries"""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _next_batch(self):
+        """Wait for one email, then gather whatever else arrives within batch_window"""
+        batch = [await self.queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.batch_window
+        while len(batch) < self.batch_size:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _worker(self, number: int):
+        while True:
+            batch = await self._next_batch()
+            self._queued.difference_update(batch)
+            try:
+                await self._deliver(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Email worker %d failed on batch of %d: %s", number, len(batch), e)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _claim(self, email_id: str):
+        # Claim the message so other workers and processes skip it
+        return await self.outbox.find_one_and_update(
+            {"id": email_id, "status": "pending"},
+            {"$set": {"status": "sending", "claimed_at": datetime.utcnow()},
+             "$inc": {"attempts": 1}},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _deliver(self, email_ids):
+        claimed = await asyncio.gather(*(self._claim(email_id) for email_id in email_ids))
+        documents = [document for document in claimed if document is not None]
+        if not documents:
+            return
+
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(
+            None, self.email_service.send_contact_form_emails,
+            [document["form_data"] for document in documents],
+        )
+
+        for document, (success, message) in zip(documents, results):
+            if success:
+                await self.outbox.delete_one({"id": document["id"]})
+            else:
+                await self._handle_failure(document, message)
+
+    async def _handle_failure(self, document, message):
+        email_id = document["id"]
+        attempts = document["attempts"]
+        if attempts >= self.max_attempts:
+            document.pop("_id", None)
+            document.update(status="dead", last_error=message, failed_at=datetime.utcnow())
+            await self.dead_letter.insert_one(document)
+            await self.outbox.delete_one({"id": email_id})
+            logger.error("Email %s moved to dead letter after %d attempts: %s", email_id, attempts, message)
+            return
+
+        delay = self.backoff(attempts)
+        await self.outbox.update_one(
+            {"id": email_id},
+            {"$set": {
+                "status": "pending",
+                "last_error": message,
+                "next_attempt_at": datetime.utcnow() + timedelta(seconds=delay),
+            }},
+        )
+        logger.warning("Email %s attempt %d failed, retrying in %.0fs", email_id, attempts, delay)
+        self._schedule(email_id, delay)
+
+    async def _poll_outbox(self):
+        """Pick up messages left over from restarts and stale claims"""
+        while True:
+            try:
+                now = datetime.utcnow()
+                # Claims older than claim_timeout belong to a crashed worker
+                await self.outbox.update_many(
+                    {"status": "sending",
+                     "claimed_at": {"$lt": now - timedelta(seconds=self.claim_timeout)}},
+                    {"$set": {"status": "pending"}},
+                )
+                cursor = self.outbox.find(
+                    {"status": "pending", "next_attempt_at": {"$lte": now}}, {"id": 1}
+                ).limit(500)
+                async for document in cursor:
+                    self._schedule(document["id"])
+            except Exception as e:
+                logger.error("Error polling email outbox: %s", e)
+            await asyncio.sleep(self.poll_interval)
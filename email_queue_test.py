@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Email Delivery Queue Testing for SNO Website
+Runs the outbox queue against a local aiosmtpd server standing in for Gmail.
+Uses MongoDB at MONGO_URL when reachable, otherwise mongomock-motor.
+Requires: pip install aiosmtpd mongomock-motor
+"""
+
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+
+from email_service import EmailService
+from email_queue import EmailDeliveryQueue
+
+load_dotenv('/app/backend/.env')
+
+MONGO_URL = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+SMTP_PORT = 8025
+
+SAMPLE_FORM = {
+    "name": "Teste Fila",
+    "email": "test.queue@example.com",
+    "message": "Mensagem de teste da fila de e-mails.",
+}
+
+
+class RecordingHandler:
+    """aiosmtpd handler that keeps every message it receives"""
+
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return "250 Message accepted for delivery"
+
+
+async def get_database():
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=1000)
+        await client.admin.command('ping')
+        print("✅ Using MongoDB at", MONGO_URL)
+        return client[f"email_queue_test_{time.time_ns()}"]
+    except Exception:
+        from mongomock_motor import AsyncMongoMockClient
+        print("⚠️ MongoDB not available, using mongomock-motor")
+        return AsyncMongoMockClient()["email_queue_test"]
+
+
+def local_email_service(port):
+    service = EmailService()
+    service.smtp_server = "127.0.0.1"
+    service.smtp_port = port
+    service.smtp_username = None
+    service.smtp_use_tls = False
+    service.smtp_enabled = True
+    return service
+
+
+async def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if await condition():
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+class EmailQueueTester:
+    def __init__(self):
+        self.passed = 0
+        self.failed = 0
+
+    def record(self, ok, description):
+        if ok:
+            self.passed += 1
+            print(f"✅ {description}")
+        else:
+            self.failed += 1
+            print(f"❌ {description}")
+
+    async def test_delivery(self, db):
+        """Queued emails reach the SMTP server and leave the outbox"""
+        print("\n🔍 Testing delivery through local SMTP server...")
+        from aiosmtpd.controller import Controller
+
+        handler = RecordingHandler()
+        controller = Controller(handler, hostname="127.0.0.1", port=SMTP_PORT)
+        controller.start()
+        queue = EmailDeliveryQueue(db, local_email_service(SMTP_PORT), workers=4)
+        await queue.start()
+        try:
+            started = time.perf_counter()
+            for n in range(20):
+                await queue.enqueue(dict(SAMPLE_FORM, name=f"Teste {n}"))
+            enqueue_ms = (time.perf_counter() - started) * 1000 / 20
+            self.record(enqueue_ms < 50, f"enqueue takes {enqueue_ms:.2f} ms per email")
+
+            async def all_delivered():
+                return len(handler.messages) == 20
+            self.record(await wait_for(all_delivered), f"{len(handler.messages)}/20 emails delivered")
+
+            async def outbox_empty():
+                return await db.email_outbox.count_documents({}) == 0
+            self.record(await wait_for(outbox_empty), "outbox is empty after delivery")
+        finally:
+            await queue.stop()
+            controller.stop()
+
+    async def test_retry_and_dead_letter(self, db):
+        """Emails to an unreachable server are retried, then dead-lettered"""
+        print("\n🔍 Testing retries and dead-letter collection...")
+        # Nothing listens on this port, so every attempt fails
+        queue = EmailDeliveryQueue(db, local_email_service(SMTP_PORT + 1), workers=1,
+                                   max_attempts=3, base_delay=0.05)
+        await queue.start()
+        try:
+            email_id = await queue.enqueue(SAMPLE_FORM)
+
+            async def dead_lettered():
+                return await db.email_dead_letter.find_one({"id": email_id}) is not None
+            self.record(await wait_for(dead_lettered), "failing email reached the dead-letter collection")
+
+            document = await db.email_dead_letter.find_one({"id": email_id})
+            self.record(document is not None and document["attempts"] == 3,
+                        f"dead letter records {document and document['attempts']} attempts")
+            self.record(await db.email_outbox.find_one({"id": email_id}) is None,
+                        "dead-lettered email removed from outbox")
+        finally:
+            await queue.stop()
+
+    async def run_all_tests(self):
+        db = await get_database()
+        await self.test_delivery(db)
+        await self.test_retry_and_dead_letter(db)
+        print(f"\n📊 {self.passed} passed, {self.failed} failed")
+        return self.failed == 0
+
+
+def main():
+    tester = EmailQueueTester()
+    return 0 if asyncio.run(tester.run_all_tests()) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -1,92 +1,119 @@
 import logging
-from datetime import datetime
+import os
+import smtplib
+
+from email_templates import contact_email_renderer
+from smtp_pool import SMTPConnectionPool
 
 logger = logging.getLogger(__name__)
 
 class EmailService:
     def __init__(self):
-        self.smtp_server = "smtp.gmail.com"
-        self.smtp_port = 587
-        # Will use environment variables for production
-        # For now, we'll create a basic email template
+        self.smtp_server = os.environ.get("SMTP_SERVER", "smtp.gmail.com")
+        self.smtp_port = int(os.environ.get("SMTP_PORT", "587"))
+        self.smtp_username = os.environ.get("SMTP_USERNAME")
+        self.smtp_password = os.environ.get("SMTP_PASSWORD")
+        self.smtp_use_tls = os.environ.get("SMTP_USE_TLS", "true").lower() == "true"
+        self.recipient = os.environ.get("CONTACT_EMAIL_TO", "contato@sno.digital")
+        # Without SMTP_ENABLED the email content is only logged (development)
+        self.smtp_enabled = os.environ.get("SMTP_ENABLED", "false").lower() == "true"
+        self.smtp_max_connections = int(os.environ.get("SMTP_MAX_CONNECTIONS", "4"))
+        self._pool = None
+        self.renderer = contact_email_renderer
         
     def create_contact_email_template(self, form_data):
         """Create HTML email template for contact form submission"""
-        
-        html_template = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background: #1f2937; color: white; padding: 20px; border-radius: 8px 8px 0 0; }}
-                .content {{ background: #f9fafb; padding: 20px; }}
-                .footer {{ background: #374151; color: white; padding: 15px; border-radius: 0 0 8px 8px; text-align: center; }}
-                .field {{ margin-bottom: 15px; }}
-                .label {{ font-weight: bold; color: #1f2937; }}
-                .value {{ background: white; padding: 10px; border-radius: 4px; border: 1px solid #e5e7eb; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h2>🚀 Nova Mensagem - SNO Website</h2>
-                </div>
-                
-                <div class="content">
-                    <div class="field">
-                        <div class="label">Nome do Cliente:</div>
-                        <div class="value">{form_data['name']}</div>
-                    </div>
-                    
-                    <div class="field">
-                        <div class="label">E-mail:</div>
-                        <div class="value">{form_data['email']}</div>
-                    </div>
-                    
-                    <div class="field">
-                        <div class="label">Mensagem:</div>
-                        <div class="value">{form_data['message']}</div>
-                    </div>
-                    
-                    <div class="field">
-                        <div class="label">Data/Hora:</div>
-                        <div class="value">{datetime.now().strftime('%d/%m/%Y às %H:%M')}</div>
-                    </div>
-                </div>
-                
-                <div class="footer">
-                    <p>SNO - Seu Negócio Online | contato@sno.digital</p>
-                </div>
-            </div>
-        </body>
-        </html>
+        return self.renderer.render_html(form_data).decode("utf-8")
+
+    def build_message(self, form_data):
+        """Build the multipart text/HTML message for a contact form notification"""
+        return self.renderer.build_message(
+            form_data, sender=self.smtp_username or self.recipient, recipient=self.recipient
+        )
+
+    def connect(self):
+        """Open an authenticated SMTP session"""
+        smtp = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=30)
+        try:
+            if self.smtp_use_tls:
+                smtp.starttls()
+            if self.smtp_username:
+                smtp.login(self.smtp_username, self.smtp_password)
+        except Exception:
+            smtp.close()
+            raise
+        return smtp
+
+    @property
+    def pool(self):
+        """SMTP session pool, created on first use"""
+        if self._pool is None:
+            self._pool = SMTPConnectionPool(self.connect, max_connections=self.smtp_max_connections)
+        return self._pool
+
+    def deliver(self, message):
+        """Send a message over SMTP, raising on any delivery failure"""
+        error = self.pool.send_many([message])[0]
+        if error is not None:
+            raise error
+
+    def close(self):
+        """Close pooled SMTP sessions"""
+        if self._pool is not None:
+            self._pool.close()
+
+    def send_contact_form_emails(self, forms):
         """
-        
-        return html_template
-    
+        Send several contact form notifications over one SMTP session
+        Returns:
+            list: (success, message) for each form, like send_contact_form_email
+        """
+        if not self.smtp_enabled:
+            return [self.send_contact_form_email(form_data) for form_data in forms]
+
+        results = [None] * len(forms)
+        messages, positions = [], []
+        for index, form_data in enumerate(forms):
+            try:
+                messages.append(self.build_message(form_data))
+                positions.append(index)
+            except Exception as e:
+                results[index] = (False, f"Erro ao processar email: {str(e)}")
+
+        for index, error in zip(positions, self.pool.send_many(messages)):
+            if error is None:
+                results[index] = (True, "Email enviado com sucesso")
+            else:
+                logger.error("Erro ao processar email: %s", error)
+                results[index] = (False, f"Erro ao processar email: {str(error)}")
+        logger.info("Sent %d emails to %s in one SMTP session", len(messages), self.recipient)
+        return results
+
     def send_contact_form_email(self, form_data):
         """
         Send contact form email notification
-        Currently logs email content for development
-        In production, implement actual SMTP sending
+        Sends over SMTP when SMTP_ENABLED is set, otherwise logs the email
+        content for development. This blocks on network I/O, so call it
+        from a worker thread rather than the event loop.
         """
         try:
-            # Create email content
-            subject = f"[SNO Website] Nova mensagem de {form_data['name']}"
-            html_content = self.create_contact_email_template(form_data)
+            subject = self.renderer.subject(form_data)
+
+            if self.smtp_enabled:
+                self.deliver(self.build_message(form_data))
+                logger.info("Email sent to %s: %s", self.recipient, subject)
+                return True, "Email enviado com sucesso"
             
-            # For development, log the email content
-            logger.info("=== CONTACT FORM EMAIL ===")
-            logger.info(f"To: contato@sno.digital")
-            logger.info(f"Subject: {subject}")
-            logger.info(f"From: {form_data['name']} <{form_data['email']}>")
-            logger.info(f"Message Preview: {form_data['message'][:100]}...")
-            logger.info("=== EMAIL LOGGED SUCCESSFULLY ===")
+            # For development, log the email content; the banners are what
+            # final_backend_verification.py counts in the log
+            logger.info(
+                "=== CONTACT FORM EMAIL === To: %s | Subject: %s | From: %s <%s> | "
+                "Message Preview: %.100s... === EMAIL LOGGED SUCCESSFULLY ===",
+                self.recipient, subject, form_data['name'], form_data['email'], form_data['message'],
+            )
             
             return True, "Email processado com sucesso"
             
         except Exception as e:
-            logger.error(f"Erro ao processar email: {str(e)}")
+            logger.error("Erro ao processar email: %s", e)
             return False, f"Erro ao processar email: {str(e)}"
\ No newline at end of file
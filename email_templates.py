@@ -0,0 +1,159 @@
+import html
+import time
+from datetime import datetime
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.utils import formataddr
+from string import Formatter
+
+CONTACT_EMAIL_HTML = """<!DOCTYPE html>
+<html>
+<head>
+    <style>
+        body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+        .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+        .header {{ background: #1f2937; color: white; padding: 20px; border-radius: 8px 8px 0 0; }}
+        .content {{ background: #f9fafb; padding: 20px; }}
+        .footer {{ background: #374151; color: white; padding: 15px; border-radius: 0 0 8px 8px; text-align: center; }}
+        .field {{ margin-bottom: 15px; }}
+        .label {{ font-weight: bold; color: #1f2937; }}
+        .value {{ background: white; padding: 10px; border-radius: 4px; border: 1px solid #e5e7eb; }}
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <h2>🚀 Nova Mensagem - SNO Website</h2>
+        </div>
+
+        <div class="content">
+            <div class="field">
+                <div class="label">Nome do Cliente:</div>
+                <div class="value">{name}</div>
+            </div>
+
+            <div class="field">
+                <div class="label">E-mail:</div>
+                <div class="value">{email}</div>
+            </div>
+
+            <div class="field">
+                <div class="label">Mensagem:</div>
+                <div class="value">{message}</div>
+            </div>
+
+            <div class="field">
+                <div class="label">Data/Hora:</div>
+                <div class="value">{timestamp}</div>
+            </div>
+        </div>
+
+        <div class="footer">
+            <p>SNO - Seu Negócio Online | contato@sno.digital</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+CONTACT_EMAIL_TEXT = """Nova Mensagem - SNO Website
+
+Nome do Cliente: {name}
+E-mail: {email}
+Data/Hora: {timestamp}
+
+Mensagem:
+{message}
+
+--
+SNO - Seu Negócio Online | contato@sno.digital
+"""
+
+
+class CompiledTemplate:
+    """
+    Template parsed once into static byte chunks and field names.
+    Rendering only escapes the field values and joins the pieces.
+    """
+
+    def __init__(self, source: str, escape=None):
+        self.escape = escape
+        self.parts = []
+        for literal, field, _, _ in Formatter().parse(source):
+            if literal:
+                self.parts.append(literal.encode("utf-8"))
+            if field is not None:
+                self.parts.append(field)
+
+    def render(self, values: dict) -> bytes:
+        escape = self.escape
+        chunks = []
+        for part in self.parts:
+            if part.__class__ is bytes:
+                chunks.append(part)
+            else:
+                value = str(values[part])
+                chunks.append((escape(value) if escape else value).encode("utf-8"))
+        return b"".join(chunks)
+
+
+class _MinuteClock:
+    """Formatted local time, recomputed at most once per minute"""
+
+    def __init__(self, fmt: str):
+        self.fmt = fmt
+        self._minute = None
+        self._value = None
+
+    def __call__(self) -> str:
+        minute = int(time.time() // 60)
+        if minute != self._minute:
+            self._value = datetime.now().strftime(self.fmt)
+            self._minute = minute
+        return self._value
+
+
+def _header(value: str) -> str:
+    # Header values must not carry line breaks from user input
+    return " ".join(str(value).split())
+
+
+class ContactEmailRenderer:
+    """Renders contact form notifications from precompiled templates"""
+
+    def __init__(self):
+        self.html = CompiledTemplate(CONTACT_EMAIL_HTML, escape=html.escape)
+        self.text = CompiledTemplate(CONTACT_EMAIL_TEXT)
+        self.timestamp = _MinuteClock("%d/%m/%Y às %H:%M")
+
+    def _values(self, form_data: dict) -> dict:
+        return {
+            "name": form_data["name"],
+            "email": form_data["email"],
+            "message": form_data["message"],
+            "timestamp": self.timestamp(),
+        }
+
+    def render_html(self, form_data: dict) -> bytes:
+        return self.html.render(self._values(form_data))
+
+    def subject(self, form_data: dict) -> str:
+        return f"[SNO Website] Nova mensagem de {_header(form_data['name'])}"
+
+    def build_message(self, form_data: dict, sender: str, recipient: str) -> MIMEMultipart:
+        """Build a multipart text/HTML notification ready for smtplib.send_message"""
+        # The compat32 MIME classes are several times cheaper to build than
+        # email.message.EmailMessage with the default header policy
+        values = self._values(form_data)
+        message = MIMEMultipart("alternative")
+        message["Subject"] = self.subject(form_data)
+        message["From"] = sender
+        message["To"] = recipient
+        message["Reply-To"] = formataddr((_header(form_data["name"]), _header(form_data["email"])))
+        message.attach(MIMEText(self.text.render(values).decode("utf-8"), "plain", "utf-8"))
+        message.attach(MIMEText(self.html.render(values).decode("utf-8"), "html", "utf-8"))
+        return message
+
+
+# Parsed once at import so every notification reuses the same chunks
+contact_email_renderer = ContactEmailRenderer()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Email Template Testing for SNO Website
+Checks that contact notifications HTML-escape what the client typed in the
+HTML part while the text part keeps it as typed, that the precompiled
+templates render what str.format would, and that header values can't
+carry line breaks.
+"""
+
+import html
+from email import message_from_bytes
+
+from email_templates import CONTACT_EMAIL_HTML, CONTACT_EMAIL_TEXT, ContactEmailRenderer
+
+HOSTILE_FORM = {
+    "name": "<script>alert('x')</script> Ana & Cia",
+    "email": "ana@example.com",
+    "message": "Orçamento <b>urgente</b> & \"rápido\"\n<img src=x onerror=alert(1)>",
+}
+
+
+class EmailTemplatesTester:
+    def __init__(self):
+        self.passed = 0
+        self.failed = 0
+
+    def record(self, ok, description):
+        if ok:
+            self.passed += 1
+            print(f"✅ {description}")
+        else:
+            self.failed += 1
+            print(f"❌ {description}")
+
+    def parts(self, renderer, form):
+        """Text and HTML parts of a notification, as a mail client decodes them"""
+        message = message_from_bytes(renderer.build_message(form, "site@sno.digital", "contato@sno.digital").as_bytes())
+        payloads = {part.get_content_type(): part.get_payload(decode=True).decode("utf-8")
+                    for part in message.walk() if not part.is_multipart()}
+        return message, payloads["text/plain"], payloads["text/html"]
+
+    def test_escaping(self):
+        print("\n🔍 Escaping of submitted fields...")
+        renderer = ContactEmailRenderer()
+        _, text, html_part = self.parts(renderer, HOSTILE_FORM)
+        for field in ("name", "message"):
+            value = HOSTILE_FORM[field]
+            self.record(html.escape(value) in html_part, f"HTML part escapes the {field}")
+            self.record(value in text, f"Text part keeps the {field} as typed")
+        self.record("<script>" not in html_part and "<img" not in html_part and "<b>" not in html_part,
+                    "No submitted markup survives in the HTML part")
+        self.record("&amp; Cia" in html_part and "&quot;rápido&quot;" in html_part,
+                    "Ampersands and quotes escaped")
+        self.record(renderer.render_html(HOSTILE_FORM).decode("utf-8") == html_part,
+                    "render_html matches the HTML part")
+
+    def test_matches_format(self):
+        print("\n🔍 Precompiled templates...")
+        renderer = ContactEmailRenderer()
+        values = {**HOSTILE_FORM, "timestamp": renderer.timestamp()}
+        escaped = {field: html.escape(value) for field, value in values.items()}
+        self.record(renderer.html.render(values).decode("utf-8") == CONTACT_EMAIL_HTML.format(**escaped),
+                    "HTML template renders like str.format with escaped values")
+        self.record(renderer.text.render(values).decode("utf-8") == CONTACT_EMAIL_TEXT.format(**values),
+                    "Text template renders like str.format")
+
+    def test_headers(self):
+        print("\n🔍 Headers built from submitted fields...")
+        renderer = ContactEmailRenderer()
+        form = {**HOSTILE_FORM, "name": "Ana\r\nBcc: todos@example.com", "email": "ana@example.com\nCc: x@example.com"}
+        message, _, _ = self.parts(renderer, form)
+        self.record(message["Bcc"] is None and message["Cc"] is None, "No headers injected through line breaks")
+        self.record(message["Subject"] == "[SNO Website] Nova mensagem de Ana Bcc: todos@example.com",
+                    f"Subject on one line: {message['Subject']!r}")
+        self.record("\n" not in message["Reply-To"], f"Reply-To on one line: {message['Reply-To']!r}")
+
+    def run_all_tests(self):
+        self.test_escaping()
+        self.test_matches_format()
+        self.test_headers()
+        print(f"\n📊 {self.passed} passed, {self.failed} failed")
+        return self.failed == 0
+
+
+def main():
+    tester = EmailTemplatesTester()
+    return 0 if tester.run_all_tests() else 1
+
+
+if __name__ == "__main__":
+    exit(main())
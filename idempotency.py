@@ -0,0 +1,154 @@
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 255
+
+
+def fingerprint(*values: str) -> str:
+    """Hash of the request content a key was first used with"""
+    return hashlib.blake2b("\0".join(values).encode(), digest_size=16).hexdigest()
+
+
+def valid_key(key: str) -> bool:
+    return 0 < len(key) <= MAX_KEY_LENGTH and key.isprintable()
+
+
+class IdempotencyStore:
+    """
+    Remembers the response given for each Idempotency-Key so a retried
+    request gets it back without running again. Keys live in an in-process
+    LRU and, when a collection is given, in a MongoDB collection with a TTL
+    index (see db_indexes) so a retry landing on another worker is also
+    answered from the stored response.
+
+    A key is claimed as pending before the request runs; a retry arriving
+    meanwhile is told the request is in progress. Pending claims expire
+    after pending_ttl so a crashed worker can't hold a key forever.
+    """
+
+    def __init__(self, collection=None, max_entries: int = 10_000, ttl: float = 86400,
+                 pending_ttl: float = 60, clock=time.time):
+        self.collection = collection
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.pending_ttl = pending_ttl
+        self.clock = clock
+        # key -> [expires at, fingerprint, response or None while pending]
+        self.entries = OrderedDict()
+
+    def _remember(self, key, expires_at, request_fingerprint, response):
+        self.entries[key] = [expires_at, request_fingerprint, response]
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _local(self, key):
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] <= self.clock():
+            del self.entries[key]
+            return None
+        return entry
+
+    @staticmethod
+    def _outcome(entry, request_fingerprint):
+        if entry[1] != request_fingerprint:
+            return "mismatch", None
+        if entry[2] is None:
+            return "in_progress", None
+        return "replay", entry[2]
+
+    async def begin(self, key: str, request_fingerprint: str):
+        """
+        Claim a key for a request about to run
+        Returns:
+            tuple: (outcome, response) where outcome is "new" (go ahead, then
+                call complete or release), "replay" with the stored response,
+                "in_progress" or "mismatch" (the key was used for other content)
+        """
+        entry = self._local(key)
+        if entry is not None:
+            return self._outcome(entry, request_fingerprint)
+
+        now = self.clock()
+        # Claimed locally before any await, so concurrent retries on this
+        # worker see the pending entry
+        self._remember(key, now + self.pending_ttl, request_fingerprint, None)
+        if self.collection is None:
+            return "new", None
+
+        try:
+            return await self._claim_shared(key, request_fingerprint, now)
+        except Exception as e:
+            # Fall back to the local claim rather than failing the request
+            logger.error("Idempotency key claim failed for %s: %s", key, e)
+            return "new", None
+
+    async def _claim_shared(self, key, request_fingerprint, now):
+        pending = {
+            "fingerprint": request_fingerprint,
+            "response": None,
+            "expires_at": datetime.utcfromtimestamp(now + self.pending_ttl),
+        }
+        try:
+            await self.collection.insert_one({"_id": key, **pending})
+            return "new", None
+        except DuplicateKeyError:
+            pass
+
+        stored = await self.collection.find_one({"_id": key})
+        if stored is None or stored["expires_at"] <= datetime.utcfromtimestamp(now):
+            # Expired but not yet removed by the TTL monitor: take it over
+            await self.collection.replace_one({"_id": key}, pending, upsert=True)
+            return "new", None
+        entry = [stored["expires_at"].replace(tzinfo=timezone.utc).timestamp(),
+                 stored["fingerprint"], stored["response"]]
+        if stored["response"] is not None:
+            self._remember(key, *entry)
+        else:
+            # Another worker holds the claim
+            self.entries.pop(key, None)
+        return self._outcome(entry, request_fingerprint)
+
+    async def complete(self, key: str, request_fingerprint: str, response: dict):
+        """Store the response for a key claimed with begin"""
+        expires_at = self.clock() + self.ttl
+        self._remember(key, expires_at, request_fingerprint, response)
+        if self.collection is None:
+            return
+        try:
+            await self.collection.update_one({"_id": key}, {"$set": {
+                "response": response,
+                "expires_at": datetime.utcfromtimestamp(expires_at),
+            }})
+        except Exception as e:
+            logger.error("Idempotency response write failed for %s: %s", key, e)
+
+    async def release(self, key: str):
+        """Drop the claim on a key whose request failed, so it can be retried"""
+        self.entries.pop(key, None)
+        if self.collection is None:
+            return
+        try:
+            await self.collection.delete_one({"_id": key, "response": None})
+        except Exception as e:
+            logger.error("Idempotency key release failed for %s: %s", key, e)
+
+
+def create_idempotency_store(name: str = "mongo", db=None):
+    """Build the idempotency store selected by name (mongo, memory or off)"""
+    if name == "off":
+        return None
+    if name == "memory":
+        return IdempotencyStore()
+    if name == "mongo":
+        if db is None:
+            raise ValueError("The mongo idempotency backend needs a database")
+        return IdempotencyStore(db.idempotency_keys)
+    raise ValueError(f"Unknown idempotency backend: {name}")
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Idempotency Testing for SNO Website
+Checks the IdempotencyStore claim / complete / release cycle, in process and
+shared between workers through one collection, key expiry, and how the
+contact route answers retries, in-flight duplicates and reused keys.
+Uses MongoDB at MONGO_URL when reachable, otherwise mongomock-motor.
+"""
+
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+
+from idempotency import IdempotencyStore, fingerprint
+
+load_dotenv('/app/backend/.env')
+
+MONGO_URL = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+
+SAMPLE_FORM = {
+    "name": "Teste Idempotência",
+    "email": "test.idempotency@example.com",
+    "message": "Mensagem de teste com Idempotency-Key.",
+}
+FIRST = fingerprint("a", "b", "c")
+OTHER = fingerprint("a", "b", "d")
+RESPONSE = {"success": True, "message": "ok", "errors": None}
+
+
+class FakeClock:
+    def __init__(self):
+        # Start at the real time so stored expiry dates are meaningful
+        self.start = time.time()
+        self.offset = 0.0
+
+    def __call__(self):
+        return self.start + self.offset
+
+
+async def get_database():
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=1000)
+        await client.admin.command('ping')
+        print("✅ Using MongoDB at", MONGO_URL)
+        return client[f"idempotency_test_{time.time_ns()}"]
+    except Exception:
+        from mongomock_motor import AsyncMongoMockClient
+        print("⚠️ MongoDB not available, using mongomock-motor")
+        return AsyncMongoMockClient()["idempotency_test"]
+
+
+class IdempotencyTester:
+    def __init__(self):
+        self.passed = 0
+        self.failed = 0
+
+    def record(self, ok, description):
+        if ok:
+            self.passed += 1
+            print(f"✅ {description}")
+        else:
+            self.failed += 1
+            print(f"❌ {description}")
+
+    async def test_lifecycle(self, label, stores):
+        """stores: two stores standing in for two workers (the same one in process)"""
+        print(f"\n🔍 Claim, complete and release ({label})...")
+        first, second = stores
+
+        outcome, _ = await first.begin("key-1", FIRST)
+        self.record(outcome == "new", f"First use of a key runs: {outcome}")
+        outcome, _ = await second.begin("key-1", FIRST)
+        self.record(outcome == "in_progress", f"Duplicate while in flight: {outcome}")
+        outcome, _ = await second.begin("key-1", OTHER)
+        self.record(outcome == "mismatch", f"Other content while in flight: {outcome}")
+
+        await first.complete("key-1", FIRST, RESPONSE)
+        outcome, response = await second.begin("key-1", FIRST)
+        self.record(outcome == "replay" and response == RESPONSE, f"Retry after completion replayed: {outcome}")
+        outcome, _ = await second.begin("key-1", OTHER)
+        self.record(outcome == "mismatch", f"Other content after completion: {outcome}")
+
+        await first.begin("key-2", FIRST)
+        await first.release("key-2")
+        outcome, _ = await second.begin("key-2", FIRST)
+        self.record(outcome == "new", f"Released key runs again: {outcome}")
+
+        results = await asyncio.gather(*(store.begin("key-3", FIRST) for store in stores for _ in range(5)))
+        outcomes = sorted(outcome for outcome, _ in results)
+        self.record(outcomes.count("new") == 1 and outcomes.count("in_progress") == 9,
+                    f"10 concurrent claims, one runs: {outcomes.count('new')} new, "
+                    f"{outcomes.count('in_progress')} in progress")
+
+    async def test_expiry(self, label, stores, clock):
+        print(f"\n🔍 Key expiry ({label})...")
+        first, second = stores
+
+        await first.begin("pending", FIRST)
+        clock.offset += first.pending_ttl - 1
+        outcome, _ = await second.begin("pending", FIRST)
+        self.record(outcome == "in_progress", f"Pending claim held before pending_ttl: {outcome}")
+        clock.offset += 2
+        outcome, _ = await second.begin("pending", FIRST)
+        self.record(outcome == "new", f"Abandoned claim taken over after pending_ttl: {outcome}")
+
+        await first.begin("done", FIRST)
+        await first.complete("done", FIRST, RESPONSE)
+        clock.offset += first.ttl - 1
+        outcome, _ = await second.begin("done", FIRST)
+        self.record(outcome == "replay", f"Response kept until ttl: {outcome}")
+        clock.offset += 2
+        outcome, _ = await second.begin("done", OTHER)
+        self.record(outcome == "new", f"Expired key reusable for other content: {outcome}")
+
+    async def test_route(self):
+        print("\n🔍 Contact route with Idempotency-Key...")
+        import httpx
+        import server
+        from models import ContactFormResponse
+
+        os.environ.setdefault('MONGO_URL', MONGO_URL)
+        os.environ.setdefault('DB_NAME', 'idempotency_test')
+        os.environ['IDEMPOTENCY_BACKEND'] = 'memory'
+        app = server.create_app()
+
+        # Stand in for storing and emailing: held until released, or failing
+        gate = asyncio.Event()
+        calls = []
+
+        async def process(form_data, request):
+            calls.append(form_data.message)
+            await gate.wait()
+            if form_data.message.startswith("Falha"):
+                raise RuntimeError("storage down")
+            return ContactFormResponse(success=True, message="Mensagem enviada")
+
+        original = server.process_contact_submission
+        server.process_contact_submission = process
+        try:
+            transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                async def post(key, form=SAMPLE_FORM):
+                    return await client.post("/api/contact", json=form, headers={"Idempotency-Key": key})
+
+                first = asyncio.create_task(post("route-1"))
+                while not calls:
+                    await asyncio.sleep(0.01)
+                duplicate = await post("route-1")
+                self.record(duplicate.status_code == 409, f"In-flight duplicate: {duplicate.status_code}")
+                gate.set()
+                first = await first
+                self.record(first.status_code == 200, f"First request: {first.status_code}")
+
+                retry = await post("route-1")
+                self.record(retry.status_code == 200 and retry.headers.get("idempotent-replayed") == "true"
+                            and retry.json() == first.json(),
+                            f"Retry replayed: {retry.status_code}, Idempotent-Replayed={retry.headers.get('idempotent-replayed')}")
+                mismatch = await post("route-1", {**SAMPLE_FORM, "message": "Outra mensagem, mesma chave."})
+                self.record(mismatch.status_code == 422, f"Key reused for another message: {mismatch.status_code}")
+
+                failing = {**SAMPLE_FORM, "message": "Falha ao armazenar a mensagem."}
+                failed = await post("route-2", failing)
+                retried = await post("route-2", failing)
+                self.record(failed.status_code == 500 and retried.status_code == 500 and len(calls) == 3,
+                            f"Failed request released its key: ran {len(calls) - 1} times")
+
+                invalid = await post("x" * 300)
+                self.record(invalid.status_code == 400, f"Overlong key rejected: {invalid.status_code}")
+        finally:
+            server.process_contact_submission = original
+
+    async def run_all_tests(self):
+        clock = FakeClock()
+        memory = IdempotencyStore(clock=clock)
+        await self.test_lifecycle("in process", (memory, memory))
+        await self.test_expiry("in process", (memory, memory), clock)
+
+        db = await get_database()
+        clock = FakeClock()
+        workers = (IdempotencyStore(db.idempotency_keys, clock=clock),
+                   IdempotencyStore(db.idempotency_keys, clock=clock))
+        await self.test_lifecycle("two workers, one collection", workers)
+        await self.test_expiry("two workers, one collection", workers, clock)
+
+        await self.test_route()
+        print(f"\n📊 {self.passed} passed, {self.failed} failed")
+        return self.failed == 0
+
+
+def main():
+    tester = IdempotencyTester()
+    return 0 if asyncio.run(tester.run_all_tests()) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Load Testing for SNO Website API
+Drives a weighted mix of requests at fixed concurrency for a fixed duration
+and reports throughput, latency percentiles and error rates as JSON.
+
+By default the app runs in-process over httpx's ASGI transport with
+mongomock-motor standing in for MongoDB; pass --mongo-url to use a local
+mongod instead, or --url to load test a running server. mongomock scans
+collections linearly, so compare write-heavy numbers only between runs on
+the same backend; use --mongo-url for absolute latencies.
+
+Examples:
+    python load_test.py --concurrency 50 --duration 10
+    python load_test.py --mix valid=1,stats=5,root=5 --output results.json
+    python load_test.py --url http://localhost:8001
+    python load_test.py --rate 500 --duration 10
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+import httpx
+
+REQUEST_KINDS = ("valid", "invalid", "rate_limited", "stats", "root")
+
+DEFAULT_MIX = "valid=2,invalid=1,rate_limited=1,stats=3,root=3"
+
+# Statuses each kind of request is expected to produce
+EXPECTED_STATUS = {
+    "valid": {200},
+    "invalid": {422},
+    "rate_limited": {200, 429},
+    "stats": {200},
+    "root": {200},
+}
+
+# Valid messages are random word sequences, so the spam filter doesn't
+# drop repeated load test traffic as duplicates
+MESSAGE_WORDS = (
+    "olá gostaria orçamento site loja virtual empresa contato serviço projeto "
+    "aplicativo marketing digital redes sociais prazo valor reunião suporte "
+    "hospedagem domínio design identidade visual cliente equipe proposta"
+).split()
+
+INVALID_FORM = {"name": "A", "email": "email-invalido", "message": "curta"}
+
+# Submissions per client address before moving to a fresh one, to stay
+# under the 5 per 15 minutes limit for valid traffic
+SUBMISSIONS_PER_ADDRESS = 4
+
+
+def valid_form():
+    return {
+        "name": "Teste Carga",
+        "email": f"test.load.{random.getrandbits(32)}@example.com",
+        "message": " ".join(random.choices(MESSAGE_WORDS, k=12)),
+    }
+
+
+def parse_mix(mix: str):
+    weights = {}
+    for item in mix.split(","):
+        kind, _, weight = item.partition("=")
+        kind = kind.strip()
+        if kind not in REQUEST_KINDS:
+            raise argparse.ArgumentTypeError(f"unknown request kind: {kind}")
+        weights[kind] = float(weight or 1)
+    return weights
+
+
+def percentile(samples, percent):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+
+def summarize(latencies, errors, shed, elapsed):
+    count = len(latencies)
+    return {
+        "requests": count,
+        "rps": round(count / elapsed, 1) if elapsed else 0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2) if count else None,
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2) if count else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2) if count else None,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0,
+        "shed": shed,
+    }
+
+
+class ClientFactory:
+    """Creates HTTP clients, each with its own client address when in-process"""
+
+    def __init__(self, app=None, url=None):
+        self.app = app
+        self.url = url
+        self._addresses = (f"10.{(n >> 16) & 255}.{(n >> 8) & 255}.{n & 255}"
+                           for n in itertools.count(1))
+
+    def create(self, address=None):
+        if self.app is None:
+            return httpx.AsyncClient(base_url=self.url, timeout=30)
+        transport = httpx.ASGITransport(app=self.app, client=(address or next(self._addresses), 40000))
+        return httpx.AsyncClient(transport=transport, base_url="http://loadtest")
+
+
+class LoadGenerator:
+    def __init__(self, clients: ClientFactory, concurrency: int, duration: float, mix: dict,
+                 rate: float = None):
+        self.clients = clients
+        self.concurrency = concurrency
+        # Requests per second for open-loop traffic instead of concurrent users
+        self.rate = rate
+        self.duration = duration
+        self.kinds = list(mix)
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.latencies = {kind: [] for kind in self.kinds}
+        self.errors = {kind: 0 for kind in self.kinds}
+        # 503s from admission control, counted apart from errors
+        self.shed = {kind: 0 for kind in self.kinds}
+        self.statuses = {kind: {} for kind in self.kinds}
+
+    async def _send(self, client, kind):
+        if kind in ("valid", "rate_limited"):
+            return await client.post("/api/contact", json=valid_form())
+        if kind == "invalid":
+            return await client.post("/api/contact", json=INVALID_FORM)
+        if kind == "stats":
+            return await client.get("/api/contact/stats")
+        return await client.get("/api/")
+
+    def _record(self, kind, latency, status):
+        self.latencies[kind].append(latency)
+        self.statuses[kind][str(status)] = self.statuses[kind].get(str(status), 0) + 1
+        if status == 503:
+            self.shed[kind] += 1
+        elif status not in EXPECTED_STATUS[kind]:
+            self.errors[kind] += 1
+
+    async def _timed(self, client, kind, started):
+        try:
+            response = await self._send(client, kind)
+            status = response.status_code
+        except Exception as e:
+            status = type(e).__name__
+        self._record(kind, time.perf_counter() - started, status)
+
+    async def _user(self, deadline, hot_client):
+        client = self.clients.create()
+        submissions = 0
+        try:
+            while time.perf_counter() < deadline:
+                kind = random.choices(self.kinds, self.weights)[0]
+                if kind == "valid" and submissions >= SUBMISSIONS_PER_ADDRESS:
+                    await client.aclose()
+                    client = self.clients.create()
+                    submissions = 0
+                # Rate-limited traffic all comes from one address
+                target = hot_client if kind == "rate_limited" else client
+                await self._timed(target, kind, time.perf_counter())
+                if kind == "valid":
+                    submissions += 1
+        finally:
+            await client.aclose()
+
+    async def _arrivals(self, deadline, hot_client, started):
+        """
+        Open-loop traffic: requests arrive at a fixed rate whether or not
+        earlier ones have finished, and latency counts from the scheduled
+        arrival, so time spent waiting for an overloaded server is included
+        """
+        clients, tasks = [], set()
+        client, submissions = None, SUBMISSIONS_PER_ADDRESS
+        try:
+            for arrival in itertools.count():
+                scheduled = started + arrival / self.rate
+                if scheduled >= deadline:
+                    break
+                if scheduled > time.perf_counter():
+                    await asyncio.sleep(scheduled - time.perf_counter())
+                kind = random.choices(self.kinds, self.weights)[0]
+                if kind == "rate_limited":
+                    target = hot_client
+                else:
+                    if kind == "valid" and submissions >= SUBMISSIONS_PER_ADDRESS or client is None:
+                        client = self.clients.create()
+                        clients.append(client)
+                        submissions = 0
+                    target = client
+                    submissions += kind == "valid"
+                task = asyncio.create_task(self._timed(target, kind, scheduled))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.gather(*tasks)
+        finally:
+            for client in clients:
+                await client.aclose()
+
+    async def run(self):
+        hot_client = self.clients.create("198.51.100.1")
+        started = time.perf_counter()
+        deadline = started + self.duration
+        try:
+            if self.rate:
+                await self._arrivals(deadline, hot_client, started)
+            else:
+                await asyncio.gather(*(self._user(deadline, hot_client) for _ in range(self.concurrency)))
+        finally:
+            await hot_client.aclose()
+        elapsed = time.perf_counter() - started
+
+        all_latencies = [latency for kind in self.kinds for latency in self.latencies[kind]]
+        return {
+            "overall": summarize(all_latencies, sum(self.errors.values()), sum(self.shed.values()), elapsed),
+            "by_kind": {
+                kind: dict(summarize(self.latencies[kind], self.errors[kind], self.shed[kind], elapsed),
+                           statuses=self.statuses[kind])
+                for kind in self.kinds
+            },
+            "elapsed_seconds": round(elapsed, 2),
+        }
+
+
+def load_app(mongo_url=None):
+    """Import the FastAPI app, backed by mongomock-motor unless a MongoDB URL is given"""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.environ["DB_NAME"] = os.environ.get("LOAD_TEST_DB_NAME", "sno_load_test")
+    if mongo_url:
+        os.environ["MONGO_URL"] = mongo_url
+    else:
+        import motor.motor_asyncio
+        from mongomock_motor import AsyncMongoMockClient
+        os.environ["MONGO_URL"] = "mongodb://mongomock"
+        # mongomock has no $text operator
+        os.environ.setdefault("SEARCH_BACKEND", "memory")
+        motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+
+    import server
+    return server.create_app()
+
+
+async def run_load_test(args):
+    mix = parse_mix(args.mix)
+    if args.url:
+        generator = LoadGenerator(ClientFactory(url=args.url), args.concurrency, args.duration, mix, args.rate)
+        return await generator.run()
+
+    app = load_app(args.mongo_url)
+    logging.getLogger().setLevel(logging.WARNING)
+    async with app.router.lifespan_context(app):
+        generator = LoadGenerator(ClientFactory(app=app), args.concurrency, args.duration, mix, args.rate)
+        return await generator.run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the SNO Website API")
+    parser.add_argument("--url", help="Base URL of a running server (default: run the app in-process)")
+    parser.add_argument("--mongo-url", help="MongoDB for the in-process app (default: mongomock-motor)")
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent virtual users")
+    parser.add_argument("--rate", type=float,
+                        help="Open-loop arrivals per second instead of --concurrency closed-loop users")
+    parser.add_argument("--duration", type=float, default=10.0, help="Test duration in seconds")
+    parser.add_argument("--mix", default=DEFAULT_MIX,
+                        help=f"Weighted request mix, kinds: {', '.join(REQUEST_KINDS)}")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load_test(args))
+    report["config"] = {
+        "target": args.url or ("in-process, " + (args.mongo_url or "mongomock")),
+        "concurrency": None if args.rate else args.concurrency,
+        "rate": args.rate,
+        "duration": args.duration,
+        "mix": parse_mix(args.mix),
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+        overall = report["overall"]
+        print(f"📊 {overall['requests']} requests, {overall['rps']} req/s, "
+              f"p50 {overall['p50_ms']} ms, p99 {overall['p99_ms']} ms, "
+              f"error rate {overall['error_rate']:.2%}, shed {overall['shed']} -> {args.output}")
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
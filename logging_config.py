@@ -0,0 +1,175 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+# ASGI scope of the request being handled, so log records can be tagged
+# and sampled by route
+current_scope = ContextVar("current_scope", default=None)
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed through extra=
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "route"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the message, its origin and any extra= fields"""
+
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        route = getattr(record, "route", None)
+        if route is not None:
+            entry["route"] = route
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RouteSamplingFilter(logging.Filter):
+    """
+    Tags records with the current route and keeps only a fraction of the
+    INFO and DEBUG records logged while handling sampled routes.
+    Warnings and errors always pass.
+    """
+
+    def __init__(self, rates=None):
+        super().__init__()
+        self.rates = rates or {}
+
+    def filter(self, record):
+        scope = current_scope.get()
+        if scope is None:
+            return True
+        route = scope.get("route")
+        record.route = route.path if route is not None else scope.get("path")
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(record.route)
+        return rate is None or random.random() < rate
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread untouched.
+    The stock QueueHandler formats the message on the calling thread; here
+    the %-style arguments are only merged by the listener, so log calls on
+    the event loop cost a filter check and a queue put. When the queue is
+    full, records are dropped and counted rather than blocking the caller.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # Wait for room rather than failing when stopped with a full queue
+        self.queue.put(self._sentinel)
+
+
+class LogContextMiddleware:
+    """Pure ASGI middleware making the request scope visible to log filters"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = current_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_scope.reset(token)
+
+
+def parse_sampling(spec: str) -> dict:
+    """Parse "route=rate,route=rate" into a dict, e.g. "/api/contact=0.1" """
+    rates = {}
+    for item in (spec or "").split(","):
+        route, _, rate = item.strip().rpartition("=")
+        if route:
+            rates[route] = float(rate)
+    return rates
+
+
+_queue_handler = None
+_listener = None
+
+
+def configure_logging(level=None, log_format=None, sampling=None, handler=None, max_queue=10_000):
+    """
+    Route all logging through a queue drained by a background thread
+    Args:
+        level: Root log level, LOG_LEVEL or INFO by default
+        log_format: "json" or "text", LOG_FORMAT or json by default
+        sampling: Route template -> fraction of INFO records to keep,
+            LOG_SAMPLING by default
+        handler: Where the listener writes, stderr by default
+        max_queue: Records waiting for the listener before new ones are dropped
+    Returns:
+        LazyQueueHandler: The handler attached to the root logger
+    """
+    global _queue_handler, _listener
+    stop_logging()
+
+    level = level or os.environ.get('LOG_LEVEL', 'INFO').upper()
+    log_format = log_format or os.environ.get('LOG_FORMAT', 'json').lower()
+    if sampling is None:
+        sampling = parse_sampling(os.environ.get('LOG_SAMPLING', ''))
+
+    if handler is None:
+        handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT))
+
+    _queue_handler = LazyQueueHandler(queue.Queue(max_queue))
+    _queue_handler.addFilter(RouteSamplingFilter(sampling))
+    _listener = _QueueListener(_queue_handler.queue, handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+    _listener.start()
+    return _queue_handler
+
+
+def stop_logging():
+    """
+    Write out everything still queued and stop the listener thread.
+    Records logged afterwards go straight to the listener's handlers.
+    """
+    global _queue_handler, _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    root = logging.getLogger()
+    root.removeHandler(_queue_handler)
+    for handler in _listener.handlers:
+        root.addHandler(handler)
+    _queue_handler = _listener = None
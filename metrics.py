@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import time
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds, from 100µs to 10s
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """
+    Cumulative histogram in the Prometheus exposition format.
+    Observations are meant to come from the event loop thread only.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._series = {}
+
+    def observe(self, value, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def samples(self):
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = 'le="%s"' % bound
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Gauge:
+    """Gauge set directly or read from a callback when scraped"""
+    kind = "gauge"
+
+    def __init__(self, name, documentation, callback=None):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self):
+        value = self.value
+        if self.callback is not None:
+            try:
+                value = self.callback()
+            except Exception as e:
+                logger.error("Error reading gauge %s: %s", self.name, e)
+                return
+            if value is None:
+                return
+        yield f"{self.name} {value}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        # A metric registered again under the same name, e.g. a gauge from a
+        # second create_app(), replaces the earlier one
+        self.metrics = [existing for existing in self.metrics if existing.name != metric.name]
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, *args, **kwargs):
+        return self.register(Histogram(*args, **kwargs))
+
+    def counter(self, *args, **kwargs):
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs):
+        return self.register(Gauge(*args, **kwargs))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+request_latency = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route",
+    labelnames=("method", "route", "status"),
+)
+stage_latency = registry.histogram(
+    "contact_submission_stage_seconds", "Time spent in each stage of a contact submission",
+    labelnames=("stage",),
+)
+spam_verdicts = registry.counter(
+    "contact_spam_verdicts_total", "Contact submissions by spam filter verdict",
+    labelnames=("verdict",),
+)
+spam_reasons = registry.counter(
+    "contact_spam_reasons_total", "Spam filter heuristics triggered by contact submissions",
+    labelnames=("reason",),
+)
+response_cache_requests = registry.counter(
+    "response_cache_requests_total", "Cacheable GET requests by cache result",
+    labelnames=("result",),
+)
+idempotency_requests = registry.counter(
+    "contact_idempotency_requests_total", "Contact submissions carrying an Idempotency-Key, by outcome",
+    labelnames=("outcome",),
+)
+admission_requests = registry.counter(
+    "admission_requests_total", "Requests through admission control by lane and result",
+    labelnames=("lane", "result"),
+)
+retention_documents = registry.counter(
+    "contact_retention_documents_total", "Contact submissions scrubbed, archived or restored by retention",
+    labelnames=("action",),
+)
+event_loop_lag = registry.gauge(
+    "event_loop_lag_seconds", "How late the last event loop lag probe woke up",
+)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording request latency per route template.
+    Unmatched paths share one label so scanners can't blow up cardinality.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        # Lets handlers measure the time spent before they run
+        scope.setdefault("state", {})["request_started"] = started
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            if route is not None:
+                label = route.path
+            else:
+                # Cache hits are answered before routing
+                label = scope.get("cache_route", "unmatched")
+            request_latency.observe(time.perf_counter() - started, scope["method"], label, status)
+
+
+def time_since_request_start(request) -> float:
+    """Seconds since MetricsMiddleware saw the request, or 0 without it"""
+    started = request.scope.get("state", {}).get("request_started")
+    return time.perf_counter() - started if started is not None else 0.0
+
+
+async def monitor_event_loop_lag(interval: float = 0.5):
+    """Sleep for interval and record how much later than asked the loop woke us"""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        event_loop_lag.set(max(0.0, loop.time() - started - interval))
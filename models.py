@@ -1,30 +1,34 @@
-from pydantic import BaseModel, EmailStr, Field, validator
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
+from pydantic_core import PydanticCustomError
 from typing import Optional
 from datetime import datetime
 import uuid
 
+def _at_least(value: str, minimum: int, missing: str, too_short: str) -> str:
+    if not value:
+        raise PydanticCustomError("missing", missing)
+    if len(value) < minimum:
+        raise PydanticCustomError("string_too_short", too_short)
+    return value
+
 class ContactFormRequest(BaseModel):
-    name: str = Field(..., min_length=2, max_length=100)
+    # Whitespace is stripped in the compiled core schema; the minimum lengths
+    # are checked on the stripped value afterwards, with our own messages
+    model_config = ConfigDict(str_strip_whitespace=True)
+
+    name: str = Field(..., max_length=100)
     email: EmailStr
-    message: str = Field(..., min_length=10, max_length=1000)
-
-    @validator('name')
-    def validate_name(cls, v):
-        v = v.strip()
-        if not v:
-            raise ValueError('Nome é obrigatório')
-        if len(v) < 2:
-            raise ValueError('Nome deve ter pelo menos 2 caracteres')
-        return v
-
-    @validator('message')
-    def validate_message(cls, v):
-        v = v.strip()
-        if not v:
-            raise ValueError('Mensagem é obrigatória')
-        if len(v) < 10:
-            raise ValueError('Mensagem deve ter pelo menos 10 caracteres')
-        return v
+    message: str = Field(..., max_length=1000)
+
+    @field_validator('name')
+    @classmethod
+    def validate_name(cls, v: str) -> str:
+        return _at_least(v, 2, 'Nome é obrigatório', 'Nome deve ter pelo menos 2 caracteres')
+
+    @field_validator('message')
+    @classmethod
+    def validate_message(cls, v: str) -> str:
+        return _at_least(v, 10, 'Mensagem é obrigatória', 'Mensagem deve ter pelo menos 10 caracteres')
 
 class ContactFormResponse(BaseModel):
     success: bool
@@ -32,10 +36,30 @@ class ContactFormResponse(BaseModel):
     errors: Optional[list] = None
 
 class ContactSubmission(BaseModel):
+    """Shape of a stored contact_submissions document"""
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
     email: str
     message: str
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     ip_address: Optional[str] = None
-    user_agent: Optional[str] = None
\ No newline at end of file
+    user_agent: Optional[str] = None
+    # Heuristics a flagged submission triggered, see spam_filter
+    spam_reasons: Optional[list] = None
+
+    @staticmethod
+    def document_from(form_data: ContactFormRequest, ip_address: Optional[str] = None,
+                      user_agent: Optional[str] = None) -> dict:
+        """
+        Build the stored document straight from an already validated request,
+        skipping a second validation pass and the model -> dict copy
+        """
+        return {
+            "id": str(uuid.uuid4()),
+            "name": form_data.name,
+            "email": form_data.email,
+            "message": form_data.message,
+            "timestamp": datetime.utcnow(),
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+        }
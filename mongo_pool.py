@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """
+    Connection pool counters fed by pymongo's CMAP events.
+    Events arrive on pymongo's own threads, hence the lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # server address -> {"open", "in_use", "waiting"}
+        self.pools = {}
+
+    def _bump(self, event, field: str, amount: int):
+        with self._lock:
+            pool = self.pools.setdefault(event.address, {"open": 0, "in_use": 0, "waiting": 0})
+            pool[field] += amount
+
+    def connection_created(self, event):
+        self._bump(event, "open", 1)
+
+    def connection_closed(self, event):
+        self._bump(event, "open", -1)
+
+    def connection_check_out_started(self, event):
+        self._bump(event, "waiting", 1)
+
+    def connection_check_out_failed(self, event):
+        self._bump(event, "waiting", -1)
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            pool = self.pools.setdefault(event.address, {"open": 0, "in_use": 0, "waiting": 0})
+            pool["waiting"] -= 1
+            pool["in_use"] += 1
+
+    def connection_checked_in(self, event):
+        self._bump(event, "in_use", -1)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        with self._lock:
+            self.pools.pop(event.address, None)
+
+    def connection_ready(self, event):
+        pass
+
+    def totals(self) -> dict:
+        """Open, in use and waiting connections summed over every server"""
+        with self._lock:
+            return {
+                field: sum(pool[field] for pool in self.pools.values())
+                for field in ("open", "in_use", "waiting")
+            }
+
+    def saturation(self, max_pool_size: int) -> float:
+        """Share of the busiest server's pool in use, 1.0 when full"""
+        with self._lock:
+            busiest = max((pool["in_use"] for pool in self.pools.values()), default=0)
+        return busiest / max_pool_size if max_pool_size else 0.0
+
+
+def pool_options() -> dict:
+    """Motor client pool settings from MONGO_MAX_POOL_SIZE and MONGO_MIN_POOL_SIZE"""
+    return {
+        "maxPoolSize": int(os.environ.get('MONGO_MAX_POOL_SIZE', '100')),
+        "minPoolSize": int(os.environ.get('MONGO_MIN_POOL_SIZE', '10')),
+    }
+
+
+async def warm_up(db, connections: int, timeout: float = 10.0):
+    """
+    Open connections before the first request needs them.
+    Concurrent pings each check out their own connection, so the pool
+    grows to roughly that many; minPoolSize then keeps it there.
+    Returns:
+        float: Seconds the warm-up took
+    """
+    started = time.perf_counter()
+    await asyncio.wait_for(
+        asyncio.gather(*(db.command("ping") for _ in range(max(1, connections)))),
+        timeout,
+    )
+    return time.perf_counter() - started
+
+
+async def readiness(db, monitor: PoolMonitor, max_pool_size: int, timeout: float = 2.0):
+    """
+    Ping MongoDB and describe the connection pool
+    Returns:
+        tuple: (ready, report) where report holds the ping time and pool usage
+    """
+    report = {"mongo": {}, "pool": dict(monitor.totals(), max_size=max_pool_size)}
+    report["pool"]["saturation"] = round(monitor.saturation(max_pool_size), 3)
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(db.command("ping"), timeout)
+    except Exception as e:
+        logger.error("MongoDB readiness ping failed: %s", e)
+        report["mongo"] = {"status": "unreachable", "error": str(e) or type(e).__name__}
+        return False, report
+    report["mongo"] = {"status": "ok", "ping_ms": round((time.perf_counter() - started) * 1000, 2)}
+    return True, report
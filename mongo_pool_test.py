@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+MongoDB Pool Testing for SNO Website
+Checks the PoolMonitor counters fed by connection pool events, that
+warm_up opens the requested connections concurrently, and that
+/api/health/ready reports MongoDB unavailable until it answers, then
+ready with the pool the lifespan warm-up opened.
+Runs against a stand-in for the driver, so the pool events are scripted.
+"""
+
+import asyncio
+import os
+from types import SimpleNamespace
+
+from mongo_pool import PoolMonitor, readiness, warm_up
+
+SERVER = ("localhost", 27017)
+
+
+def _event(address=SERVER):
+    return SimpleNamespace(address=address)
+
+
+class FakeDatabase:
+    """
+    Answers ping like a database whose driver opens a pooled connection
+    for every concurrent command, reporting it to the monitor
+    """
+
+    def __init__(self, monitor, up=True, delay=0.01):
+        self.monitor = monitor
+        self.up = up
+        self.delay = delay
+        self.idle = 0
+        self.in_flight = 0
+        self.most_in_flight = 0
+
+    async def command(self, name):
+        if not self.up:
+            raise ConnectionError("connection refused")
+        self.monitor.connection_check_out_started(_event())
+        if self.idle:
+            self.idle -= 1
+        else:
+            self.monitor.connection_created(_event())
+        self.monitor.connection_checked_out(_event())
+        self.in_flight += 1
+        self.most_in_flight = max(self.most_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        self.monitor.connection_checked_in(_event())
+        self.idle += 1
+        return {"ok": 1.0}
+
+
+class MongoPoolTester:
+    def __init__(self):
+        self.passed = 0
+        self.failed = 0
+
+    def record(self, ok, description):
+        if ok:
+            self.passed += 1
+            print(f"✅ {description}")
+        else:
+            self.failed += 1
+            print(f"❌ {description}")
+
+    def test_monitor(self):
+        print("\n🔍 Pool counters...")
+        monitor = PoolMonitor()
+        other = ("replica", 27017)
+        for address in (SERVER, SERVER, SERVER, other):
+            monitor.connection_created(_event(address))
+        for address in (SERVER, SERVER, other):
+            monitor.connection_check_out_started(_event(address))
+            monitor.connection_checked_out(_event(address))
+        monitor.connection_check_out_started(_event())
+        self.record(monitor.totals() == {"open": 4, "in_use": 3, "waiting": 1}, f"Totals: {monitor.totals()}")
+        self.record(monitor.saturation(4) == 0.5, f"Saturation of the busiest pool: {monitor.saturation(4)}")
+        monitor.connection_check_out_failed(_event())
+        monitor.connection_checked_in(_event())
+        monitor.connection_closed(_event())
+        self.record(monitor.totals() == {"open": 3, "in_use": 2, "waiting": 0}, f"After check-in and close: {monitor.totals()}")
+        monitor.pool_closed(_event(other))
+        self.record(monitor.totals() == {"open": 2, "in_use": 1, "waiting": 0}, "Closed pool forgotten")
+        self.record(monitor.saturation(0) == 0.0, "No division by a zero pool size")
+
+    async def test_warm_up(self):
+        print("\n🔍 Warm-up...")
+        monitor = PoolMonitor()
+        db = FakeDatabase(monitor)
+        await warm_up(db, 10)
+        self.record(db.most_in_flight == 10 and monitor.totals()["open"] == 10,
+                    f"10 concurrent pings open 10 connections: {monitor.totals()}")
+        await warm_up(db, 0)
+        self.record(monitor.totals()["open"] == 10, "At least one ping, reusing the open connections")
+
+        slow = FakeDatabase(PoolMonitor(), delay=1)
+        try:
+            await warm_up(slow, 2, timeout=0.05)
+            self.record(False, "Slow warm-up not timed out")
+        except asyncio.TimeoutError:
+            self.record(True, "Warm-up gives up after its timeout")
+
+        down = FakeDatabase(PoolMonitor(), up=False)
+        ready, report = await readiness(down, down.monitor, 10)
+        self.record(not ready and report["mongo"]["status"] == "unreachable"
+                    and report["mongo"]["error"] == "connection refused",
+                    f"Unreachable MongoDB reported: {report['mongo']}")
+
+    async def test_ready_route(self):
+        print("\n🔍 /api/health/ready...")
+        import httpx
+        import server
+
+        os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+        os.environ.setdefault('DB_NAME', 'mongo_pool_test')
+        os.environ['MONGO_MIN_POOL_SIZE'] = '5'
+        os.environ['MONGO_MAX_POOL_SIZE'] = '20'
+        os.environ['MONGO_WARMUP'] = 'true'
+        os.environ['DB_INDEX_BUILD'] = 'off'
+        app = server.create_app()
+        state = app.state
+        self.record(state.mongo_pool == {"maxPoolSize": 20, "minPoolSize": 5}, f"Pool options: {state.mongo_pool}")
+        db = state.db = FakeDatabase(state.pool_monitor, up=False)
+
+        async def email_queue_noop():
+            return None
+
+        # Only the pool is under test; keep the other services idle
+        state.email_queue.start = state.email_queue.stop = email_queue_noop
+        state.contact_stats.start = lambda: None
+        state.retention = state.contact_search = None
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            async with app.router.lifespan_context(app):
+                response = await client.get("/api/health/ready")
+                body = response.json()
+                self.record(response.status_code == 503 and body["status"] == "unavailable"
+                            and body["mongo"]["status"] == "unreachable",
+                            f"Unavailable while MongoDB is down: {response.status_code} {body['mongo']}")
+            db.up = True
+            async with app.router.lifespan_context(app):
+                response = await client.get("/api/health/ready")
+                body = response.json()
+                self.record(response.status_code == 200 and body["status"] == "ready" and body["mongo"]["status"] == "ok",
+                            f"Ready once MongoDB answers: {response.status_code} {body['mongo']}")
+                self.record(body["pool"]["open"] == 5 and body["pool"]["max_size"] == 20
+                            and body["pool"]["saturation"] == 0.0,
+                            f"Pool warmed up to minPoolSize: {body['pool']}")
+
+    async def run_all_tests(self):
+        self.test_monitor()
+        await self.test_warm_up()
+        await self.test_ready_route()
+        print(f"\n📊 {self.passed} passed, {self.failed} failed")
+        return self.failed == 0
+
+
+def main():
+    tester = MongoPoolTester()
+    return 0 if asyncio.run(tester.run_all_tests()) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
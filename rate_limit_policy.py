@@ -0,0 +1,151 @@
+import json
+import logging
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+from client_identity import NetworkMap, parse_address, parse_network
+
+logger = logging.getLogger(__name__)
+
+# Used when RATE_LIMIT_POLICY is empty: the original 5 submissions per 15 minutes
+DEFAULT_POLICY = {
+    "routes": {
+        "contact": {"tiers": ["5/15min"]},
+    },
+}
+
+UNITS = {
+    "s": 1, "sec": 1, "second": 1,
+    "m": 60, "min": 60, "minute": 60,
+    "h": 3600, "hour": 3600,
+    "d": 86400, "day": 86400,
+}
+TIER_PATTERN = re.compile(r"^\s*(\d+)\s*/\s*(\d*)\s*([a-z]+?)s?\s*$")
+
+
+class Tier(NamedTuple):
+    max_requests: int
+    window: float
+
+
+class Rule(NamedTuple):
+    """
+    The limit a request is held to. name namespaces the counters, so
+    clients under an override never share windows with the route's
+    default rule.
+    """
+    name: str
+    tiers: tuple
+
+    def key(self, identifier: str) -> str:
+        return f"{self.name}:{identifier}"
+
+
+def parse_tier(spec: str) -> Tier:
+    """
+    Parse a tier like "5/15min", "2/minute" or "20/day"
+    Raises:
+        ValueError: On an unknown format or unit
+    """
+    match = TIER_PATTERN.match(spec.lower())
+    if match is None or match.group(3) not in UNITS:
+        raise ValueError(f"Invalid rate limit tier: {spec!r}")
+    max_requests, count, unit = match.groups()
+    window = int(count or 1) * UNITS[unit]
+    if int(max_requests) <= 0 or window <= 0:
+        raise ValueError(f"Invalid rate limit tier: {spec!r}")
+    return Tier(int(max_requests), float(window))
+
+
+def _tiers(specs, where: str) -> tuple:
+    if not specs:
+        raise ValueError(f"Rate limit rule {where} has no tiers")
+    # Shortest window first, the usual order for reading them back
+    return tuple(sorted((parse_tier(spec) for spec in specs), key=lambda tier: tier.window))
+
+
+class RateLimitPolicy:
+    """
+    Limits compiled from a declarative policy, for example:
+
+        {
+            "routes": {
+                "contact": {
+                    "tiers": ["2/min", "5/15min", "20/day"],
+                    "overrides": [{"networks": ["203.0.113.0/24"], "tiers": ["20/hour"]}],
+                    "allowlist": ["198.51.100.7"]
+                }
+            },
+            "allowlist": ["127.0.0.1"]
+        }
+
+    Every tier of a rule is checked and counted together, see
+    RateLimiter.check. Overrides and allowlists (global ones apply to every
+    route) are compiled into one NetworkMap per route, so finding the rule
+    for a client is a single longest-prefix lookup whoever matches: the
+    most specific network wins, and an allowlisted network maps to None.
+    Routes missing from the policy aren't limited.
+    """
+
+    def __init__(self, spec: dict, max_tiers: int = None, cache_size: int = 10_000):
+        self.routes = {}
+        global_allowlist = [parse_network(network) for network in spec.get("allowlist", ())]
+        for route, route_spec in spec.get("routes", {}).items():
+            default = Rule(route, _tiers(route_spec.get("tiers"), route))
+            entries = [(network, None) for network in global_allowlist]
+            for number, override in enumerate(route_spec.get("overrides", ()), start=1):
+                name = override.get("name", f"{route}-override-{number}")
+                rule = Rule(name, _tiers(override.get("tiers"), name))
+                entries += [(parse_network(network), rule) for network in override.get("networks", ())]
+            entries += [(parse_network(network), None) for network in route_spec.get("allowlist", ())]
+            self.routes[route] = (default, NetworkMap(entries))
+
+        longest = max((len(rule.tiers) for rule in self.rules()), default=0)
+        if max_tiers is not None and longest > max_tiers:
+            raise ValueError(f"Rate limit rules have up to {longest} tiers, the backend holds {max_tiers}")
+        self.rule_for = lru_cache(maxsize=cache_size)(self._rule_for)
+
+    def rules(self):
+        """Every compiled Rule"""
+        for default, networks in self.routes.values():
+            yield default
+            yield from (rule for rule in networks.networks.values() if rule is not None)
+
+    def _rule_for(self, route: str, client_ip: str):
+        """
+        Returns:
+            Rule | None: The rule the client is held to on the route, or None
+                when it isn't limited (allowlisted or an unlisted route)
+        """
+        compiled = self.routes.get(route)
+        if compiled is None:
+            return None
+        default, networks = compiled
+        address = parse_address(client_ip)
+        if address is None:
+            return default
+        return networks.get(address, default)
+
+
+def load_rate_limit_policy(source: str = "", max_tiers: int = None) -> RateLimitPolicy:
+    """
+    Compile the policy from RATE_LIMIT_POLICY: a path to a JSON file,
+    inline JSON, or empty for DEFAULT_POLICY
+    Raises:
+        ValueError: On an invalid policy, so a bad deploy fails at startup
+    """
+    source = source.strip()
+    if not source:
+        spec = DEFAULT_POLICY
+    elif source.startswith("{"):
+        spec = json.loads(source)
+    else:
+        with open(source) as policy_file:
+            spec = json.load(policy_file)
+    policy = RateLimitPolicy(spec, max_tiers=max_tiers)
+    logger.info("Rate limit policy: %s", ", ".join(
+        f"{rule.name} {'+'.join(f'{tier.max_requests}/{tier.window:g}s' for tier in rule.tiers)}"
+        for rule in policy.rules()
+    ))
+    return policy
@@ -1,15 +1,455 @@
 from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import OrderedDict
+import hashlib
 import logging
+import math
+import mmap
+import os
+import struct
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on tracked identifiers; least recently seen ones are evicted first
+DEFAULT_MAX_KEYS = 100_000
+
+
+class _WindowState:
+    """Fixed-size sliding-window counter state for one tier of an identifier"""
+    __slots__ = ("window", "start", "previous", "current")
+
+    def __init__(self, window: float, start: float, previous: int = 0, current: int = 0):
+        self.window = window
+        self.start = start
+        self.previous = previous
+        self.current = current
+
+    def roll(self, now: float):
+        """Advance the fixed windows so that `now` falls in the current one"""
+        elapsed_windows = int((now - self.start) // self.window)
+        if elapsed_windows <= 0:
+            return
+        self.previous = self.current if elapsed_windows == 1 else 0
+        self.current = 0
+        self.start += elapsed_windows * self.window
+
+    def estimate(self, now: float) -> float:
+        """Weighted request count over the sliding window ending at `now`"""
+        weight = 1.0 - (now - self.start) / self.window
+        return self.previous * weight + self.current
+
+    def seconds_until_allowed(self, now: float, max_requests: int) -> float:
+        """
+        Seconds until the weighted estimate drops below max_requests, so the
+        next request is counted again; 0 if it already is
+        """
+        if self.current < max_requests:
+            if self.estimate(now) < max_requests:
+                return 0.0
+            # Only the previous window's fading weight is in the way
+            allowed_at = self.start + self.window * (1 - (max_requests - self.current) / self.previous)
+        else:
+            # Blocked for the rest of this window; in the next one these
+            # requests fade out as the previous window's
+            allowed_at = self.start + self.window * (2 - max_requests / self.current)
+        return max(0.0, allowed_at - now)
+
+    def requests_left(self, now: float, max_requests: int) -> int:
+        """
+        Requests _count_hit would still let through at `now`: each one adds
+        a whole request to a fractional estimate that must stay below
+        max_requests
+        """
+        return max(0, min(max_requests - self.current, math.ceil(max_requests - self.estimate(now))))
+
+
+def _count_hit(states: list, tiers, now: float) -> bool:
+    """
+    Roll every tier's window and count the request in all of them if none
+    is at its limit. A tier whose window changed starts afresh.
+    This runs for every tier of every check, so it skips the roll and the
+    weighted estimate when they can't change anything.
+    """
+    allowed = True
+    for state, (max_requests, window) in zip(states, tiers):
+        if state.window != window:
+            state.__init__(window, now)
+        elif now - state.start >= window:
+            state.roll(now)
+        if state.current >= max_requests or (state.previous and state.estimate(now) >= max_requests):
+            allowed = False
+    if allowed:
+        for state in states:
+            state.current += 1
+    return allowed
+
+
+class RateLimitBackend:
+    """
+    Storage for sliding-window counters.
+    Each identifier holds one window per tier of its limit, e.g. 2 per
+    minute and 5 per 15 minutes, checked and counted together in one
+    atomic hit. Backends only need to apply that check atomically and
+    return snapshots; the counting rules live in _WindowState and
+    _count_hit so every backend agrees.
+    """
+    # Whether calls block on I/O and should be kept off the event loop
+    blocking = False
+    # Most tiers a limit may have, None for no limit
+    max_tiers = None
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+
+    def hit(self, identifier: str, tiers) -> bool:
+        """
+        Count a request if the identifier is under every tier's limit
+        Args:
+            identifier: Rate limit key
+            tiers: Sequence of (max_requests, window seconds)
+        """
+        raise NotImplementedError
+
+    def snapshot(self, identifier: str):
+        """Return rolled _WindowState copies, one per tier, or None"""
+        raise NotImplementedError
+
+    def purge_idle(self) -> int:
+        """Drop identifiers with nothing left in their window"""
+        return 0
+
+    def tracked_keys(self):
+        """Number of identifiers currently stored, or None if it is expensive to know"""
+        return None
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Per-process storage, bounded by an LRU cap"""
+
+    def __init__(self, max_keys: int = DEFAULT_MAX_KEYS, clock=time.monotonic):
+        super().__init__(clock)
+        # Kept in LRU order so memory stays bounded no matter how many
+        # distinct clients show up
+        self.requests = OrderedDict()
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+
+    def hit(self, identifier, tiers):
+        now = self.clock()
+        with self._lock:
+            states = self.requests.get(identifier)
+            if states is None or len(states) != len(tiers):
+                states = [_WindowState(window, now) for _, window in tiers]
+                self.requests[identifier] = states
+                if len(self.requests) > self.max_keys:
+                    self.requests.popitem(last=False)
+            else:
+                self.requests.move_to_end(identifier)
+            return _count_hit(states, tiers, now)
+
+    def snapshot(self, identifier):
+        with self._lock:
+            states = self.requests.get(identifier)
+            if states is None:
+                return None
+            now = self.clock()
+            for state in states:
+                state.roll(now)
+            return [_WindowState(state.window, state.start, state.previous, state.current)
+                    for state in states]
+
+    def tracked_keys(self):
+        return len(self.requests)
+
+    def purge_idle(self):
+        now = self.clock()
+        with self._lock:
+            idle = [
+                identifier for identifier, states in self.requests.items()
+                if all(now - state.start >= 2 * state.window for state in states)
+            ]
+            for identifier in idle:
+                del self.requests[identifier]
+        return len(idle)
+
+
+class SharedMemoryRateLimitBackend(RateLimitBackend):
+    """
+    Fixed-size hash table in a memory-mapped file shared by every worker on the host.
+    CLOCK_MONOTONIC is system-wide on Linux, so all processes agree on time.
+    Each slot is the key hash followed by (window, start, previous, current)
+    for up to MAX_TIERS tiers, unused ones zeroed; a full probe sequence
+    evicts the slot whose windows expire first.
+    """
+    MAX_TIERS = 4
+    TIER_FIELDS = 4
+    SLOT = struct.Struct("<Q" + "ddii" * MAX_TIERS)
+    PROBES = 8
+    max_tiers = MAX_TIERS
+    EMPTY = (0,) + (0.0, 0.0, 0, 0) * MAX_TIERS
+
+    def __init__(self, path: str = "/dev/shm/sno_rate_limiter", slots: int = 65536,
+                 clock=time.monotonic):
+        super().__init__(clock)
+        import fcntl
+        self._fcntl = fcntl
+        self.slots = slots
+        self._thread_lock = threading.Lock()
+        size = slots * self.SLOT.size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size != size:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(self._fd).st_size != size:
+                    # A table with another size or slot layout can't be
+                    # read, so start from an empty one
+                    os.ftruncate(self._fd, 0)
+                    os.ftruncate(self._fd, size)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._map = mmap.mmap(self._fd, size)
+
+    @staticmethod
+    def _key(identifier: str) -> int:
+        # Python's hash() is salted per process, so use a stable digest;
+        # 0 marks an empty slot
+        digest = hashlib.blake2b(identifier.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "little") or 1
+
+    def _locked(self):
+        return _FileLock(self._fd, self._fcntl, self._thread_lock)
+
+    @classmethod
+    def _states(cls, record) -> list:
+        """_WindowState for each used tier of a slot record"""
+        return [_WindowState(*record[field:field + cls.TIER_FIELDS])
+                for field in range(1, len(record), cls.TIER_FIELDS) if record[field]]
+
+    @classmethod
+    def _expires(cls, record) -> float:
+        """When the last of the slot's windows runs out"""
+        return max((record[field + 1] + 2 * record[field]
+                    for field in range(1, len(record), cls.TIER_FIELDS) if record[field]), default=0.0)
+
+    def _find(self, key: int):
+        """Return (offset, record or None) for the key's slot or the slot to reuse"""
+        base = key % self.slots
+        victim, victim_expires = None, math.inf
+        for probe in range(self.PROBES):
+            offset = ((base + probe) % self.slots) * self.SLOT.size
+            record = self.SLOT.unpack_from(self._map, offset)
+            if record[0] == key:
+                return offset, record
+            if record[0] == 0:
+                return offset, None
+            expires = self._expires(record)
+            if expires < victim_expires:
+                victim, victim_expires = offset, expires
+        return victim, None
+
+    def hit(self, identifier, tiers):
+        if len(tiers) > self.MAX_TIERS:
+            raise ValueError(f"The shm rate limit backend holds at most {self.MAX_TIERS} tiers")
+        key = self._key(identifier)
+        with self._locked():
+            now = self.clock()
+            offset, record = self._find(key)
+            states = self._states(record) if record is not None else []
+            if len(states) != len(tiers):
+                states = [_WindowState(window, now) for _, window in tiers]
+            allowed = _count_hit(states, tiers, now)
+            fields = [key]
+            for state in states:
+                fields += (state.window, state.start, state.previous, state.current)
+            fields += (0.0, 0.0, 0, 0) * (self.MAX_TIERS - len(states))
+            self.SLOT.pack_into(self._map, offset, *fields)
+        return allowed
+
+    def snapshot(self, identifier):
+        key = self._key(identifier)
+        with self._locked():
+            _, record = self._find(key)
+        if record is None:
+            return None
+        states = self._states(record)
+        now = self.clock()
+        for state in states:
+            state.roll(now)
+        return states
+
+    def tracked_keys(self):
+        with self._locked():
+            return sum(
+                1 for slot in range(self.slots)
+                if self.SLOT.unpack_from(self._map, slot * self.SLOT.size)[0]
+            )
+
+    def purge_idle(self):
+        purged = 0
+        with self._locked():
+            now = self.clock()
+            for slot in range(self.slots):
+                offset = slot * self.SLOT.size
+                record = self.SLOT.unpack_from(self._map, offset)
+                if record[0] and self._expires(record) <= now:
+                    self.SLOT.pack_into(self._map, offset, *self.EMPTY)
+                    purged += 1
+        # Clearing slots can break probe chains for colliding keys; those
+        # simply start a fresh window, which errs on the side of allowing
+        return purged
+
+
+class _FileLock:
+    """Exclusive lock across threads (threading.Lock) and processes (flock)"""
+
+    def __init__(self, fd, fcntl, thread_lock):
+        self._fd = fd
+        self._fcntl = fcntl
+        self._thread_lock = thread_lock
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        self._fcntl.flock(self._fd, self._fcntl.LOCK_EX)
+
+    def __exit__(self, *exc):
+        self._fcntl.flock(self._fd, self._fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+
+class MongoRateLimitBackend(RateLimitBackend):
+    """
+    Counters stored in MongoDB, shared by every worker and host.
+    Each check is one atomic findOneAndUpdate with an aggregation pipeline;
+    a TTL index (rate_limits.expires_at_ttl, built with the others by
+    db_indexes) removes counters once their longest window has expired.
+    A document holds the tier count in "tiers" and each tier's window
+    in t0, t1, ...
+    """
+    blocking = True
+
+    def __init__(self, database, collection: str = "rate_limits", clock=time.time):
+        super().__init__(clock)
+        # Motor databases wrap a synchronous pymongo database
+        database = getattr(database, "delegate", database)
+        self.collection = database[collection]
+
+    def _pipeline(self, now: float, tiers):
+        # A missing tier has no window either, so it starts fresh too;
+        # -1 marks a fresh counter in its _elapsed field
+        elapsed, rolled, under_limit, counted = {}, {}, [], {}
+        for i, (max_requests, window) in enumerate(tiers):
+            tier, mark = f"$t{i}", f"$_elapsed{i}"
+            fresh = {"$ne": [{"$ifNull": [f"{tier}.window", 0]}, window]}
+            elapsed[f"_elapsed{i}"] = {"$cond": [fresh, -1, {"$max": [0, {"$floor": {
+                "$divide": [{"$subtract": [now, f"{tier}.start"]}, window]}}]}]}
+            rolled[f"t{i}"] = {
+                "window": window,
+                "start": {"$cond": [
+                    {"$eq": [mark, -1]}, now,
+                    {"$add": [f"{tier}.start", {"$multiply": [mark, window]}]},
+                ]},
+                "previous": {"$switch": {
+                    "branches": [
+                        {"case": {"$eq": [mark, 0]}, "then": f"{tier}.previous"},
+                        {"case": {"$eq": [mark, 1]}, "then": f"{tier}.current"},
+                    ],
+                    "default": 0,
+                }},
+                "current": {"$cond": [{"$eq": [mark, 0]}, f"{tier}.current", 0]},
+            }
+            under_limit.append({"$lt": [
+                {"$add": [
+                    {"$multiply": [f"{tier}.previous", {"$subtract": [
+                        1, {"$divide": [{"$subtract": [now, f"{tier}.start"]}, window]},
+                    ]}]},
+                    f"{tier}.current",
+                ]},
+                max_requests,
+            ]})
+            counted[f"t{i}.current"] = {"$cond": ["$allowed", {"$add": [f"{tier}.current", 1]}, f"{tier}.current"]}
+        longest = max(window for _, window in tiers)
+        return [
+            {"$set": elapsed},
+            {"$set": {"tiers": len(tiers), **rolled}},
+            {"$set": {"allowed": {"$and": under_limit}}},
+            {"$set": {**counted, "expires_at": datetime.utcfromtimestamp(now + 2 * longest)}},
+            # Also drops the single-window fields of counters written before tiers
+            {"$project": {**{field: 0 for field in elapsed},
+                          "window": 0, "start": 0, "previous": 0, "current": 0}},
+        ]
+
+    def hit(self, identifier, tiers):
+        from pymongo import ReturnDocument
+        from pymongo.errors import DuplicateKeyError
+
+        pipeline = self._pipeline(self.clock(), tiers)
+        try:
+            document = self.collection.find_one_and_update(
+                {"_id": identifier}, pipeline, upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # Another worker created the counter first; the retry updates it
+            document = self.collection.find_one_and_update(
+                {"_id": identifier}, pipeline, return_document=ReturnDocument.AFTER,
+            )
+        return bool(document and document["allowed"])
+
+    def snapshot(self, identifier):
+        document = self.collection.find_one({"_id": identifier})
+        if document is None or "tiers" not in document:
+            return None
+        now = self.clock()
+        states = []
+        for i in range(document["tiers"]):
+            tier = document[f"t{i}"]
+            state = _WindowState(tier["window"], tier["start"], tier["previous"], tier["current"])
+            state.roll(now)
+            states.append(state)
+        return states
+
+
+def create_rate_limit_backend(name: str = "memory", db=None):
+    """
+    Build the backend selected by name (memory, shm or mongo)
+    Args:
+        name: Backend name, usually from the RATE_LIMIT_BACKEND env var
+        db: Database handle, required by the mongo backend
+    """
+    if name == "memory":
+        return MemoryRateLimitBackend()
+    if name == "shm":
+        return SharedMemoryRateLimitBackend(
+            path=os.environ.get("RATE_LIMIT_SHM_PATH", "/dev/shm/sno_rate_limiter"),
+            slots=int(os.environ.get("RATE_LIMIT_SHM_SLOTS", "65536")),
+        )
+    if name == "mongo":
+        if db is None:
+            raise ValueError("The mongo rate limit backend needs a database")
+        return MongoRateLimitBackend(db)
+    raise ValueError(f"Unknown rate limit backend: {name}")
+
+
 class RateLimiter:
-    def __init__(self):
-        # In production, use Redis or a proper cache
-        # For now, using in-memory storage
-        self.requests = defaultdict(list)
-        
+    def __init__(self, backend: RateLimitBackend = None):
+        self.backend = backend or MemoryRateLimitBackend()
+
+    def check(self, identifier: str, tiers):
+        """
+        Count a request against every tier of a limit in one backend call
+        Args:
+            identifier: Rate limit key
+            tiers: Sequence of (max_requests, window seconds), see rate_limit_policy
+        Returns:
+            bool: True if allowed, False if any tier is at its limit
+        """
+        if self.backend.hit(identifier, tiers):
+            return True
+
+        logger.warning("Rate limit exceeded for %s", identifier)
+        return False
+
     def is_allowed(self, identifier: str, max_requests: int = 5, window_minutes: int = 15):
         """
         Check if request is allowed based on rate limiting
@@ -20,33 +460,33 @@ class RateLimiter:
         Returns:
             bool: True if allowed, False if rate limited
         """
-        now = datetime.utcnow()
-        window_start = now - timedelta(minutes=window_minutes)
-        
-        # Clean old requests outside the window
-        self.requests[identifier] = [
-            req_time for req_time in self.requests[identifier] 
-            if req_time > window_start
-        ]
-        
-        # Check if under limit
-        if len(self.requests[identifier]) < max_requests:
-            self.requests[identifier].append(now)
-            return True
-        
-        logger.warning(f"Rate limit exceeded for {identifier}")
-        return False
-    
-    def get_remaining_requests(self, identifier: str, max_requests: int = 5):
-        """Get remaining requests for identifier"""
-        current_requests = len(self.requests.get(identifier, []))
-        return max(0, max_requests - current_requests)
-    
-    def get_reset_time(self, identifier: str, window_minutes: int = 15):
-        """Get time when rate limit resets"""
-        if identifier not in self.requests or not self.requests[identifier]:
+        return self.check(identifier, ((max_requests, window_minutes * 60.0),))
+
+    def get_remaining_requests(self, identifier: str, max_requests: int = 5, tiers=None):
+        """Get remaining requests for identifier, the fewest left in any tier"""
+        limits = [limit for limit, _ in tiers] if tiers is not None else [max_requests]
+        states = self.backend.snapshot(identifier)
+        if states is None:
+            return min(limits)
+        now = self.backend.clock()
+        return min(state.requests_left(now, limit) for limit, state in zip(limits, states))
+
+    def get_reset_time(self, identifier: str, window_minutes: int = 15, max_requests: int = 5, tiers=None):
+        """
+        Get the time from which the identifier's next request is allowed again.
+        With tiers that is when the last tier blocking it lets it through;
+        tiers under their limit don't hold it back.
+        Returns:
+            datetime | None: Naive UTC time, None if nothing was counted yet
+        """
+        limits = [limit for limit, _ in tiers] if tiers is not None else [max_requests]
+        states = self.backend.snapshot(identifier)
+        if states is None:
             return None
-        
-        oldest_request = min(self.requests[identifier])
-        reset_time = oldest_request + timedelta(minutes=window_minutes)
-        return reset_time
\ No newline at end of file
+        now = self.backend.clock()
+        seconds_left = max(state.seconds_until_allowed(now, limit) for limit, state in zip(limits, states))
+        return datetime.utcnow() + timedelta(seconds=seconds_left)
+
+    def purge_idle(self):
+        """Drop identifiers with no requests left in their sliding window"""
+        return self.backend.purge_idle()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Rate Limiter Backend Testing for SNO Website
+Checks that the memory, shared-memory and MongoDB backends make the same
+decisions, and that shared backends hold the limit across many processes.
+"""
+
+import multiprocessing
+import os
+import tempfile
+import time
+from datetime import datetime
+from dotenv import load_dotenv
+
+from rate_limiter import (
+    RateLimiter,
+    MemoryRateLimitBackend,
+    SharedMemoryRateLimitBackend,
+    MongoRateLimitBackend,
+)
+
+load_dotenv('/app/backend/.env')
+
+MONGO_URL = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+DB_NAME = os.getenv('DB_NAME', 'test_database')
+
+# (seconds since start, identifier) for a scripted sequence of requests
+TIMELINE = (
+    [(t, "10.0.0.1") for t in (0, 1, 2, 3, 4, 5, 6)]
+    + [(t, "10.0.0.2") for t in (30, 60, 90)]
+    + [(t, "10.0.0.1") for t in (600, 899, 900, 1200, 1500, 1799, 1800, 2700, 4000)]
+)
+
+# 2 per minute, 5 per 15 minutes and 8 per day, checked together
+TIERS = ((2, 60.0), (5, 900.0), (8, 86400.0))
+TIERED_TIMELINE = [(t, "10.0.0.3") for t in (0, 1, 2, 59, 60, 61, 120, 121, 180, 900, 901, 1800, 1801, 1860, 2700)]
+
+
+class FakeClock:
+    def __init__(self, start=None):
+        # Start at the real time so MongoDB's TTL monitor leaves counters alone
+        self.start = time.time() if start is None else start
+        self.offset = 0.0
+
+    def __call__(self):
+        return self.start + self.offset
+
+
+def _mongo_database():
+    try:
+        from pymongo import MongoClient
+        client = MongoClient(MONGO_URL, serverSelectionTimeoutMS=1000)
+        client.admin.command('ping')
+        return client[DB_NAME]
+    except Exception as e:
+        print(f"⚠️ MongoDB not available, skipping mongo backend: {e}")
+        return None
+
+
+def _hammer(backend_name, path, identifier, attempts, results):
+    """Worker process: hit the shared backend and report how many were allowed"""
+    if backend_name == "shm":
+        backend = SharedMemoryRateLimitBackend(path=path, slots=1024)
+    else:
+        backend = MongoRateLimitBackend(_mongo_database(), collection=path)
+    limiter = RateLimiter(backend)
+    allowed = sum(limiter.is_allowed(identifier, max_requests=5, window_minutes=15)
+                  for _ in range(attempts))
+    results.put(allowed)
+
+
+def _reset_times(limiter, clock, identifier, starts, tiers):
+    """
+    From each start, hit until refused, then try again a second before and
+    a second after the reported reset time
+    Returns:
+        list: (seconds until reset, allowed before, allowed after) per start
+    """
+    results = []
+    for start in starts:
+        clock.offset = start
+        while limiter.check(identifier, tiers):
+            clock.offset += 1
+        blocked_at = clock.offset
+        reset_in = (limiter.get_reset_time(identifier, tiers=tiers) - datetime.utcnow()).total_seconds()
+        clock.offset = blocked_at + reset_in - 1
+        before = limiter.check(identifier, tiers)
+        clock.offset = blocked_at + reset_in + 1
+        after = limiter.check(identifier, tiers)
+        results.append((round(reset_in), before, after))
+    return results
+
+
+class RateLimiterBackendTester:
+    def __init__(self):
+        self.tmpdir = tempfile.mkdtemp(prefix="sno_rate_limiter_")
+        self.mongo_db = _mongo_database()
+        self.passed = 0
+        self.failed = 0
+
+    def record(self, ok, description):
+        if ok:
+            self.passed += 1
+            print(f"✅ {description}")
+        else:
+            self.failed += 1
+            print(f"❌ {description}")
+
+    def build_backends(self, clock):
+        backends = {
+            "memory": MemoryRateLimitBackend(clock=clock),
+            "shm": SharedMemoryRateLimitBackend(
+                path=os.path.join(self.tmpdir, f"seq_{time.time_ns()}"), slots=1024, clock=clock),
+        }
+        if self.mongo_db is not None:
+            collection = f"rate_limits_test_{time.time_ns()}"
+            backends["mongo"] = MongoRateLimitBackend(self.mongo_db, collection=collection, clock=clock)
+        return backends
+
+    def test_backends_agree(self):
+        """Replay the same timeline on every backend and compare decisions"""
+        print("\n🔍 Comparing backend decisions...")
+        clock = FakeClock()
+        limiters = {name: RateLimiter(backend) for name, backend in self.build_backends(clock).items()}
+        decisions = {name: [] for name in limiters}
+        remaining = {name: [] for name in limiters}
+
+        for offset, identifier in TIMELINE:
+            clock.offset = offset
+            for name, limiter in limiters.items():
+                decisions[name].append(limiter.is_allowed(identifier, max_requests=5, window_minutes=15))
+                remaining[name].append(limiter.get_remaining_requests(identifier, max_requests=5))
+
+        reference = decisions["memory"]
+        for name in limiters:
+            self.record(decisions[name] == reference,
+                        f"{name} decisions match memory backend: {decisions[name]}")
+            self.record(remaining[name] == remaining["memory"],
+                        f"{name} remaining counts match memory backend")
+
+        if self.mongo_db is not None:
+            for name, limiter in limiters.items():
+                if name == "mongo":
+                    self.mongo_db.drop_collection(limiter.backend.collection.name)
+
+    def test_reset_time(self):
+        """The reset time is when a blocked client gets through again"""
+        print("\n🔍 Checking reset times...")
+        clock = FakeClock()
+        for name, backend in self.build_backends(clock).items():
+            # A fresh window, then one still weighed down by the previous window
+            results = _reset_times(RateLimiter(backend), clock, "10.0.0.4", (0, 1350), ((5, 900.0),))
+            # Blocked at t=5 until the 5 hits stop counting fully at t=900;
+            # blocked at t=1352 until the previous window's weight of 5
+            # hits falls below 2 at t=1440
+            self.record(results == [(895, False, True), (88, False, True)],
+                        f"{name} reset times match when requests are allowed again: {results}")
+            if name == "mongo":
+                self.mongo_db.drop_collection(backend.collection.name)
+
+    def test_remaining_mid_window(self):
+        """Remaining requests are the ones actually let through, with a fractional estimate"""
+        print("\n🔍 Checking remaining requests mid-window...")
+        clock = FakeClock()
+        for name, backend in self.build_backends(clock).items():
+            limiter = RateLimiter(backend)
+            for offset in range(4):
+                clock.offset = offset
+                limiter.is_allowed("10.0.0.6", max_requests=5, window_minutes=15)
+            # A fifth into the next window the 4 hits weigh 3.2, so two more fit
+            clock.offset = 900 + 180
+            remaining = limiter.get_remaining_requests("10.0.0.6", max_requests=5)
+            allowed = 0
+            while limiter.is_allowed("10.0.0.6", max_requests=5, window_minutes=15):
+                allowed += 1
+            self.record(remaining == allowed == 2,
+                        f"{name} reports {remaining} remaining at an estimate of 3.2, {allowed} allowed")
+            if name == "mongo":
+                self.mongo_db.drop_collection(backend.collection.name)
+
+    def test_tiers_agree(self):
+        """Replay a timeline against a three-tier limit on every backend"""
+        print("\n🔍 Comparing multi-tier decisions...")
+        clock = FakeClock()
+        limiters = {name: RateLimiter(backend) for name, backend in self.build_backends(clock).items()}
+        decisions = {name: [] for name in limiters}
+        remaining = {name: [] for name in limiters}
+
+        for offset, identifier in TIERED_TIMELINE:
+            clock.offset = offset
+            for name, limiter in limiters.items():
+                decisions[name].append(limiter.check(identifier, TIERS))
+                remaining[name].append(limiter.get_remaining_requests(identifier, tiers=TIERS))
+
+        # The minute tier lets 2 through, then one more each time the
+        # previous minute's weight slips below the limit; the 15 minute tier
+        # refuses t=900 and the daily tier everything after the 8th
+        expected = [True, True, False, False, False, True, True, True, False,
+                    False, True, True, True, False, False]
+        self.record(decisions["memory"] == expected, f"memory tiered decisions: {decisions['memory']}")
+        for name in limiters:
+            self.record(decisions[name] == decisions["memory"] and remaining[name] == remaining["memory"],
+                        f"{name} tiered decisions and remaining counts match memory backend")
+
+        if self.mongo_db is not None:
+            for name, limiter in limiters.items():
+                if name == "mongo":
+                    self.mongo_db.drop_collection(limiter.backend.collection.name)
+
+        for name, backend in self.build_backends(clock).items():
+            # Refused at t=2 by the minute tier alone, which lets it through
+            # at t=60; refused at t=302 by the minute and the 15 minute tiers,
+            # the latter until its 5 hits start fading at t=900
+            results = _reset_times(RateLimiter(backend), clock, "10.0.0.5", (0, 300), TIERS)
+            self.record(results == [(58, False, True), (598, False, True)],
+                        f"{name} tiered reset times follow the blocking tier: {results}")
+            if name == "mongo":
+                self.mongo_db.drop_collection(backend.collection.name)
+
+    def test_parallel_processes(self, processes=16, attempts=20):
+        """Many processes share one identifier; only 5 requests may get through"""
+        print(f"\n🔍 Hammering shared backends from {processes} processes...")
+        targets = [("shm", os.path.join(self.tmpdir, "parallel"))]
+        if self.mongo_db is not None:
+            targets.append(("mongo", f"rate_limits_parallel_{time.time_ns()}"))
+
+        for backend_name, path in targets:
+            results = multiprocessing.Queue()
+            workers = [
+                multiprocessing.Process(target=_hammer,
+                                        args=(backend_name, path, "203.0.113.7", attempts, results))
+                for _ in range(processes)
+            ]
+            for worker in workers:
+                worker.start()
+            total_allowed = sum(results.get() for _ in workers)
+            for worker in workers:
+                worker.join()
+
+            self.record(total_allowed == 5,
+                        f"{backend_name}: {total_allowed} of {processes * attempts} requests allowed (expected 5)")
+            if backend_name == "mongo":
+                self.mongo_db.drop_collection(path)
+
+    def run_all_tests(self):
+        self.test_backends_agree()
+        self.test_reset_time()
+        self.test_remaining_mid_window()
+        self.test_tiers_agree()
+        self.test_parallel_processes()
+        print(f"\n📊 {self.passed} passed, {self.failed} failed")
+        return self.failed == 0
+
+
+def main():
+    tester = RateLimiterBackendTester()
+    return 0 if tester.run_all_tests() else 1
+
+
+if __name__ == "__main__":
+    exit(main())
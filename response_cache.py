@@ -0,0 +1,230 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+# Response headers worth replaying from the cache; CORS and the cache
+# headers themselves are added per request
+CACHED_HEADERS = {b"content-type", b"vary"}
+# The only stored headers a 304 repeats, besides ETag and Cache-Control;
+# Content-Type and Content-Length there would describe the empty 304 body
+NOT_MODIFIED_HEADERS = {b"vary"}
+# Requests carrying credentials bypass the cache: their responses may hold
+# data that only the caller is allowed to see
+CREDENTIAL_HEADERS = {b"authorization", b"x-api-key"}
+
+
+class CacheEntry:
+    __slots__ = ("body", "headers", "etag", "expires_at")
+
+    def __init__(self, body: bytes, headers: list, etag: str, expires_at: float):
+        self.body = body
+        self.headers = headers
+        self.etag = etag
+        self.expires_at = expires_at
+
+
+class MemoryCacheBackend:
+    """Entries held in this process, evicting the least recently used"""
+
+    def __init__(self, max_entries: int = 1024, clock=time.time):
+        self.max_entries = max_entries
+        self.clock = clock
+        self.entries = OrderedDict()
+
+    async def get(self, key: str):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= self.clock():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    async def set(self, key: str, entry: CacheEntry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+class MongoCacheBackend:
+    """
+    Entries stored in MongoDB and shared by every worker, so a poll served
+    by one worker spares the others from recomputing. A TTL index (see
+    db_indexes) removes expired entries; reads also skip them since TTL
+    deletion runs only once a minute.
+    """
+
+    def __init__(self, db, collection: str = "response_cache"):
+        self.collection = db[collection]
+
+    async def get(self, key: str):
+        document = await self.collection.find_one(
+            {"_id": key, "expires_at": {"$gt": datetime.utcnow()}}
+        )
+        if document is None:
+            return None
+        return CacheEntry(
+            bytes(document["body"]),
+            [(name.encode("latin-1"), value.encode("latin-1")) for name, value in document["headers"]],
+            document["etag"],
+            document["expires_at"].replace(tzinfo=timezone.utc).timestamp(),
+        )
+
+    async def set(self, key: str, entry: CacheEntry):
+        await self.collection.replace_one({"_id": key}, {
+            "body": entry.body,
+            "headers": [[name.decode("latin-1"), value.decode("latin-1")] for name, value in entry.headers],
+            "etag": entry.etag,
+            "expires_at": datetime.utcfromtimestamp(entry.expires_at),
+        }, upsert=True)
+
+
+def create_cache_backend(name: str = "memory", db=None):
+    """Build the response cache backend selected by name (memory, mongo or off)"""
+    if name == "off":
+        return None
+    if name == "memory":
+        return MemoryCacheBackend()
+    if name == "mongo":
+        if db is None:
+            raise ValueError("The mongo response cache backend needs a database")
+        return MongoCacheBackend(db)
+    raise ValueError(f"Unknown response cache backend: {name}")
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+class ResponseCacheMiddleware:
+    """
+    Pure ASGI middleware caching successful GET responses of selected routes.
+    ttls maps request paths to seconds; the query string is part of the key.
+    Requests with credentials are never cached. ETags are a hash of the
+    body, so every worker hands out the same tag for the same content, and
+    a matching If-None-Match gets a bodiless 304.
+    Concurrent misses for one key share a single call into the app.
+    """
+
+    def __init__(self, app, backend, ttls: dict, on_result=None, clock=time.time):
+        self.app = app
+        self.backend = backend
+        self.ttls = ttls
+        # Called with "hit", "miss", "not_modified" or "bypass", for metrics
+        self.on_result = on_result
+        self.clock = clock
+        self._inflight = {}
+
+    def _count(self, result: str):
+        if self.on_result is not None:
+            self.on_result(result)
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] != "GET"
+                or self.backend is None or scope["path"] not in self.ttls
+                or any(name in CREDENTIAL_HEADERS for name, _ in scope["headers"])):
+            await self.app(scope, receive, send)
+            return
+
+        key = scope["path"] + "?" + scope["query_string"].decode("latin-1")
+        # Lets MetricsMiddleware label hits, which never reach the router
+        scope["cache_route"] = scope["path"]
+        try:
+            entry = await self.backend.get(key)
+        except Exception as e:
+            logger.error("Response cache read failed for %s: %s", key, e)
+            entry = None
+
+        result = "hit"
+        if entry is None:
+            result = "miss"
+            entry = await self._fill(key, scope, receive, send)
+            if entry is None:
+                # Not cacheable; the response has already been sent
+                self._count("bypass")
+                return
+
+        if_none_match = _header(scope, b"if-none-match")
+        if if_none_match is not None and etag_matches(if_none_match, entry.etag):
+            self._count("not_modified")
+            await self._send(send, entry, 304, b"", result)
+        else:
+            self._count(result)
+            await self._send(send, entry, 200, entry.body, result)
+
+    async def _fill(self, key, scope, receive, send):
+        waiter = self._inflight.get(key)
+        if waiter is not None:
+            entry = await asyncio.shield(waiter)
+            if entry is not None:
+                return entry
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        entry = None
+        try:
+            entry = await self._call_app(key, scope, receive, send)
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            future.set_result(entry)
+        return entry
+
+    async def _call_app(self, key, scope, receive, send):
+        messages = []
+
+        async def capture(message):
+            messages.append(message)
+
+        await self.app(scope, receive, capture)
+        start = messages[0] if messages else None
+        if start is None or start["status"] != 200 or any(
+                message.get("more_body") for message in messages[1:]):
+            for message in messages:
+                await send(message)
+            return None
+
+        body = b"".join(message.get("body", b"") for message in messages[1:])
+        entry = CacheEntry(
+            body,
+            [(name, value) for name, value in start.get("headers", []) if name.lower() in CACHED_HEADERS],
+            '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"',
+            self.clock() + self.ttls[scope["path"]],
+        )
+        try:
+            await self.backend.set(key, entry)
+        except Exception as e:
+            logger.error("Response cache write failed for %s: %s", key, e)
+        return entry
+
+    async def _send(self, send, entry, status, body, result):
+        max_age = max(0, round(entry.expires_at - self.clock()))
+        if status == 200:
+            headers = list(entry.headers) + [(b"content-length", str(len(body)).encode("latin-1"))]
+        else:
+            headers = [(name, value) for name, value in entry.headers if name.lower() in NOT_MODIFIED_HEADERS]
+        headers += [
+            (b"etag", entry.etag.encode("latin-1")),
+            (b"cache-control", f"public, max-age={max_age}".encode("latin-1")),
+            (b"x-cache", result.upper().encode("latin-1")),
+        ]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+def _header(scope, name: bytes):
+    for header, value in scope["headers"]:
+        if header == name:
+            return value.decode("latin-1")
+    return None
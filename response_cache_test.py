@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Response Cache Testing for SNO Website
+Drives ResponseCacheMiddleware directly as an ASGI app: hits and misses,
+ETag / If-None-Match handling, what is never cached, expiry on a fake
+clock, and single-flight refills of a cold or expired key. Also round
+trips entries through the MongoDB backend (mongomock-motor when MongoDB
+isn't reachable).
+"""
+
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+
+from response_cache import CacheEntry, MemoryCacheBackend, MongoCacheBackend, ResponseCacheMiddleware
+
+load_dotenv('/app/backend/.env')
+
+MONGO_URL = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+
+TTLS = {"/api/contact/stats": 30}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingApp:
+    """Answers with a body naming the call, optionally held until released"""
+
+    def __init__(self):
+        self.calls = 0
+        self.status = 200
+        self.gate = None
+        self.streaming = False
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        call, status = self.calls, self.status
+        if self.gate is not None:
+            await self.gate.wait()
+        body = f'{{"call": {call}}}'.encode()
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json"), (b"vary", b"accept-encoding"),
+                                (b"x-internal", b"1")]})
+        if self.streaming:
+            await send({"type": "http.response.body", "body": body[:4], "more_body": True})
+            await send({"type": "http.response.body", "body": body[4:]})
+        else:
+            await send({"type": "http.response.body", "body": body})
+
+
+async def request(middleware, path="/api/contact/stats", query=b"", headers=(), method="GET"):
+    scope = {"type": "http", "method": method, "path": path, "query_string": query,
+             "headers": [(name.encode(), value.encode()) for name, value in headers]}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await middleware(scope, receive, send)
+    headers = {name.decode(): value.decode() for name, value in messages[0]["headers"]}
+    return messages[0]["status"], headers, b"".join(message.get("body", b"") for message in messages[1:])
+
+
+class ResponseCacheTester:
+    def __init__(self):
+        self.passed = 0
+        self.failed = 0
+
+    def record(self, ok, description):
+        if ok:
+            self.passed += 1
+            print(f"✅ {description}")
+        else:
+            self.failed += 1
+            print(f"❌ {description}")
+
+    def build(self):
+        app, clock, results = CountingApp(), FakeClock(), []
+        middleware = ResponseCacheMiddleware(app, MemoryCacheBackend(clock=clock), TTLS,
+                                             on_result=results.append, clock=clock)
+        return middleware, app, clock, results
+
+    async def test_hits(self):
+        print("\n🔍 Hits and misses...")
+        middleware, app, clock, results = self.build()
+        status, first, body = await request(middleware)
+        self.record(status == 200 and first["x-cache"] == "MISS" and body == b'{"call": 1}',
+                    f"First request runs the app: {status} {first['x-cache']}")
+        clock.now += 10
+        status, second, body = await request(middleware)
+        self.record(status == 200 and second["x-cache"] == "HIT" and body == b'{"call": 1}' and app.calls == 1,
+                    f"Second request served from cache: {second['x-cache']}, {app.calls} app call")
+        self.record(second["etag"] == first["etag"] and second["content-type"] == "application/json"
+                    and "x-internal" not in second,
+                    "Same ETag, content-type replayed, other app headers dropped")
+        self.record(first["cache-control"] == "public, max-age=30" and second["cache-control"] == "public, max-age=20",
+                    f"max-age counts down: {first['cache-control']} -> {second['cache-control']}")
+        self.record(second["content-length"] == str(len(body)), f"Content-Length: {second['content-length']}")
+        await request(middleware, query=b"bucket=week")
+        self.record(app.calls == 2, "Query string is part of the key")
+        self.record(results == ["miss", "hit", "miss"], f"Results reported: {results}")
+
+        # Another worker rendering the same body hands out the same tag
+        other_worker, _, _, _ = self.build()
+        _, other, _ = await request(other_worker)
+        self.record(other["etag"] == first["etag"], f"ETag is a hash of the body: {first['etag']}")
+
+    async def test_conditional(self):
+        print("\n🔍 If-None-Match...")
+        middleware, app, clock, results = self.build()
+        _, headers, _ = await request(middleware)
+        etag = headers["etag"]
+        cases = (
+            (etag, 304),
+            ("W/" + etag, 304),
+            (f'"other", {etag}', 304),
+            ("*", 304),
+            ('"other"', 200),
+        )
+        for if_none_match, expected in cases:
+            status, headers, body = await request(middleware, headers=[("if-none-match", if_none_match)])
+            self.record(status == expected and (status == 200 or (body == b"" and headers["etag"] == etag
+                                                                   and "content-type" not in headers
+                                                                   and "content-length" not in headers)),
+                        f"If-None-Match {if_none_match}: {status}")
+        _, headers, _ = await request(middleware, headers=[("if-none-match", etag)])
+        self.record(headers["cache-control"].startswith("public, max-age=") and headers.get("vary") == "accept-encoding",
+                    f"304 repeats Cache-Control and Vary: {sorted(headers)}")
+        self.record(app.calls == 1, f"Conditional requests never reach the app: {app.calls} call")
+        self.record(results.count("not_modified") == 5, f"304s reported as not_modified: {results}")
+
+        # A worker that hasn't cached the route yet fills it, then answers 304
+        # to a tag another worker handed out
+        middleware, app, clock, results = self.build()
+        status, _, body = await request(middleware, headers=[("if-none-match", etag)])
+        self.record(status == 304 and body == b"" and app.calls == 1, f"Matching tag on a miss: {status} after filling")
+
+    async def test_not_cached(self):
+        print("\n🔍 Responses that are never cached...")
+        middleware, app, clock, results = self.build()
+        app.status = 500
+        await request(middleware)
+        app.status = 200
+        status, headers, _ = await request(middleware)
+        self.record(app.calls == 2 and headers["x-cache"] == "MISS", f"Errors not cached: {app.calls} app calls")
+
+        middleware, app, clock, results = self.build()
+        app.streaming = True
+        for _ in range(2):
+            status, headers, body = await request(middleware)
+        self.record(app.calls == 2 and body == b'{"call": 2}' and "x-cache" not in headers,
+                    f"Streamed responses passed through: {app.calls} app calls")
+
+        for label, kwargs in (
+            ("POST", {"method": "POST"}),
+            ("Path without a TTL", {"path": "/api/contact/submissions"}),
+            ("X-API-Key", {"headers": [("x-api-key", "secret")]}),
+            ("Authorization", {"headers": [("authorization", "Bearer secret")]}),
+        ):
+            middleware, app, clock, results = self.build()
+            for _ in range(2):
+                status, headers, _ = await request(middleware, **kwargs)
+            self.record(app.calls == 2 and "x-cache" not in headers, f"{label} bypasses the cache: {app.calls} app calls")
+
+        middleware, app, clock, results = self.build()
+        await request(middleware, headers=[("x-api-key", "secret")])
+        status, headers, _ = await request(middleware)
+        self.record(headers["x-cache"] == "MISS", "A credentialed response is never served to others")
+
+    async def test_expiry(self):
+        print("\n🔍 Expiry...")
+        middleware, app, clock, results = self.build()
+        await request(middleware)
+        clock.now += 29.9
+        _, headers, body = await request(middleware)
+        self.record(headers["x-cache"] == "HIT" and body == b'{"call": 1}', "Served until the TTL runs out")
+        clock.now += 0.1
+        _, headers, body = await request(middleware)
+        self.record(headers["x-cache"] == "MISS" and body == b'{"call": 2}', "Refilled once expired")
+
+        backend = MemoryCacheBackend(max_entries=2, clock=clock)
+        for key in ("a", "b", "c"):
+            await backend.set(key, CacheEntry(b"", [], '"x"', clock.now + 30))
+        self.record(list(backend.entries) == ["b", "c"], f"Memory backend keeps max_entries: {list(backend.entries)}")
+
+    async def test_single_flight(self):
+        print("\n🔍 Single-flight refills...")
+        middleware, app, clock, results = self.build()
+        app.gate = asyncio.Event()
+        requests = [asyncio.create_task(request(middleware)) for _ in range(20)]
+        await asyncio.sleep(0.01)
+        app.gate.set()
+        responses = await asyncio.gather(*requests)
+        self.record(app.calls == 1 and all(status == 200 and body == b'{"call": 1}' for status, _, body in responses),
+                    f"20 concurrent misses, {app.calls} app call")
+        self.record(not middleware._inflight, "No in-flight entries left behind")
+
+        clock.now += 31
+        app.gate = asyncio.Event()
+        requests = [asyncio.create_task(request(middleware)) for _ in range(20)]
+        await asyncio.sleep(0.01)
+        app.gate.set()
+        responses = await asyncio.gather(*requests)
+        self.record(app.calls == 2 and all(body == b'{"call": 2}' for _, _, body in responses),
+                    f"Expired entry refreshed once for 20 concurrent requests: {app.calls} app calls in total")
+
+        # A failed fill isn't shared: every waiter gets its own answer
+        middleware, app, clock, results = self.build()
+        app.gate, app.status = asyncio.Event(), 500
+        requests = [asyncio.create_task(request(middleware)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        app.status = 200
+        app.gate.set()
+        statuses = sorted(status for status, _, _ in await asyncio.gather(*requests))
+        self.record(statuses == [200, 200, 500] and not middleware._inflight,
+                    f"Waiters of a failed fill call the app themselves: {statuses}, {app.calls} app calls")
+
+        # The leader going away mustn't strand the requests waiting on it
+        middleware, app, clock, results = self.build()
+        app.gate = asyncio.Event()
+        leader = asyncio.create_task(request(middleware))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(request(middleware))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        await asyncio.sleep(0.01)
+        app.gate.set()
+        status, _, body = await asyncio.wait_for(follower, 5)
+        self.record(status == 200 and not middleware._inflight,
+                    f"Follower of a cancelled leader still answered: {status} {body}")
+
+    async def test_mongo_backend(self):
+        print("\n🔍 MongoDB backend...")
+        try:
+            from motor.motor_asyncio import AsyncIOMotorClient
+            client = AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=1000)
+            await client.admin.command('ping')
+            db = client[f"response_cache_test_{time.time_ns()}"]
+            print("✅ Using MongoDB at", MONGO_URL)
+        except Exception:
+            from mongomock_motor import AsyncMongoMockClient
+            print("⚠️ MongoDB not available, using mongomock-motor")
+            db = AsyncMongoMockClient()["response_cache_test"]
+        backend = MongoCacheBackend(db)
+        # Millisecond precision, as stored
+        expires_at = round(time.time() + 30, 3)
+        entry = CacheEntry(b'{"total": 3}', [(b"content-type", b"application/json")], '"abc"', expires_at)
+        await backend.set("/api/contact/stats?", entry)
+        stored = await backend.get("/api/contact/stats?")
+        self.record(stored is not None and (stored.body, stored.headers, stored.etag) == (entry.body, entry.headers, entry.etag)
+                    and abs(stored.expires_at - expires_at) < 0.001,
+                    "Entry round trips through MongoDB")
+        await backend.set("expired", CacheEntry(b"", [], '"x"', time.time() - 1))
+        self.record(await backend.get("expired") is None, "Expired entry ignored before the TTL monitor removes it")
+        await db.drop_collection("response_cache")
+
+    async def run_all_tests(self):
+        await self.test_hits()
+        await self.test_conditional()
+        await self.test_not_cached()
+        await self.test_expiry()
+        await self.test_single_flight()
+        await self.test_mongo_backend()
+        print(f"\n📊 {self.passed} passed, {self.failed} failed")
+        return self.failed == 0
+
+
+def main():
+    tester = ResponseCacheTester()
+    return 0 if asyncio.run(tester.run_all_tests()) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
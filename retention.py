@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Retention for contact_submissions: scrub client details from old
+submissions and move the oldest ones out of the hot collection, so it
+stays small enough for its working set and indexes to fit in the
+WiredTiger cache.
+
+The server runs a pass every RETENTION_INTERVAL seconds. Run one now, or
+bring archived submissions back, from the command line:
+
+    python retention.py run
+    python retention.py restore collection --start 2024-01-01 --end 2024-07-01
+    python retention.py restore archive/contact_submissions-20240101T000000-20240131T235959-1a2b3c4d.ndjson.zst
+"""
+
+import argparse
+import asyncio
+import gzip
+import itertools
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from bson import json_util
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import BulkWriteError, CollectionInvalid, DuplicateKeyError, OperationFailure
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_TARGETS = ("collection", "files")
+# Client details dropped from submissions older than the scrub period
+PII_FIELDS = ("ip_address", "user_agent")
+ARCHIVE_COLLECTION = "contact_submissions_archive"
+ARCHIVE_INDEXES = [
+    IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    IndexModel([("timestamp", ASCENDING), ("id", ASCENDING)], name="timestamp_id"),
+]
+# Singleton document holding the archived count and the run lease
+STATE_ID = "contact_submissions"
+FILE_PREFIX = "contact_submissions-"
+# Archives are written once, off the event loop, and kept for years; at
+# level 12 zstd beats gzip 9 on size in about the same time
+ZSTD_LEVEL = 12
+GZIP_LEVEL = 6
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def open_archive_file(path, mode: str = "rt"):
+    """Open an archive file as text, compressed with zstd (.zst) or gzip (.gz)"""
+    path = str(path)
+    if path.endswith(".zst"):
+        zstandard = _zstandard()
+        if zstandard is None:
+            raise RuntimeError(f"Reading {path} needs the zstandard package")
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL) if "w" in mode else None
+        return zstandard.open(path, mode, cctx=compressor, encoding="utf-8")
+    if path.endswith(".gz"):
+        return gzip.open(path, mode, compresslevel=GZIP_LEVEL, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def archive_suffix() -> str:
+    """zstd when the zstandard package is installed, gzip otherwise"""
+    return ".ndjson.zst" if _zstandard() is not None else ".ndjson.gz"
+
+
+def _without_duplicates(error: BulkWriteError):
+    """Re-raise a bulk insert error unless every failure is a duplicate id"""
+    if any(failure["code"] != 11000 for failure in error.details.get("writeErrors", ())):
+        raise error
+
+
+class SubmissionRetention:
+    """
+    Scheduled retention pass over contact_submissions:
+    - after scrub_after_days, PII_FIELDS are removed
+    - after archive_after_days, submissions move to the target: the
+      contact_submissions_archive collection (created with zstd block
+      compression) or zstd NDJSON files in archive_dir, one per pass of up
+      to file_size submissions
+
+    Submissions are written to the archive before they are deleted from
+    the hot collection, so a crash in between leaves duplicates, never
+    gaps; restore skips ids that already exist. Only one worker runs a
+    pass at a time, holding a lease in the retention_state collection
+    that expires after interval if the worker dies mid-pass.
+    Restored submissions stay hot for another archive_after_days.
+    """
+
+    def __init__(self, db, archive_after_days: float = None, scrub_after_days: float = None,
+                 target: str = "collection", archive_dir: str = "archive", batch_size: int = 1000,
+                 file_size: int = 100_000, interval: float = 3600.0, on_result=None):
+        if target not in ARCHIVE_TARGETS:
+            raise ValueError(f"Unknown archive target: {target}")
+        if archive_after_days is not None and scrub_after_days is not None and scrub_after_days > archive_after_days:
+            # Archived submissions can't be scrubbed any more
+            raise ValueError("Submissions must be scrubbed before they are archived")
+        self.hot = db.contact_submissions
+        self.archive_collection = db[ARCHIVE_COLLECTION]
+        self.state = db.retention_state
+        self.db = db
+        self.archive_after = timedelta(days=archive_after_days) if archive_after_days is not None else None
+        self.scrub_after = timedelta(days=scrub_after_days) if scrub_after_days is not None else None
+        self.target = target
+        self.archive_dir = Path(archive_dir)
+        self.batch_size = batch_size
+        self.file_size = file_size
+        self.interval = interval
+        # Called with the action ("scrubbed", "archived" or "restored") and a count, for metrics
+        self.on_result = on_result
+        self.owner = str(uuid.uuid4())
+        self._task = None
+
+    def _report(self, action: str, count: int):
+        if count and self.on_result is not None:
+            self.on_result(action, count)
+
+    async def ensure_archive(self):
+        """Create the archive collection with zstd block compression, and its indexes"""
+        if self.target != "collection":
+            return
+        try:
+            # The compressor can only be chosen when the collection is created
+            await self.db.create_collection(
+                ARCHIVE_COLLECTION, storageEngine={"wiredTiger": {"configString": "block_compressor=zstd"}}
+            )
+        except CollectionInvalid:
+            pass
+        except OperationFailure as e:
+            # MongoDB before 4.2 has no zstd; the first insert creates it with the default compressor
+            logger.warning("Archive collection not created with zstd compression: %s", e)
+        await self.archive_collection.create_indexes(ARCHIVE_INDEXES)
+
+    async def _acquire_lease(self, now: datetime) -> bool:
+        """Claim the pass for this worker"""
+        try:
+            await self.state.update_one(
+                {"_id": STATE_ID, "lease_until": {"$not": {"$gt": now}}},
+                {"$set": {"lease_until": now + timedelta(seconds=self.interval), "lease_owner": self.owner}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            # The document exists and another worker's lease hasn't expired
+            return False
+
+    async def scrub(self, now: datetime) -> int:
+        """Remove PII_FIELDS from submissions older than the scrub period"""
+        if self.scrub_after is None:
+            return 0
+        result = await self.hot.update_many(
+            {"timestamp": {"$lt": now - self.scrub_after}, "pii_scrubbed": {"$ne": True}},
+            {"$unset": {field: "" for field in PII_FIELDS}, "$set": {"pii_scrubbed": True}},
+        )
+        self._report("scrubbed", result.modified_count)
+        return result.modified_count
+
+    async def _expired(self, cutoff: datetime, limit: int):
+        return await (self.hot.find({"timestamp": {"$lt": cutoff}, "restored_at": {"$not": {"$gte": cutoff}}})
+                      .sort([("timestamp", ASCENDING), ("id", ASCENDING)])
+                      .limit(limit)
+                      .to_list(limit))
+
+    async def _remove_hot(self, documents) -> int:
+        removed = 0
+        for offset in range(0, len(documents), self.batch_size):
+            ids = [document["id"] for document in documents[offset:offset + self.batch_size]]
+            result = await self.hot.delete_many({"id": {"$in": ids}})
+            removed += result.deleted_count
+        await self.state.update_one({"_id": STATE_ID}, {"$inc": {"archived": removed}}, upsert=True)
+        self._report("archived", removed)
+        return removed
+
+    async def _archive_to_collection(self, cutoff: datetime) -> int:
+        archived = 0
+        while True:
+            documents = await self._expired(cutoff, self.batch_size)
+            if not documents:
+                return archived
+            try:
+                await self.archive_collection.insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                # Already archived by a pass that stopped before deleting them
+                _without_duplicates(e)
+            archived += await self._remove_hot(documents)
+
+    def _write_file(self, documents) -> Path:
+        first, last = documents[0]["timestamp"], documents[-1]["timestamp"]
+        name = f"{FILE_PREFIX}{first:%Y%m%dT%H%M%S}-{last:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}{archive_suffix()}"
+        path = self.archive_dir / name
+        # Hidden until complete, so restoring a directory never reads it
+        partial = path.with_name("." + path.name)
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        with open_archive_file(partial, "wt") as archive:
+            for document in documents:
+                archive.write(json_util.dumps(document, json_options=json_util.RELAXED_JSON_OPTIONS))
+                archive.write("\n")
+        # Durable under its final name before the submissions are deleted
+        with open(partial, "rb") as written:
+            os.fsync(written.fileno())
+        os.replace(partial, path)
+        return path
+
+    async def _archive_to_files(self, cutoff: datetime) -> int:
+        archived = 0
+        while True:
+            documents = await self._expired(cutoff, self.file_size)
+            if not documents:
+                return archived
+            path = await asyncio.to_thread(self._write_file, documents)
+            logger.info("Archived %d submissions to %s", len(documents), path)
+            archived += await self._remove_hot(documents)
+
+    async def archive(self, now: datetime) -> int:
+        """Move submissions older than the archive period to the target"""
+        if self.archive_after is None:
+            return 0
+        cutoff = now - self.archive_after
+        if self.target == "collection":
+            return await self._archive_to_collection(cutoff)
+        return await self._archive_to_files(cutoff)
+
+    async def run_once(self, now: datetime = None):
+        """
+        One retention pass, unless another worker holds the lease
+        Returns:
+            dict: {"scrubbed": n, "archived": n}, or None when skipped
+        """
+        now = now or datetime.utcnow()
+        if not await self._acquire_lease(now):
+            return None
+        try:
+            # Scrub first, so nothing is archived with its client details
+            report = {"scrubbed": await self.scrub(now), "archived": await self.archive(now)}
+        finally:
+            # Released on the clock it was taken with, so the next pass can start
+            await self.state.update_one({"_id": STATE_ID, "lease_owner": self.owner},
+                                        {"$set": {"lease_until": now}})
+        logger.info("Retention pass: %d scrubbed, %d archived", report["scrubbed"], report["archived"])
+        return report
+
+    async def _run_periodically(self):
+        try:
+            await self.ensure_archive()
+        except Exception as e:
+            logger.error("Archive collection setup failed: %s", e)
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error("Retention pass failed: %s", e)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run_periodically())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _restore_batch(self, documents, now: datetime) -> int:
+        for document in documents:
+            document["restored_at"] = now
+        try:
+            result = await self.hot.insert_many(documents, ordered=False)
+            restored = len(result.inserted_ids)
+        except BulkWriteError as e:
+            # Submissions still in the hot collection keep their current copy
+            _without_duplicates(e)
+            restored = e.details["nInserted"]
+        await self.state.update_one({"_id": STATE_ID}, {"$inc": {"archived": -restored}}, upsert=True)
+        self._report("restored", restored)
+        return restored
+
+    def _read_files(self, source: Path, start: datetime, end: datetime):
+        paths = sorted(source.glob(f"{FILE_PREFIX}*.ndjson*")) if source.is_dir() else [source]
+        for path in paths:
+            with open_archive_file(path, "rt") as archive:
+                for line in archive:
+                    document = json_util.loads(line)
+                    if (start is None or document["timestamp"] >= start) and (end is None or document["timestamp"] < end):
+                        yield document
+
+    async def restore(self, source: str = "collection", start: datetime = None, end: datetime = None) -> int:
+        """
+        Put archived submissions back in the hot collection
+        Args:
+            source: "collection" for the archive collection, or an archive
+                file or directory of them
+            start, end: Naive UTC bounds on the timestamp, end exclusive
+        Returns:
+            int: Submissions restored
+        """
+        now = datetime.utcnow()
+        restored = 0
+        if source == "collection":
+            bounds = {}
+            if start is not None:
+                bounds["$gte"] = start
+            if end is not None:
+                bounds["$lt"] = end
+            query = {"timestamp": bounds} if bounds else {}
+            while True:
+                documents = await self.archive_collection.find(query).limit(self.batch_size).to_list(self.batch_size)
+                if not documents:
+                    return restored
+                ids = [document["id"] for document in documents]
+                restored += await self._restore_batch(documents, now)
+                await self.archive_collection.delete_many({"id": {"$in": ids}})
+
+        # Files stay where they are; they remain the archived copy
+        reader = self._read_files(Path(source), start, end)
+        while True:
+            documents = await asyncio.to_thread(list, itertools.islice(reader, self.batch_size))
+            if not documents:
+                return restored
+            restored += await self._restore_batch(documents, now)
+
+
+def _days(name: str):
+    value = os.environ.get(name, "").strip()
+    return float(value) if value else None
+
+
+def create_retention(db, on_result=None):
+    """
+    Build the retention job from the RETENTION_* environment variables, or
+    None when neither archiving nor scrubbing is configured
+    """
+    archive_after_days = _days("RETENTION_ARCHIVE_AFTER_DAYS")
+    scrub_after_days = _days("RETENTION_SCRUB_AFTER_DAYS")
+    if archive_after_days is None and scrub_after_days is None:
+        return None
+    return SubmissionRetention(
+        db,
+        archive_after_days=archive_after_days,
+        scrub_after_days=scrub_after_days,
+        target=os.environ.get("RETENTION_ARCHIVE_TARGET", "collection"),
+        archive_dir=os.environ.get("RETENTION_ARCHIVE_DIR", "archive"),
+        interval=float(os.environ.get("RETENTION_INTERVAL", "3600")),
+        on_result=on_result,
+    )
+
+
+async def _main(args):
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / ".env")
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+    db = client[os.environ["DB_NAME"]]
+    try:
+        if args.command == "run":
+            retention = create_retention(db)
+            if retention is None:
+                print("Retention is not configured: set RETENTION_ARCHIVE_AFTER_DAYS or RETENTION_SCRUB_AFTER_DAYS")
+                return 1
+            await retention.ensure_archive()
+            report = await retention.run_once()
+            print("Another worker is running a pass" if report is None
+                  else f"{report['scrubbed']} scrubbed, {report['archived']} archived")
+        else:
+            retention = create_retention(db) or SubmissionRetention(db)
+            restored = await retention.restore(args.source, start=args.start, end=args.end)
+            print(f"{restored} submissions restored")
+        return 0
+    finally:
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Contact submission retention")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("run", help="Run one scrub and archive pass now")
+    restore = commands.add_parser("restore", help="Put archived submissions back in the hot collection")
+    restore.add_argument("source", help='"collection" for the archive collection, or an archive file or directory')
+    restore.add_argument("--start", type=datetime.fromisoformat, help="Earliest timestamp to restore (UTC)")
+    restore.add_argument("--end", type=datetime.fromisoformat, help="Restore timestamps before this (UTC)")
+    logging.basicConfig(level=logging.INFO)
+    return asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    exit(main())
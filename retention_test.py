@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Retention Testing for SNO Website
+Runs scrub, archive and restore round trips over contact_submissions, to
+the archive collection and to archive files, and checks that no
+submission is lost, duplicated or altered beyond the scrubbed fields.
+Also checks that the retention lease lets one worker run a pass at a time.
+Uses MongoDB at MONGO_URL when reachable, otherwise mongomock-motor.
+"""
+
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from dotenv import load_dotenv
+
+from retention import ARCHIVE_INDEXES, PII_FIELDS, STATE_ID, SubmissionRetention
+
+load_dotenv('/app/backend/.env')
+
+MONGO_URL = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+
+NOW = datetime(2026, 6, 1)
+SUBMISSIONS = 600
+DAYS = 800
+
+
+async def get_database():
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=1000)
+        await client.admin.command('ping')
+        print("✅ Using MongoDB at", MONGO_URL)
+        return client[f"retention_test_{time.time_ns()}"], True
+    except Exception:
+        from mongomock_motor import AsyncMongoMockClient
+        print("⚠️ MongoDB not available, using mongomock-motor")
+        return AsyncMongoMockClient()[f"retention_test_{time.time_ns()}"], False
+
+
+def _submissions():
+    """Submissions spread over DAYS before NOW, timestamps at millisecond precision like BSON"""
+    rng = random.Random(3)
+    documents = []
+    for i in range(SUBMISSIONS):
+        age = timedelta(days=rng.uniform(0, DAYS))
+        documents.append({
+            "id": f"sub-{i:04d}",
+            "name": f"Cliente {i}",
+            "email": f"cliente{i}@example.com",
+            "message": f"Mensagem número {i} com acentuação: orçamento, informação.",
+            "timestamp": (NOW - age).replace(microsecond=(NOW - age).microsecond // 1000 * 1000),
+            "ip_address": f"203.0.113.{i % 250}",
+            "user_agent": "Mozilla/5.0",
+        })
+    return documents
+
+
+def _content(document):
+    """Fields a submission must keep through any retention round trip"""
+    return {field: document[field] for field in ("id", "name", "email", "message", "timestamp")}
+
+
+class RetentionTester:
+    def __init__(self):
+        self.passed = 0
+        self.failed = 0
+
+    def record(self, ok, description):
+        if ok:
+            self.passed += 1
+            print(f"✅ {description}")
+        else:
+            self.failed += 1
+            print(f"❌ {description}")
+
+    async def _fresh(self, db, real_mongo, **options):
+        for name in ("contact_submissions", "contact_submissions_archive", "retention_state"):
+            await db.drop_collection(name)
+        retention = SubmissionRetention(db, archive_after_days=365, scrub_after_days=90, **options)
+        if real_mongo:
+            await retention.ensure_archive()
+        else:
+            # mongomock can't create collections with storage options
+            await retention.archive_collection.create_indexes(ARCHIVE_INDEXES)
+        originals = _submissions()
+        await db.contact_submissions.insert_many([dict(document) for document in originals])
+        return retention, originals
+
+    async def _check_integrity(self, db, originals, label):
+        hot = await db.contact_submissions.find({}, {"_id": 0}).to_list(None)
+        archived = await db.contact_submissions_archive.find({}, {"_id": 0}).to_list(None)
+        ids = [document["id"] for document in hot + archived]
+        self.record(sorted(ids) == sorted(original["id"] for original in originals),
+                    f"{label}: every submission present exactly once ({len(hot)} hot, {len(archived)} archived)")
+        by_id = {original["id"]: _content(original) for original in originals}
+        altered = [document["id"] for document in hot + archived if _content(document) != by_id[document["id"]]]
+        self.record(not altered, f"{label}: contents unchanged ({len(altered)} altered)")
+        return hot, archived
+
+    async def test_collection_round_trip(self, db, real_mongo):
+        print("\n🔍 Scrub, archive and restore through the archive collection...")
+        results = []
+        retention, originals = await self._fresh(db, real_mongo, on_result=lambda *result: results.append(result))
+        scrub_cutoff, archive_cutoff = NOW - timedelta(days=90), NOW - timedelta(days=365)
+        expected_scrubbed = sum(original["timestamp"] < scrub_cutoff for original in originals)
+        expected_archived = sum(original["timestamp"] < archive_cutoff for original in originals)
+
+        report = await retention.run_once(NOW)
+        self.record(report == {"scrubbed": expected_scrubbed, "archived": expected_archived},
+                    f"Pass report: {report} (expected {expected_scrubbed} scrubbed, {expected_archived} archived)")
+        hot, archived = await self._check_integrity(db, originals, "After archiving")
+        self.record(all(document["timestamp"] >= archive_cutoff for document in hot)
+                    and all(document["timestamp"] < archive_cutoff for document in archived),
+                    "Split at the archive cutoff")
+        with_pii = [document for document in hot + archived if any(field in document for field in PII_FIELDS)]
+        self.record(all(document["timestamp"] >= scrub_cutoff for document in with_pii)
+                    and len(with_pii) == SUBMISSIONS - expected_scrubbed,
+                    f"Client details kept only on the last 90 days: {len(with_pii)} submissions")
+        state = await db.retention_state.find_one({"_id": STATE_ID})
+        self.record(state["archived"] == expected_archived, f"Archived count: {state['archived']}")
+        self.record(sorted(results) == sorted([("scrubbed", expected_scrubbed), ("archived", expected_archived)]),
+                    f"Reported for metrics: {results}")
+
+        report = await retention.run_once(NOW)
+        self.record(report == {"scrubbed": 0, "archived": 0}, f"Second pass has nothing to do: {report}")
+
+        start, end = NOW - timedelta(days=600), NOW - timedelta(days=500)
+        window = [original for original in originals if start <= original["timestamp"] < end]
+        restored = await retention.restore("collection", start=start, end=end)
+        self.record(restored == len(window), f"Restored {restored} submissions from the window (expected {len(window)})")
+        hot, archived = await self._check_integrity(db, originals, "After restoring")
+        back = [document for document in hot if "restored_at" in document]
+        self.record(sorted(document["id"] for document in back) == sorted(original["id"] for original in window)
+                    and all("pii_scrubbed" in document for document in back),
+                    f"Restored submissions hot again, still scrubbed: {len(back)}")
+        state = await db.retention_state.find_one({"_id": STATE_ID})
+        self.record(state["archived"] == expected_archived - len(window), f"Archived count after restore: {state['archived']}")
+
+        report = await retention.run_once(NOW + timedelta(days=1))
+        self.record(report["archived"] == 0, f"Restored submissions not archived again on the next pass: {report}")
+
+        # A pass that stopped between the archive write and the hot delete
+        leftover = await db.contact_submissions_archive.find_one({}, {"_id": 0})
+        await db.contact_submissions.insert_one(dict(leftover))
+        report = await retention.run_once(NOW + timedelta(days=1))
+        self.record(report["archived"] == 1, f"Half-archived submission finished without error: {report}")
+        await self._check_integrity(db, originals, "After resuming")
+
+        restored = await retention.restore("collection")
+        hot, archived = await self._check_integrity(db, originals, "After restoring everything")
+        self.record(not archived and len(hot) == SUBMISSIONS, f"Archive emptied: {restored} more restored")
+
+    async def test_file_round_trip(self, db, real_mongo):
+        print("\n🔍 Archive to files and restore...")
+        with tempfile.TemporaryDirectory(prefix="sno_retention_") as archive_dir:
+            retention, originals = await self._fresh(db, real_mongo, target="files",
+                                                     archive_dir=archive_dir, file_size=100)
+            report = await retention.run_once(NOW)
+            files = sorted(Path(archive_dir).iterdir())
+            hidden = [path for path in files if path.name.startswith(".")]
+            self.record(len(files) == -(-report["archived"] // 100) and not hidden,
+                        f"{report['archived']} archived in {len(files)} files of up to 100, no partial files left")
+            hot = await db.contact_submissions.count_documents({})
+            self.record(hot == SUBMISSIONS - report["archived"], f"Archived submissions left the hot collection: {hot} hot")
+
+            restored = await retention.restore(archive_dir)
+            self.record(restored == report["archived"], f"Restored {restored} from the directory")
+            hot = await db.contact_submissions.find({}, {"_id": 0}).to_list(None)
+            by_id = {original["id"]: _content(original) for original in originals}
+            altered = [document["id"] for document in hot
+                       if _content(document) != by_id[document["id"]]]
+            self.record(len(hot) == SUBMISSIONS and not altered,
+                        f"Round trip through files intact: {len(hot)} hot, {len(altered)} altered")
+            restored = await retention.restore(archive_dir)
+            self.record(restored == 0 and await db.contact_submissions.count_documents({}) == SUBMISSIONS,
+                        f"Restoring again adds nothing: {restored}")
+
+    async def test_lease(self, db, real_mongo):
+        print("\n🔍 Retention lease...")
+        first, _ = await self._fresh(db, real_mongo)
+        second = SubmissionRetention(db, archive_after_days=365, scrub_after_days=90)
+        self.record(await first._acquire_lease(NOW), "First worker takes the lease")
+        report = await second.run_once(NOW)
+        self.record(report is None, "Second worker skips while the lease is held")
+        report = await second.run_once(NOW + timedelta(seconds=second.interval - 1))
+        self.record(report is None, "Still skipped just before the lease expires")
+        report = await second.run_once(NOW + timedelta(seconds=second.interval + 1))
+        self.record(report is not None and report["archived"] > 0,
+                    f"Expired lease taken over by the second worker: {report}")
+        report = await first.run_once(NOW + timedelta(seconds=second.interval + 2))
+        self.record(report == {"scrubbed": 0, "archived": 0}, f"Lease released after the pass: {report}")
+
+        # The second worker tries to start while the first is mid-pass
+        attempts = []
+        archive = first.archive
+
+        async def archive_with_contender(now):
+            attempts.append(await second.run_once(now))
+            return await archive(now)
+
+        first.archive = archive_with_contender
+        report = await first.run_once(NOW + timedelta(days=1))
+        self.record(report is not None and attempts == [None],
+                    f"Second worker skips a pass started at the same time: {attempts}")
+        await self._check_integrity(db, _submissions(), "After contended pass")
+
+    async def run_all_tests(self):
+        db, real_mongo = await get_database()
+        await self.test_collection_round_trip(db, real_mongo)
+        await self.test_file_round_trip(db, real_mongo)
+        await self.test_lease(db, real_mongo)
+        if real_mongo:
+            await db.client.drop_database(db.name)
+        print(f"\n📊 {self.passed} passed, {self.failed} failed")
+        return self.failed == 0
+
+
+def main():
+    tester = RetentionTester()
+    return 0 if asyncio.run(tester.run_all_tests()) else 1
+
+
+if __name__ == "__main__":
+    exit(main())
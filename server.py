@@ -1,99 +1,240 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Request
+from fastapi import FastAPI, APIRouter, HTTPException, Request, Response, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from dotenv import load_dotenv
-from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
+import hmac
+from contextlib import asynccontextmanager
 import os
 import logging
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Optional
 
-# Import our models and services
+# Import our models and the helpers the routes need; services and optional
+# subsystems are imported in create_app, only when they are used
 from models import ContactFormRequest, ContactFormResponse, ContactSubmission
-from email_service import EmailService
-from rate_limiter import RateLimiter
+from contact_rollups import BUCKET_SIZES, GROUPED_BUCKETS, MAX_BUCKETS, as_utc
+from contact_export import EXPORT_FORMATS, decode_cursor
+from contact_listing import MAX_PAGE_SIZE
+from contact_search import MAX_QUERY_LENGTH, MAX_SEARCH_PAGE_SIZE
+from idempotency import fingerprint, valid_key
+import metrics
+import logging_config
 
 ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+CONTACT_SUCCESS_MESSAGE = "Mensagem enviada com sucesso! Entraremos em contato em breve."
 
-# Initialize services
-email_service = EmailService()
-rate_limiter = RateLimiter()
+# Seconds the polled GET routes may be answered from the response cache
+RESPONSE_CACHE_TTLS = {
+    "/api/": 60,
+    "/api/contact/stats": 10,
+    "/api/contact/stats/timeseries": 60,
+}
 
-# Create the main app
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup and shutdown I/O for the services create_app put on app.state
+    """
+    from db_indexes import bootstrap_indexes, configured_indexes
+    from mongo_pool import warm_up
+
+    state = app.state
+    # Open pooled connections now rather than on the first requests
+    if os.environ.get('MONGO_WARMUP', 'true').lower() == 'true':
+        try:
+            elapsed = await warm_up(state.db, state.mongo_pool["minPoolSize"])
+            logger.info("MongoDB pool warmed up, %d connections open after %.1f ms",
+                        state.pool_monitor.totals()["open"], elapsed * 1000)
+        except Exception as e:
+            # Keep starting; /api/health/ready reports MongoDB as unavailable
+            logger.error("MongoDB warm-up failed: %s", e)
+    # Keep a reference so a background index build isn't garbage collected
+    search_backend = state.contact_search.name if state.contact_search is not None else "off"
+    state.index_build = await bootstrap_indexes(
+        state.db, os.environ.get('DB_INDEX_BUILD', 'background'), indexes=configured_indexes(search_backend)
+    )
+    await state.email_queue.start()
+    state.contact_stats.start()
+    if state.retention is not None:
+        state.retention.start()
+    if state.contact_search is not None:
+        state.contact_search.start()
+    state.loop_lag_monitor = asyncio.create_task(metrics.monitor_event_loop_lag())
+
+    yield
+
+    await state.submission_writer.flush()
+    await state.email_queue.stop()
+    await state.contact_stats.stop()
+    if state.retention is not None:
+        await state.retention.stop()
+    if state.contact_search is not None:
+        await state.contact_search.stop()
+    state.loop_lag_monitor.cancel()
+    state.client.close()
+    logging_config.stop_logging()
 
 # Create API router
 api_router = APIRouter(prefix="/api")
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
-
 @api_router.get("/")
 async def root():
     return {"message": "SNO Website API is running"}
 
+@api_router.get("/health/ready")
+async def health_ready(request: Request):
+    """
+    Readiness check: pings MongoDB and reports connection pool usage
+    """
+    from mongo_pool import readiness
+
+    state = request.app.state
+    ready, report = await readiness(state.db, state.pool_monitor, state.mongo_pool["maxPoolSize"])
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "unavailable", **report},
+    )
+
 @api_router.post("/contact", response_model=ContactFormResponse)
-async def submit_contact_form(form_data: ContactFormRequest, request: Request):
+async def submit_contact_form(form_data: ContactFormRequest, request: Request, response: Response):
     """
-    Handle contact form submissions
+    Handle contact form submissions. With an Idempotency-Key header a retry
+    of an already processed submission gets the stored response back
+    without being stored or emailed again.
     """
+    metrics.stage_latency.observe(metrics.time_since_request_start(request), "validation")
+    store = request.app.state.idempotency
+    key = request.headers.get("idempotency-key")
+    if key is None or store is None:
+        return await process_contact_submission(form_data, request)
+    if not valid_key(key):
+        raise HTTPException(
+            status_code=400,
+            detail={"success": False, "message": "Idempotency-Key inválida."}
+        )
+
+    request_fingerprint = fingerprint(form_data.name, form_data.email, form_data.message)
+    outcome, stored = await store.begin(key, request_fingerprint)
+    metrics.idempotency_requests.inc(outcome)
+    if outcome == "replay":
+        response.headers["Idempotent-Replayed"] = "true"
+        return ContactFormResponse(**stored)
+    if outcome == "in_progress":
+        raise HTTPException(
+            status_code=409,
+            detail={"success": False, "message": "Esta mensagem ainda está sendo processada."}
+        )
+    if outcome == "mismatch":
+        raise HTTPException(
+            status_code=422,
+            detail={"success": False, "message": "Idempotency-Key já usada para outra mensagem."}
+        )
+
     try:
-        # Get client IP for rate limiting
-        client_ip = request.client.host
+        result = await process_contact_submission(form_data, request)
+    except Exception:
+        # Rate limited or failed: let a retry with the same key run again
+        await store.release(key)
+        raise
+    await store.complete(key, request_fingerprint, result.model_dump())
+    return result
+
+async def process_contact_submission(form_data: ContactFormRequest, request: Request) -> ContactFormResponse:
+    """
+    Rate limit, filter, store and queue the notification for a submission
+    """
+    state = request.app.state
+    rate_limiter = state.rate_limiter
+    try:
+        # Real client address behind the load balancer; the limiter keys
+        # IPv6 clients by network
+        peer = request.client.host if request.client else ""
+        client_ip = state.client_identity.client_ip(peer, request.headers)
         user_agent = request.headers.get("user-agent", "")
-        
-        # Apply rate limiting (5 requests per 15 minutes per IP)
-        if not rate_limiter.is_allowed(client_ip, max_requests=5, window_minutes=15):
-            remaining_time = rate_limiter.get_reset_time(client_ip, window_minutes=15)
+
+        # Apply the rate limit policy's tiers for this client, all in one check
+        # Shared backends do network I/O, so keep them off the event loop
+        rule = state.rate_limit_policy.rule_for("contact", client_ip)
+        allowed = True
+        if rule is not None:
+            rate_limit_key = rule.key(state.client_identity.rate_limit_key(client_ip))
+            with metrics.stage_latency.time("rate_limit"):
+                if rate_limiter.backend.blocking:
+                    allowed = await run_in_threadpool(rate_limiter.check, rate_limit_key, rule.tiers)
+                else:
+                    allowed = rate_limiter.check(rate_limit_key, rule.tiers)
+
+        if not allowed:
+            if rate_limiter.backend.blocking:
+                remaining_time = await run_in_threadpool(
+                    rate_limiter.get_reset_time, rate_limit_key, tiers=rule.tiers
+                )
+            else:
+                remaining_time = rate_limiter.get_reset_time(rate_limit_key, tiers=rule.tiers)
             raise HTTPException(
-                status_code=429, 
+                status_code=429,
                 detail={
                     "success": False,
                     "message": "Muitas tentativas. Tente novamente em alguns minutos.",
                     "reset_time": remaining_time.isoformat() if remaining_time else None
                 }
             )
-        
-        # Create submission record
-        submission = ContactSubmission(
-            name=form_data.name,
-            email=form_data.email,
-            message=form_data.message,
-            ip_address=client_ip,
-            user_agent=user_agent
-        )
-        
-        # Store in database
-        await db.contact_submissions.insert_one(submission.dict())
-        logger.info(f"Contact form submitted by {form_data.name} ({form_data.email})")
-        
-        # Send email notification
-        email_success, email_message = email_service.send_contact_form_email(form_data.dict())
-        
-        if not email_success:
-            logger.error(f"Email sending failed: {email_message}")
+
+        # Drop duplicates and obvious spam before any database or email work.
+        # Dropped submissions get the usual success response so bots learn nothing
+        reasons = None
+        if state.spam_filter is not None:
+            with metrics.stage_latency.time("spam_filter"):
+                verdict, reasons = state.spam_filter.check(form_data.name, form_data.email, form_data.message)
+            metrics.spam_verdicts.inc(verdict)
+            for reason in reasons:
+                metrics.spam_reasons.inc(reason)
+            if verdict in ("duplicate", "rejected"):
+                logger.warning("Contact submission from %s dropped as %s: %s", client_ip, verdict, ", ".join(reasons))
+                return ContactFormResponse(success=True, message=CONTACT_SUCCESS_MESSAGE)
+
+        # Create submission record and store it in the database
+        document = ContactSubmission.document_from(form_data, client_ip, user_agent)
+        if reasons:
+            document["spam_reasons"] = reasons
+        with metrics.stage_latency.time("mongo_insert"):
+            await state.submission_writer.insert(document)
+        # Only count stored submissions; the submission is kept even if its
+        # rollups can't be updated
+        try:
+            await state.contact_rollups.record(document)
+        except Exception as e:
+            logger.error("Contact rollup update failed: %s", e)
+        state.contact_stats.record_submission(document["timestamp"])
+        if state.contact_search is not None:
+            state.contact_search.add(document)
+        logger.info("Contact form submitted by %s (%s)", form_data.name, form_data.email)
+
+        # Queue email notification; delivery happens in the background
+        try:
+            with metrics.stage_latency.time("email_dispatch"):
+                await state.email_queue.enqueue(form_data.model_dump())
+        except Exception as e:
+            logger.error("Email queueing failed: %s", e)
             # Don't fail the request if email fails, just log it
-            
+
         # Return success response
         return ContactFormResponse(
             success=True,
-            message="Mensagem enviada com sucesso! Entraremos em contato em breve."
+            message=CONTACT_SUCCESS_MESSAGE
         )
-        
+
     except HTTPException:
         # Re-raise HTTP exceptions (like rate limiting)
         raise
     except Exception as e:
-        logger.error(f"Error processing contact form: {str(e)}")
+        logger.error("Error processing contact form: %s", e)
         raise HTTPException(
             status_code=500,
             detail={
@@ -102,37 +243,321 @@ async def submit_contact_form(form_data: ContactFormRequest, request: Request):
             }
         )
 
+def require_admin_key(request: Request):
+    """
+    Admin routes expose personal data: the X-API-Key header must match
+    ADMIN_API_KEY, and they stay closed while no key is configured
+    """
+    api_key = os.environ.get('ADMIN_API_KEY')
+    if not api_key:
+        raise HTTPException(status_code=403, detail="Acesso administrativo não configurado")
+    if not hmac.compare_digest(request.headers.get("x-api-key", "").encode(), api_key.encode()):
+        raise HTTPException(status_code=401, detail="Chave de acesso inválida")
+
 @api_router.get("/contact/stats")
-async def get_contact_stats():
+async def get_contact_stats(request: Request):
     """
     Get contact form submission statistics
     """
     try:
-        total_submissions = await db.contact_submissions.count_documents({})
-        today_submissions = await db.contact_submissions.count_documents({
-            "timestamp": {"$gte": datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)}
-        })
-        
+        return await request.app.state.contact_stats.get()
+    except Exception as e:
+        logger.error("Error getting contact stats: %s", e)
+        raise HTTPException(status_code=500, detail="Erro ao obter estatísticas")
+
+@api_router.get("/contact/stats/timeseries")
+async def get_contact_timeseries(
+    request: Request,
+    bucket: str = Query("day", pattern="^(hour|day|week)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    group_by: Optional[str] = Query(None, pattern="^(email_domain|ip_prefix)$"),
+):
+    """
+    Get contact form submission counts per hour, day or week; counts per
+    email domain or IP prefix reveal who is writing in, so group_by is
+    admin only
+    """
+    if group_by:
+        require_admin_key(request)
+        if bucket not in GROUPED_BUCKETS:
+            raise HTTPException(status_code=400, detail="Agrupamento disponível apenas por dia ou semana")
+    end = as_utc(end) if end else datetime.utcnow()
+    start = as_utc(start) if start else end - timedelta(days=7)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="Intervalo de datas inválido")
+    if (end - start) / BUCKET_SIZES[bucket] > MAX_BUCKETS:
+        raise HTTPException(status_code=400, detail="Intervalo muito grande para este agrupamento")
+
+    try:
+        series = await request.app.state.contact_rollups.timeseries(start, end, bucket=bucket, group_by=group_by)
         return {
-            "total_submissions": total_submissions,
-            "today_submissions": today_submissions
+            "bucket": bucket,
+            "start": start,
+            "end": end,
+            "group_by": group_by,
+            "series": series,
         }
     except Exception as e:
-        logger.error(f"Error getting contact stats: {str(e)}")
+        logger.error("Error getting contact timeseries: %s", e)
         raise HTTPException(status_code=500, detail="Erro ao obter estatísticas")
 
-# Include the router in the main app
-app.include_router(api_router)
-
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+@api_router.get("/contact/submissions")
+async def list_contact_submissions(
+    request: Request,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    email: Optional[str] = None,
+    ip: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma separated, e.g. name,email"),
+):
+    """
+    Browse contact submissions newest first, one keyset page at a time
+    """
+    require_admin_key(request)
+    try:
+        return await request.app.state.submission_listing.page(
+            limit=limit,
+            cursor=cursor,
+            start=as_utc(start) if start else None,
+            end=as_utc(end) if end else None,
+            email=email.strip() if email else None,
+            ip_address=ip,
+            fields=[field.strip() for field in fields.split(",") if field.strip()] if fields else None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Parâmetro inválido: {e}")
+    except Exception as e:
+        logger.error("Error listing contact submissions: %s", e)
+        raise HTTPException(status_code=500, detail="Erro ao listar contatos")
+
+@api_router.get("/contact/search")
+async def search_contact_submissions(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=MAX_QUERY_LENGTH),
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_PAGE_SIZE),
+    cursor: Optional[str] = None,
+):
+    """
+    Search messages, names and emails of contact submissions, best matches first
+    """
+    require_admin_key(request)
+    search = request.app.state.contact_search
+    if search is None:
+        raise HTTPException(status_code=404, detail="Busca desativada")
+    try:
+        return await search.search(q, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Parâmetro inválido: {e}")
+    except Exception as e:
+        logger.error("Error searching contact submissions: %s", e)
+        raise HTTPException(status_code=500, detail="Erro ao buscar contatos")
+
+@api_router.get("/contact/export")
+async def export_contacts(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    since: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+):
+    """
+    Stream contact submissions as CSV or NDJSON, oldest first
+    """
+    require_admin_key(request)
+    if cursor is not None:
+        try:
+            decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+
+    filename = f"contatos-{datetime.utcnow():%Y%m%d-%H%M%S}.{format}"
+    return StreamingResponse(
+        request.app.state.submission_exporter.stream(format, as_utc(since) if since else None, cursor),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+async def get_metrics():
+    """
+    Expose performance metrics in the Prometheus text format
+    """
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+def admission_lanes() -> dict:
+    """
+    Admission control lanes keyed by (method, path). Submissions are capped
+    and shed while the event loop lags; the stats routes get their own,
+    smaller lane. Routes without a lane, like the health checks, always run.
+    """
+    from admission import Lane
+
+    max_wait = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', '0.5'))
+    contact = Lane(
+        "contact",
+        max_concurrent=int(os.environ.get('ADMISSION_CONTACT_CONCURRENCY', '8')),
+        max_waiting=int(os.environ.get('ADMISSION_CONTACT_QUEUE', '16')),
+        max_wait=max_wait,
+        max_loop_lag=float(os.environ.get('ADMISSION_MAX_LOOP_LAG', '0.25')),
+    )
+    stats = Lane(
+        "stats",
+        max_concurrent=int(os.environ.get('ADMISSION_STATS_CONCURRENCY', '16')),
+        max_waiting=int(os.environ.get('ADMISSION_STATS_QUEUE', '32')),
+        max_wait=max_wait,
+    )
+    return {
+        ("POST", "/api/contact"): contact,
+        ("GET", "/api/contact/stats"): stats,
+        ("GET", "/api/contact/stats/timeseries"): stats,
+    }
+
+def create_app() -> FastAPI:
+    """
+    Build the app: read the configuration, construct the MongoDB client and
+    services and wire up routes and middleware. Nothing here does I/O; the
+    client connects lazily and the lifespan runs the startup work.
+    Run it with `uvicorn server:app` or `uvicorn --factory server:create_app`.
+    Returns:
+        FastAPI: The configured application
+    """
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from mongo_pool import PoolMonitor, pool_options
+    from email_service import EmailService
+    from email_queue import EmailDeliveryQueue
+    from rate_limiter import RateLimiter, create_rate_limit_backend
+    from rate_limit_policy import load_rate_limit_policy
+    from contact_stats import ContactStats
+    from contact_rollups import ContactRollups
+    from submission_buffer import SubmissionWriter
+    from contact_export import SubmissionExporter
+    from contact_listing import SubmissionListing
+    from idempotency import create_idempotency_store
+    from client_identity import create_client_identity
+    from retention import create_retention
+    from contact_search import create_search_backend
+
+    load_dotenv(ROOT_DIR / '.env')
+    # Configure logging; records are written out by a background thread
+    log_handler = logging_config.configure_logging()
+
+    app = FastAPI(lifespan=lifespan)
+    state = app.state
+
+    # MongoDB connection; the client connects lazily, so nothing blocks here
+    state.mongo_pool = pool_options()
+    state.pool_monitor = PoolMonitor()
+    state.client = AsyncIOMotorClient(
+        os.environ['MONGO_URL'], event_listeners=[state.pool_monitor], **state.mongo_pool
+    )
+    db = state.db = state.client[os.environ['DB_NAME']]
+
+    # Initialize services
+    state.email_queue = EmailDeliveryQueue(
+        db, EmailService(), workers=int(os.environ.get('EMAIL_WORKERS', '2'))
+    )
+    state.contact_rollups = ContactRollups(
+        db, max_group_values=int(os.environ.get('ROLLUP_MAX_GROUP_VALUES', '1000'))
+    )
+    state.submission_writer = SubmissionWriter(
+        db.contact_submissions, mode=os.environ.get('SUBMISSION_WRITE_MODE', 'direct')
+    )
+    state.contact_stats = ContactStats(db, writer=state.submission_writer)
+    state.submission_exporter = SubmissionExporter(
+        db.contact_submissions, batch_size=int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))
+    )
+    state.submission_listing = SubmissionListing(db.contact_submissions)
+    state.contact_search = create_search_backend(os.environ.get('SEARCH_BACKEND', 'mongo'), db=db)
+    # Keeps contact_submissions small by scrubbing and archiving old submissions
+    state.retention = create_retention(
+        db, on_result=lambda action, count: metrics.retention_documents.inc(action, amount=count)
+    )
+    state.rate_limiter = RateLimiter(
+        create_rate_limit_backend(os.environ.get('RATE_LIMIT_BACKEND', 'memory'), db=db)
+    )
+    state.rate_limit_policy = load_rate_limit_policy(
+        os.environ.get('RATE_LIMIT_POLICY', ''), max_tiers=state.rate_limiter.backend.max_tiers
+    )
+    state.client_identity = create_client_identity(
+        os.environ.get('TRUSTED_PROXIES', ''),
+        header=os.environ.get('CLIENT_IP_HEADER', 'x-forwarded-for'),
+        ipv6_prefix=int(os.environ.get('CLIENT_IPV6_PREFIX', '64')),
+    )
+    state.idempotency = create_idempotency_store(os.environ.get('IDEMPOTENCY_BACKEND', 'mongo'), db=db)
+    state.spam_filter = None
+    if os.environ.get('SPAM_FILTER_ENABLED', 'true').lower() == 'true':
+        from spam_filter import SpamFilter
+        state.spam_filter = SpamFilter()
+
+    # Include the router in the main app
+    app.include_router(api_router)
+    app.add_api_route("/metrics", get_metrics, methods=["GET"], include_in_schema=False)
+
+    # Inside the response cache, so cache hits and 304s never take a lane
+    # slot, but ahead of everything that parses or handles the request
+    if os.environ.get('ADMISSION_CONTROL_ENABLED', 'true').lower() == 'true':
+        from admission import AdmissionControlMiddleware
+        app.add_middleware(
+            AdmissionControlMiddleware,
+            lanes=admission_lanes(),
+            loop_lag=lambda: metrics.event_loop_lag.value,
+            on_result=metrics.admission_requests.inc,
+        )
+
+    # Inside CORS, so CORS headers are still worked out for every request,
+    # including shed responses
+    cache_backend = os.environ.get('RESPONSE_CACHE_BACKEND', 'memory')
+    if cache_backend != 'off':
+        from response_cache import ResponseCacheMiddleware, create_cache_backend
+        app.add_middleware(
+            ResponseCacheMiddleware,
+            backend=create_cache_backend(cache_backend, db=db),
+            ttls=RESPONSE_CACHE_TTLS,
+            on_result=metrics.response_cache_requests.inc,
+        )
+
+    # Add CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    app.add_middleware(logging_config.LogContextMiddleware)
+
+    # Outermost, so latency covers every other middleware too
+    if os.environ.get('METRICS_ENABLED', 'true').lower() == 'true':
+        app.add_middleware(metrics.MetricsMiddleware)
+    metrics.registry.gauge(
+        "rate_limiter_tracked_keys", "Identifiers held by the rate limiter backend",
+        callback=lambda: state.rate_limiter.backend.tracked_keys(),
+    )
+    metrics.registry.gauge(
+        "email_queue_depth", "Emails waiting for a delivery worker",
+        callback=lambda: state.email_queue.queue.qsize() if state.email_queue.queue is not None else None,
+    )
+    metrics.registry.gauge(
+        "mongo_pool_connections_in_use", "MongoDB connections checked out of the pool",
+        callback=lambda: state.pool_monitor.totals()["in_use"],
+    )
+    metrics.registry.gauge(
+        "mongo_pool_saturation", "Share of the busiest MongoDB pool in use",
+        callback=lambda: state.pool_monitor.saturation(state.mongo_pool["maxPoolSize"]),
+    )
+    metrics.registry.gauge(
+        "log_records_dropped", "Log records dropped because the logging queue was full",
+        callback=lambda: log_handler.dropped,
+    )
+    return app
+
+def __getattr__(name):
+    # `server.app` is built on first access, so `uvicorn server:app` keeps
+    # working while importing this module stays cheap
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,123 @@
+import logging
+import queue
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Errors after which a session can no longer be trusted
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError)
+
+
+class _Session:
+    __slots__ = ("smtp", "last_used")
+
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    """
+    Pool of authenticated SMTP sessions shared by the delivery threads.
+    At most max_connections sessions exist at once; idle sessions are checked
+    with NOOP before reuse and reopened when the server has dropped them.
+    """
+
+    def __init__(self, connect, max_connections: int = 4, keepalive_after: float = 30.0,
+                 max_idle: float = 240.0):
+        """
+        Args:
+            connect: Callable returning a connected, authenticated smtplib.SMTP
+            max_connections: Maximum number of concurrent SMTP sessions
+            keepalive_after: Idle seconds after which a session is NOOP-checked
+            max_idle: Idle seconds after which a session is closed instead
+        """
+        self.connect = connect
+        self.max_connections = max_connections
+        self.keepalive_after = keepalive_after
+        self.max_idle = max_idle
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_connections)
+
+    def _checkout(self):
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                return _Session(self.connect())
+
+            idle_for = time.monotonic() - session.last_used
+            if idle_for > self.max_idle:
+                self._close(session)
+                continue
+            if idle_for > self.keepalive_after:
+                try:
+                    status, _ = session.smtp.noop()
+                    if status != 250:
+                        raise smtplib.SMTPServerDisconnected(f"NOOP returned {status}")
+                except CONNECTION_ERRORS:
+                    self._close(session)
+                    continue
+            return session
+
+    @staticmethod
+    def _close(session):
+        try:
+            session.smtp.quit()
+        except Exception:
+            session.smtp.close()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a session; it is closed instead of reused if the block raises"""
+        with self._slots:
+            session = self._checkout()
+            try:
+                yield session.smtp
+            except BaseException:
+                # The session is in an unknown state, don't hand it out again
+                self._close(session)
+                raise
+            session.last_used = time.monotonic()
+            self._idle.put(session)
+
+    def send_many(self, messages):
+        """
+        Send messages over a single session, reconnecting once if it drops
+        Returns:
+            list: None for each delivered message, or the exception that failed it
+        """
+        results = [None] * len(messages)
+        pending = list(range(len(messages)))
+        for attempt in range(2):
+            try:
+                with self.connection() as smtp:
+                    while pending:
+                        index = pending[0]
+                        try:
+                            smtp.send_message(messages[index])
+                        except smtplib.SMTPRecipientsRefused as e:
+                            results[index] = e
+                        except smtplib.SMTPResponseException as e:
+                            if e.smtp_code in (421, 451):
+                                raise smtplib.SMTPServerDisconnected(str(e))
+                            results[index] = e
+                        pending.pop(0)
+                return results
+            except CONNECTION_ERRORS as e:
+                logger.warning("SMTP session failed, %d messages pending: %s", len(pending), e)
+                if attempt == 1:
+                    for index in pending:
+                        results[index] = e
+        return results
+
+    def close(self):
+        """Close every idle session"""
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                return
@@ -0,0 +1,206 @@
+import hashlib
+import re
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from operator import eq
+
+WORD_PATTERN = re.compile(r"\w+")
+# Matched against casefolded text, which is much faster than IGNORECASE
+LINK_PATTERN = re.compile(r"https?://|www\.")
+REPEATED_PATTERN = re.compile(r"(.)\1{7,}")
+
+# Heuristic weights; a submission scoring REJECT_SCORE or more is dropped,
+# anything above zero is stored but flagged
+REASON_SCORES = {
+    "near_duplicate": 2,
+    "repeated_content": 1,
+    "too_many_links": 2,
+    "link_in_name": 2,
+    "link_density": 1,
+    "repeated_characters": 1,
+    "shouting": 1,
+}
+REJECT_SCORE = 3
+
+MAX_LINKS = 3
+MAX_LINK_DENSITY = 0.2
+
+MINHASH_BINS = 16
+_EMPTY = (1 << 32) - 1
+_BIN_MASK = MINHASH_BINS - 1
+_BIN_SHIFT = MINHASH_BINS.bit_length() - 1
+
+
+def casefold(text: str) -> str:
+    """Compatibility-normalized and casefolded, so case and width changes don't matter"""
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def minhash(tokens):
+    """
+    MinHash signature of the word bigrams using one-permutation hashing:
+    each bigram is hashed once and kept as the minimum of one of 16 bins,
+    instead of hashing it 16 times. Bins left empty by short messages
+    borrow from the next filled bin (rotation densification) so every bin
+    can take part in LSH banding.
+    """
+    bins = [_EMPTY] * MINHASH_BINS
+    for value in map(hash, zip(tokens, tokens[1:])):
+        index = value & _BIN_MASK
+        value = (value >> _BIN_SHIFT) & 0xFFFFFFFF
+        if value < bins[index]:
+            bins[index] = value
+    if _EMPTY in bins and any(value != _EMPTY for value in bins):
+        filled = bins[:]
+        for index, value in enumerate(filled):
+            if value == _EMPTY:
+                distance = 1
+                while filled[(index + distance) & _BIN_MASK] == _EMPTY:
+                    distance += 1
+                bins[index] = (filled[(index + distance) & _BIN_MASK] + distance * 0x9E3779B9) & 0xFFFFFFFE
+    return array("I", bins)
+
+
+def similarity(first, second) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures"""
+    return sum(map(eq, first, second)) / MINHASH_BINS
+
+
+class SpamFilter:
+    """
+    Duplicate and spam detection run before a submission touches MongoDB.
+    Exact duplicates (same normalized message and email) are found in a
+    bounded LRU of content hashes. Near-duplicates, typically the same bot
+    message sent from rotating addresses, go through a MinHash LSH index:
+    5 bands of 3 signature bins each, so pairs above ~0.75 similarity share
+    a band with ~99% probability and a check costs five dict lookups.
+    State is per process; Python's hash() is salted per process, which is
+    fine for an index that never leaves it.
+    """
+
+    BANDS = 5
+    ROWS = 3
+    SIMILARITY = 0.6
+    # Fewer bigrams than this are too generic for near-duplicate matching
+    MIN_FEATURES = 8
+    # Near copies seen before one is rejected on repetition alone
+    MAX_COPIES = 2
+    # Candidates checked per band, so a hot bucket can't make a check slow
+    MAX_CANDIDATES = 32
+
+    def __init__(self, max_entries: int = 100_000, window: float = 86400, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.window = window
+        self.clock = clock
+        # content hash -> [seen at, signature or None, near copies], least recently seen first
+        self.entries = OrderedDict()
+        # band hash -> content hash, or a list of them once buckets collide
+        self.buckets = {}
+
+    def _band_keys(self, signature):
+        return [hash((band, *signature[band * self.ROWS:(band + 1) * self.ROWS]))
+                for band in range(self.BANDS)]
+
+    def _index(self, key, signature):
+        for band_key in self._band_keys(signature):
+            bucket = self.buckets.get(band_key)
+            if bucket is None:
+                self.buckets[band_key] = key
+            elif isinstance(bucket, list):
+                bucket.append(key)
+            else:
+                self.buckets[band_key] = [bucket, key]
+
+    def _unindex(self, key, signature):
+        for band_key in self._band_keys(signature):
+            bucket = self.buckets.get(band_key)
+            if bucket == key:
+                del self.buckets[band_key]
+            elif isinstance(bucket, list) and key in bucket:
+                bucket.remove(key)
+                if len(bucket) == 1:
+                    self.buckets[band_key] = bucket[0]
+
+    def _remember(self, key, signature, copies, now):
+        previous = self.entries.pop(key, None)
+        if previous is not None and previous[1] is not None:
+            self._unindex(key, previous[1])
+        self.entries[key] = [now, signature, copies]
+        if signature is not None:
+            self._index(key, signature)
+        while len(self.entries) > self.max_entries:
+            old_key, (_, old_signature, _) = self.entries.popitem(last=False)
+            if old_signature is not None:
+                self._unindex(old_key, old_signature)
+
+    def _near_duplicate(self, key, signature, now):
+        """The most similar other fresh entry above the similarity threshold, if any"""
+        best, best_similarity = None, self.SIMILARITY
+        for band_key in self._band_keys(signature):
+            bucket = self.buckets.get(band_key)
+            if bucket is None:
+                continue
+            for candidate in (bucket[-self.MAX_CANDIDATES:] if isinstance(bucket, list) else (bucket,)):
+                entry = self.entries[candidate]
+                if candidate == key or now - entry[0] >= self.window:
+                    continue
+                score = similarity(signature, entry[1])
+                if score >= best_similarity:
+                    best, best_similarity = entry, score
+        return best
+
+    def score(self, name: str, message: str, folded: str, tokens) -> list:
+        """Reasons from the cheap content heuristics"""
+        reasons = []
+        links = len(LINK_PATTERN.findall(folded))
+        if links >= MAX_LINKS:
+            reasons.append("too_many_links")
+        elif links and links / max(1, len(tokens)) > MAX_LINK_DENSITY:
+            reasons.append("link_density")
+        if LINK_PATTERN.search(casefold(name)):
+            reasons.append("link_in_name")
+        if REPEATED_PATTERN.search(message):
+            reasons.append("repeated_characters")
+        # Every cased character upper case, checked in one C-level pass
+        if len(message) >= 20 and message.isupper():
+            reasons.append("shouting")
+        return reasons
+
+    def check(self, name: str, email: str, message: str):
+        """
+        Classify a submission and remember it for later checks
+        Returns:
+            tuple: (verdict, reasons) where verdict is "accepted", "flagged",
+                "rejected" or "duplicate"
+        """
+        now = self.clock()
+        folded = casefold(message)
+        tokens = WORD_PATTERN.findall(folded)
+        key = hashlib.blake2b(
+            f"{' '.join(tokens)}\0{email.strip().lower()}".encode(), digest_size=16
+        ).digest()
+
+        seen = self.entries.get(key)
+        if seen is not None and now - seen[0] < self.window:
+            self.entries.move_to_end(key)
+            return "duplicate", ["duplicate"]
+
+        reasons = self.score(name, message, folded, tokens)
+        signature, copies = None, 0
+        if len(tokens) > self.MIN_FEATURES:
+            signature = minhash(tokens)
+            original = self._near_duplicate(key, signature, now)
+            if original is not None:
+                copies = original[2] + 1
+                original[2] = copies
+                reasons.append("near_duplicate")
+                if copies > self.MAX_COPIES:
+                    reasons.append("repeated_content")
+
+        self._remember(key, signature, copies, now)
+        total = sum(REASON_SCORES[reason] for reason in reasons)
+        if total >= REJECT_SCORE:
+            return "rejected", reasons
+        return ("flagged" if reasons else "accepted"), reasons
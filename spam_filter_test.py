@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Spam Filter Testing for SNO Website
+Checks the exact-duplicate LRU (normalization, window, eviction), the
+MinHash near-duplicate threshold against the true bigram similarity of
+message pairs, the content heuristics, and that the contact route answers
+dropped submissions like accepted ones while counting them in /metrics.
+"""
+
+import asyncio
+import os
+import random
+
+from spam_filter import SpamFilter, WORD_PATTERN, minhash, similarity
+
+MESSAGE = ("Olá, gostaria de solicitar um orçamento para o desenvolvimento de um "
+           "site institucional com blog e formulário de contato para minha empresa.")
+VOCABULARY = [f"palavra{i}" for i in range(2000)]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _bigram_similarity(first: str, second: str) -> float:
+    """True Jaccard similarity of the word bigrams MinHash estimates"""
+    pairs = []
+    for text in (first, second):
+        tokens = WORD_PATTERN.findall(text.casefold())
+        pairs.append(set(zip(tokens, tokens[1:])))
+    return len(pairs[0] & pairs[1]) / len(pairs[0] | pairs[1])
+
+
+class SpamFilterTester:
+    def __init__(self):
+        self.passed = 0
+        self.failed = 0
+
+    def record(self, ok, description):
+        if ok:
+            self.passed += 1
+            print(f"✅ {description}")
+        else:
+            self.failed += 1
+            print(f"❌ {description}")
+
+    def test_exact_duplicates(self):
+        print("\n🔍 Exact duplicates...")
+        clock = FakeClock()
+        spam_filter = SpamFilter(window=3600, clock=clock)
+        verdict, _ = spam_filter.check("Ana", "ana@example.com", MESSAGE)
+        self.record(verdict == "accepted", f"First submission: {verdict}")
+        verdict, reasons = spam_filter.check("Ana", "ana@example.com", MESSAGE)
+        self.record((verdict, reasons) == ("duplicate", ["duplicate"]), f"Same message again: {verdict}")
+        variant = "  OLÁ gostaria de solicitar... um orçamento para o desenvolvimento de um site " \
+                  "institucional, com blog e formulário de contato para minha empresa!!"
+        verdict, _ = spam_filter.check("Ana", " ANA@example.com ", variant)
+        self.record(verdict == "duplicate", f"Case, punctuation and spacing changes: {verdict}")
+        verdict, _ = spam_filter.check("Ana", "ana@example.com", "ｏｌá " + MESSAGE[4:])
+        self.record(verdict == "duplicate", f"Full-width characters folded: {verdict}")
+        verdict, reasons = spam_filter.check("Bia", "bia@example.com", MESSAGE)
+        self.record(verdict != "duplicate" and "near_duplicate" in reasons,
+                    f"Same message from another email is a near duplicate, not exact: {verdict} {reasons}")
+
+        clock.now += 3599
+        verdict, _ = spam_filter.check("Ana", "ana@example.com", MESSAGE)
+        self.record(verdict == "duplicate", f"Still a duplicate just inside the window: {verdict}")
+        clock.now += 3600
+        verdict, _ = spam_filter.check("Ana", "ana@example.com", MESSAGE)
+        self.record(verdict != "duplicate", f"Accepted again once the window has passed: {verdict}")
+
+    def test_lru_eviction(self):
+        print("\n🔍 Duplicate LRU bounds...")
+        spam_filter = SpamFilter(max_entries=3)
+        messages = [f"Mensagem número {i} sobre um assunto diferente" for i in range(4)]
+        for message in messages[:3]:
+            spam_filter.check("Ana", "ana@example.com", message)
+        # Seeing the first again makes the second the least recently seen
+        spam_filter.check("Ana", "ana@example.com", messages[0])
+        spam_filter.check("Ana", "ana@example.com", messages[3])
+        self.record(len(spam_filter.entries) == 3, f"Entries capped at max_entries: {len(spam_filter.entries)}")
+        verdict, _ = spam_filter.check("Ana", "ana@example.com", messages[0])
+        self.record(verdict == "duplicate", f"Recently seen entry kept: {verdict}")
+        verdict, _ = spam_filter.check("Ana", "ana@example.com", messages[1])
+        self.record(verdict != "duplicate", f"Least recently seen entry evicted: {verdict}")
+
+        spam_filter = SpamFilter(max_entries=50)
+        rng = random.Random(1)
+        for _ in range(500):
+            spam_filter.check("Ana", "ana@example.com", " ".join(rng.choices(VOCABULARY, k=20)))
+        indexed = {key for bucket in spam_filter.buckets.values()
+                   for key in (bucket if isinstance(bucket, list) else (bucket,))}
+        self.record(indexed <= set(spam_filter.entries),
+                    f"Evicted entries leave the LSH index: {len(indexed)} indexed, {len(spam_filter.entries)} kept")
+
+    def test_near_duplicate_threshold(self, trials=1500):
+        print(f"\n🔍 Near-duplicate threshold over {trials} message pairs...")
+        signature = minhash(WORD_PATTERN.findall(MESSAGE.casefold()))
+        self.record(similarity(signature, signature) == 1.0, "Identical signatures have similarity 1")
+
+        rng = random.Random(7)
+        caught = {"high": [0, 0], "low": [0, 0]}
+        for _ in range(trials):
+            words = rng.choices(VOCABULARY, k=40)
+            copy = words[:]
+            for position in rng.sample(range(len(words)), rng.randrange(0, 25)):
+                copy[position] = rng.choice(VOCABULARY)
+            original, variant = " ".join(words), " ".join(copy)
+            true_similarity = _bigram_similarity(original, variant)
+            if 0.3 < true_similarity < 0.8:
+                continue
+            spam_filter = SpamFilter()
+            spam_filter.check("Ana", "ana@example.com", original)
+            _, reasons = spam_filter.check("Bot", "bot@example.com", variant)
+            band = caught["high" if true_similarity >= 0.8 else "low"]
+            band[0] += 1
+            band[1] += "near_duplicate" in reasons
+
+        total, hits = caught["high"]
+        self.record(hits >= 0.95 * total, f"Bigram similarity >= 0.8 caught: {hits}/{total}")
+        total, hits = caught["low"]
+        self.record(hits <= 0.02 * total, f"Bigram similarity <= 0.3 left alone: {hits}/{total}")
+
+        spam_filter = SpamFilter()
+        short = "Quero um orçamento para um site"
+        spam_filter.check("Ana", "ana@example.com", short)
+        _, reasons = spam_filter.check("Bia", "bia@example.com", short + " novo")
+        self.record("near_duplicate" not in reasons, f"Messages with too few bigrams skipped: {reasons}")
+
+    def test_repeated_content(self):
+        print("\n🔍 Repeated near copies...")
+        spam_filter = SpamFilter()
+        verdicts = [spam_filter.check("Bot", f"bot{i}@example.com", MESSAGE)[0] for i in range(SpamFilter.MAX_COPIES + 2)]
+        self.record(verdicts == ["accepted"] + ["flagged"] * SpamFilter.MAX_COPIES + ["rejected"],
+                    f"Rejected once copies exceed MAX_COPIES: {verdicts}")
+
+    def test_heuristics(self):
+        print("\n🔍 Content heuristics...")
+        cases = (
+            ("Ana", "Veja https://a.example e https://b.example e www.c.example agora", "flagged", "too_many_links"),
+            ("www.promo.example", "Veja https://a.example e https://b.example e www.c.example",
+             "rejected", "link_in_name"),
+            ("Ana", "QUERO UM ORÇAMENTO PARA O MEU SITE AGORA", "flagged", "shouting"),
+            ("Ana", "Olá!!!!!!!!!!!! Gostaria de um orçamento", "flagged", "repeated_characters"),
+            ("Ana", MESSAGE, "accepted", None),
+        )
+        for name, message, expected, reason in cases:
+            verdict, reasons = SpamFilter().check(name, "ana@example.com", message)
+            self.record(verdict == expected and (reason is None or reason in reasons),
+                        f"{reason or 'clean message'}: {verdict} {reasons}")
+
+    async def test_route(self):
+        print("\n🔍 Dropped submissions on the contact route...")
+        import httpx
+        import metrics
+        import server
+
+        os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+        os.environ.setdefault('DB_NAME', 'spam_filter_test')
+        os.environ['SPAM_FILTER_ENABLED'] = 'true'
+        app = server.create_app()
+        form = {"name": "Ana", "email": "ana@example.com", "message": MESSAGE}
+        # Seen before, so the route drops it before any database work
+        app.state.spam_filter.check(form["name"], form["email"], form["message"])
+        spam = {"name": "www.promo.example", "email": "bot@example.com",
+                "message": "Veja https://a.example e https://b.example e www.c.example"}
+
+        def dropped(verdict):
+            return metrics.spam_verdicts._values.get((verdict,), 0)
+
+        before = dropped("duplicate"), dropped("rejected")
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            duplicate = await client.post("/api/contact", json=form)
+            rejected = await client.post("/api/contact", json=spam)
+            exposition = (await client.get("/metrics")).text
+        for label, response in (("Duplicate", duplicate), ("Rejected", rejected)):
+            self.record(response.status_code == 200 and response.json()["success"] is True,
+                        f"{label} submission answered like an accepted one: {response.status_code}")
+        after = dropped("duplicate"), dropped("rejected")
+        self.record(after == (before[0] + 1, before[1] + 1),
+                    f"Dropped submissions counted by verdict: {before} -> {after}")
+        self.record('contact_spam_verdicts_total{verdict="rejected"}' in exposition,
+                    "Rejections exposed in /metrics")
+
+    def run_all_tests(self):
+        self.test_exact_duplicates()
+        self.test_lru_eviction()
+        self.test_near_duplicate_threshold()
+        self.test_repeated_content()
+        self.test_heuristics()
+        asyncio.run(self.test_route())
+        print(f"\n📊 {self.passed} passed, {self.failed} failed")
+        return self.failed == 0
+
+
+def main():
+    tester = SpamFilterTester()
+    return 0 if tester.run_all_tests() else 1
+
+
+if __name__ == "__main__":
+    exit(main())
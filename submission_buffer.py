@@ -0,0 +1,93 @@
+import asyncio
+import logging
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+WRITE_MODES = ("direct", "ack", "buffered")
+
+
+class SubmissionWriter:
+    """
+    Stores contact submissions, optionally batching them into insert_many calls.
+    Modes:
+        direct: one insert_one per submission (no buffering)
+        ack: submissions are grouped into batches, but each request waits
+            until its batch is written, so nothing is acknowledged unsaved
+        buffered: requests return immediately and batches are written
+            behind them; a crash loses whatever is still buffered
+    A batch is written once it holds max_batch documents or max_delay seconds
+    after its first document arrived, whichever comes first.
+    """
+
+    def __init__(self, collection, mode: str = "direct", max_batch: int = 100,
+                 max_delay: float = 0.02):
+        if mode not in WRITE_MODES:
+            raise ValueError(f"Unknown submission write mode: {mode}")
+        self.collection = collection
+        self.mode = mode
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._documents = []
+        self._waiters = []
+        self._timer = None
+        self._flushes = set()
+
+    async def insert(self, document: dict):
+        """Store a submission document according to the write mode"""
+        if self.mode == "direct":
+            await self.collection.insert_one(document)
+            return
+
+        self._documents.append(document)
+        waiter = None
+        if self.mode == "ack":
+            waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+
+        if len(self._documents) >= self.max_batch:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_delay, self._start_flush)
+
+        if waiter is not None:
+            await waiter
+
+    def _start_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._documents:
+            return
+        documents, waiters = self._documents, self._waiters
+        self._documents, self._waiters = [], []
+        task = asyncio.ensure_future(self._write(documents, waiters))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _write(self, documents, waiters):
+        failed = {}
+        try:
+            await self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            # Unordered inserts keep going past failures; only fail those
+            for error in e.details.get("writeErrors", []):
+                failed[error["index"]] = Exception(error.get("errmsg", "insert failed"))
+        except Exception as e:
+            failed = {index: e for index in range(len(documents))}
+
+        if failed:
+            logger.error("%d of %d buffered submissions failed to insert", len(failed), len(documents))
+        for index, waiter in enumerate(waiters):
+            if waiter is None or waiter.done():
+                continue
+            if index in failed:
+                waiter.set_exception(failed[index])
+            else:
+                waiter.set_result(None)
+
+    async def flush(self):
+        """Write everything buffered so far and wait for it"""
+        self._start_flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
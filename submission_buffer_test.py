@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Submission Writer Testing for SNO Website
+Checks the direct, ack and buffered write modes of SubmissionWriter: how
+submissions are batched, that a duplicate key in the middle of a batch
+fails only its own request, that ack mode hands write errors to the
+caller, and that the app writes out what is still buffered at shutdown.
+Uses MongoDB at MONGO_URL when reachable, otherwise mongomock-motor.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from dotenv import load_dotenv
+from pymongo import ASCENDING, IndexModel
+
+from submission_buffer import SubmissionWriter
+
+load_dotenv('/app/backend/.env')
+
+MONGO_URL = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
+
+SAMPLE_FORM = {
+    "name": "Teste Buffer",
+    "email": "test.buffer@example.com",
+    "message": "Mensagem de teste da escrita em lotes.",
+}
+
+
+async def get_database():
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(MONGO_URL, serverSelectionTimeoutMS=1000)
+        await client.admin.command('ping')
+        print("✅ Using MongoDB at", MONGO_URL)
+        return client[f"submission_buffer_test_{time.time_ns()}"], True
+    except Exception:
+        from mongomock_motor import AsyncMongoMockClient
+        print("⚠️ MongoDB not available, using mongomock-motor")
+        return AsyncMongoMockClient()[f"submission_buffer_test_{time.time_ns()}"], False
+
+
+def _submission(submission_id=None):
+    return {"id": submission_id or str(uuid.uuid4()), "name": "Teste Buffer"}
+
+
+class RecordingCollection:
+    """Wraps a collection to record the size of every write, optionally failing them"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.writes = []
+        self.error = None
+
+    async def insert_one(self, document):
+        self.writes.append(1)
+        if self.error is not None:
+            raise self.error
+        return await self.collection.insert_one(document)
+
+    async def insert_many(self, documents, ordered=True):
+        self.writes.append(len(documents))
+        if self.error is not None:
+            raise self.error
+        return await self.collection.insert_many(documents, ordered=ordered)
+
+
+class SubmissionBufferTester:
+    def __init__(self):
+        self.passed = 0
+        self.failed = 0
+
+    def record(self, ok, description):
+        if ok:
+            self.passed += 1
+            print(f"✅ {description}")
+        else:
+            self.failed += 1
+            print(f"❌ {description}")
+
+    async def _collection(self, db):
+        await db.drop_collection("contact_submissions")
+        await db.contact_submissions.create_indexes([IndexModel([("id", ASCENDING)], name="id_unique", unique=True)])
+        return RecordingCollection(db.contact_submissions)
+
+    async def test_modes(self, db):
+        print("\n🔍 Write modes...")
+        collection = await self._collection(db)
+        writer = SubmissionWriter(collection, mode="direct")
+        await asyncio.gather(*(writer.insert(_submission()) for _ in range(3)))
+        self.record(collection.writes == [1, 1, 1], f"direct: one insert per submission {collection.writes}")
+
+        collection = await self._collection(db)
+        writer = SubmissionWriter(collection, mode="ack", max_batch=4, max_delay=0.05)
+        await asyncio.gather(*(writer.insert(_submission()) for _ in range(10)))
+        stored = await db.contact_submissions.count_documents({})
+        self.record(collection.writes == [4, 4, 2] and stored == 10,
+                    f"ack: batches of max_batch, the rest after max_delay {collection.writes}, {stored} stored")
+
+        collection = await self._collection(db)
+        writer = SubmissionWriter(collection, mode="buffered", max_delay=0.05)
+        await asyncio.gather(*(writer.insert(_submission()) for _ in range(5)))
+        before = await db.contact_submissions.count_documents({})
+        await asyncio.sleep(0.1)
+        after = await db.contact_submissions.count_documents({})
+        self.record(before == 0 and after == 5 and collection.writes == [5],
+                    f"buffered: requests return first, one batch written after max_delay ({before} then {after} stored)")
+
+        try:
+            SubmissionWriter(collection, mode="lazy")
+            self.record(False, "Unknown mode accepted")
+        except ValueError:
+            self.record(True, "Unknown mode rejected")
+
+    async def test_duplicate_in_batch(self, db):
+        print("\n🔍 Duplicate key in the middle of a batch...")
+        for mode in ("ack", "buffered"):
+            collection = await self._collection(db)
+            await db.contact_submissions.insert_one(_submission("sub-dup"))
+            writer = SubmissionWriter(collection, mode=mode, max_batch=5, max_delay=60)
+            ids = ["sub-1", "sub-2", "sub-dup", "sub-3", "sub-4"]
+            results = await asyncio.gather(*(writer.insert(_submission(i)) for i in ids), return_exceptions=True)
+            await writer.flush()
+            stored = sorted(document["id"] for document in await db.contact_submissions.find({}).to_list(None))
+            self.record(collection.writes == [5] and stored == sorted(ids),
+                        f"{mode}: the rest of the batch stored around the duplicate: {stored}")
+            if mode == "ack":
+                failures = [i for i, result in zip(ids, results) if isinstance(result, Exception)]
+                self.record(failures == ["sub-dup"], f"ack: only the duplicate's request fails: {failures}")
+            else:
+                self.record(not any(isinstance(result, Exception) for result in results),
+                            "buffered: requests already answered, the failure is only logged")
+
+    async def test_ack_errors(self, db):
+        print("\n🔍 Write errors in ack mode...")
+        collection = await self._collection(db)
+        collection.error = RuntimeError("connection reset")
+        writer = SubmissionWriter(collection, mode="ack", max_batch=3, max_delay=60)
+        results = await asyncio.gather(*(writer.insert(_submission()) for _ in range(3)), return_exceptions=True)
+        self.record(all(isinstance(result, RuntimeError) for result in results),
+                    f"A failed batch fails every request in it: {[type(result).__name__ for result in results]}")
+
+        collection.error = None
+        writer = SubmissionWriter(collection, mode="ack", max_batch=2, max_delay=60)
+        first = asyncio.create_task(writer.insert(_submission("sub-a")))
+        second = asyncio.create_task(writer.insert(_submission("sub-a")))
+        results = await asyncio.gather(first, second, return_exceptions=True)
+        self.record(results[0] is None and isinstance(results[1], Exception),
+                    f"Caller of a rejected document gets the error: {results[1]!r:.60}")
+
+        collection = await self._collection(db)
+        collection.error = RuntimeError("connection reset")
+        writer = SubmissionWriter(collection, mode="direct")
+        try:
+            await writer.insert(_submission())
+            self.record(False, "direct: write error swallowed")
+        except RuntimeError:
+            self.record(True, "direct: write error raised to the caller")
+
+    async def test_flush_on_shutdown(self, db):
+        print("\n🔍 Buffered submissions at shutdown...")
+        import httpx
+        import server
+        from contact_stats import ContactStats
+        from email_queue import EmailDeliveryQueue
+        from email_service import EmailService
+
+        os.environ.setdefault('MONGO_URL', MONGO_URL)
+        os.environ.setdefault('DB_NAME', 'submission_buffer_test')
+        os.environ['SUBMISSION_WRITE_MODE'] = 'buffered'
+        os.environ['MONGO_WARMUP'] = 'false'
+        os.environ['DB_INDEX_BUILD'] = 'off'
+        os.environ['SPAM_FILTER_ENABLED'] = 'false'
+        os.environ['SEARCH_BACKEND'] = 'off'
+        for name in ("contact_submissions", "contact_rollups", "email_outbox"):
+            await db.drop_collection(name)
+
+        app = server.create_app()
+        state = app.state
+        self.record(state.submission_writer.mode == "buffered", "SUBMISSION_WRITE_MODE selects the mode")
+        # Hold the batch until shutdown
+        state.submission_writer = SubmissionWriter(db.contact_submissions, mode="buffered", max_delay=60)
+        state.contact_stats = ContactStats(db, writer=state.submission_writer)
+        state.email_queue = EmailDeliveryQueue(db, EmailService())
+        state.contact_rollups.collection = db.contact_rollups
+
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                responses = [await client.post("/api/contact", json=SAMPLE_FORM) for _ in range(3)]
+            buffered = await db.contact_submissions.count_documents({})
+            self.record(all(response.status_code == 200 for response in responses) and buffered == 0,
+                        f"Submissions answered while still buffered: {buffered} stored")
+        stored = await db.contact_submissions.count_documents({})
+        self.record(stored == 3, f"Buffer written out at shutdown: {stored} stored")
+
+    async def run_all_tests(self):
+        db, real_mongo = await get_database()
+        await self.test_modes(db)
+        await self.test_duplicate_in_batch(db)
+        await self.test_ack_errors(db)
+        await self.test_flush_on_shutdown(db)
+        if real_mongo:
+            await db.client.drop_database(db.name)
+        print(f"\n📊 {self.passed} passed, {self.failed} failed")
+        return self.failed == 0
+
+
+def main():
+    tester = SubmissionBufferTester()
+    return 0 if asyncio.run(tester.run_all_tests()) else 1
+
+
+if __name__ == "__main__":
+    exit(main())